@@ -1,20 +1,30 @@
-import csv
-import sys
+"""
+Print the best rows of an output file of the evolutionary algorithm.
 
+Usage:
+    analyze_data.py [-h] [--num NUM] [--index] <filename>
 
-def read_data(filename):
+Options:
+    -h --help   Show help
+    --num NUM   Number of rows to print [default: 10]
+    --index     Use (and update) a sidecar index of the best rows
+"""
+from docopt import docopt
+
+from axelrod_dojo.utils import best_indexed_results, best_results
+
+
+def read_data(filename, num=10, index=False):
     """Read in the n top performing results from a given file"""
-    results = []
-    with open(filename) as data:
-        reader = csv.reader(data)
-        for line in reader:
-            results.append((float(line[-2]), line[-1]))
+    if index:
+        return best_indexed_results(filename, num)
+    results, _, _ = best_results(filename, num)
     return results
 
 
 if __name__ == "__main__":
-    data_filename = sys.argv[1]
-    results = read_data(data_filename)
-    results.sort()
-    for result in results[-10:]:
+    arguments = docopt(__doc__)
+    results = read_data(arguments["<filename>"], int(arguments["--num"]),
+                        arguments["--index"])
+    for result in reversed(results):
         print(result[0], result[1])
@@ -10,6 +10,7 @@ Usage:
     [--mu mutation_probability] [--bottleneck BOTTLENECK] [--processes PROCESSES]
     [--output OUTPUT_FILE] [--objective OBJECTIVE] [--repetitions REPETITIONS]
     [--turns TURNS] [--noise NOISE] [--nmoran NMORAN]
+    [--target_standard_error SEM] [--checkpoint CHECKPOINT_FILE]
     [--features FEATURES] [--hidden HIDDEN] [--mu_distance DISTANCE]
 
 Options:
@@ -25,6 +26,8 @@ Options:
     --turns TURNS               Turns in each match [default: 200]
     --noise NOISE               Match noise [default: 0.00]
     --nmoran NMORAN             Moran Population Size, if Moran objective [default: 4]
+    --target_standard_error SEM  Standard error to stop repeating stochastic matches at
+    --checkpoint CHECKPOINT_FILE  File to save the run to every generation and to resume it from
     --features FEATURES         Number of ANN features [default: 17]
     --hidden HIDDEN             Number of hidden nodes [default: 10]
     --mu_distance DISTANCE      Delta max for weights updates [default: 10]
@@ -0,0 +1,240 @@
+"""
+Benchmarks of the training hot paths.
+
+Times `score_player` for each objective (with and without an
+`OpponentPool`), `Population.evolve` for each of the player classes trained
+in bin/, `PSO.swarm` and the mutation, crossover and play of
+`EvolvablePFSMPlayer`. Every case is run from the same seed and the timings
+are written as JSON so that they can be compared between versions.
+
+Usage:
+    benchmark.py [-h] [--output OUTPUT_FILE] [--seed SEED] [--repeat REPEAT]
+    [--populations POPULATIONS] [--turns TURNS] [--processes PROCESSES]
+    [--generations GENERATIONS] [--repetitions REPETITIONS]
+    [--opponents OPPONENTS] [--operations OPERATIONS] [--only BENCHMARKS]
+
+Options:
+    -h --help                   Show help
+    --output OUTPUT_FILE        File to write the JSON results to, - for stdout [default: -]
+    --seed SEED                 Seed of every case [default: 0]
+    --repeat REPEAT             Times each case is timed [default: 3]
+    --populations POPULATIONS   Comma separated population sizes [default: 10,40]
+    --turns TURNS               Comma separated turns in each match [default: 50,200]
+    --processes PROCESSES       Comma separated numbers of processes [default: 1,2]
+    --generations GENERATIONS   Generations timed for each evolve case [default: 2]
+    --repetitions REPETITIONS   Repetitions in the objectives [default: 10]
+    --opponents OPPONENTS       Number of opponents, from axl.short_run_time_strategies [default: 10]
+    --operations OPERATIONS     Mutations, crossovers and turns timed for each case [default: 1000]
+    --only BENCHMARKS           Comma separated benchmarks to run out of
+                                score_player, evolve, swarm and pfsm [default: score_player,evolve,swarm,pfsm]
+"""
+from contextlib import redirect_stdout
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from itertools import product
+
+from docopt import docopt
+import numpy as np
+
+import axelrod as axl
+from axelrod import Action
+import axelrod_dojo as dojo
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+from axelrod_dojo.utils import OpponentPool, PlayerInfo, score_player
+
+C = Action.C
+
+OBJECTIVES = ["score", "score_diff", "moran", "fast_moran"]
+
+# The player classes of the training scripts with their default parameters.
+PLAYER_CLASSES = [
+    (axl.EvolvableANN, {"num_features": 17, "num_hidden": 10,
+                        "mutation_probability": 0.1,
+                        "mutation_distance": 10}),
+    (axl.EvolvableFSMPlayer, {"num_states": 8, "mutation_probability": 0.1}),
+    (axl.EvolvableHMMPlayer, {"num_states": 5, "mutation_probability": 0.1}),
+    (axl.EvolvableLookerUp, {"parameters": (3, 3, 2),
+                             "initial_actions": [C] * 3,
+                             "mutation_probability": 0.1}),
+    (axl.EvolvableGambler, {"parameters": (2, 2, 2),
+                            "initial_actions": [C] * 2,
+                            "mutation_probability": 0.1}),
+]
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    axl._module_random.seed(seed)
+
+
+def time_case(function, seed, repeat):
+    """Return the times of `repeat` runs of function, each from seed."""
+    times = []
+    for _ in range(repeat):
+        seed_everything(seed)
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def record(results, benchmark, parameters, times, operations=1):
+    results.append({"benchmark": benchmark,
+                    "parameters": parameters,
+                    "times": times,
+                    "best": min(times),
+                    "mean": sum(times) / len(times),
+                    "best_per_operation": min(times) / operations})
+    print("{} {} {:.4f}s".format(benchmark, parameters, min(times)),
+          file=sys.stderr)
+
+
+def benchmark_score_player(results, settings):
+    opponents_information = settings["opponents_information"]
+    cases = product(OBJECTIVES, settings["turns"], [False, True])
+    for name, turns, pooled in cases:
+        objective = dojo.prepare_objective(
+            name=name, turns=turns, repetitions=settings["repetitions"])
+        seed_everything(settings["seed"])
+        player = axl.EvolvableFSMPlayer(num_states=8)
+        opponents = OpponentPool(opponents_information) if pooled else None
+
+        def run():
+            score_player(player, objective, opponents_information,
+                         opponents=opponents)
+
+        record(results, "score_player",
+               {"objective": name, "turns": turns, "opponent_pool": pooled},
+               time_case(run, settings["seed"], settings["repeat"]))
+
+
+def benchmark_evolve(results, settings):
+    opponents = [strategy() for strategy, _ in
+                 settings["opponents_information"]]
+    cases = product(PLAYER_CLASSES, settings["populations"],
+                    settings["turns"], settings["processes"])
+    for (player_class, params_kwargs), size, turns, processes in cases:
+        objective = dojo.prepare_objective(
+            name="score", turns=turns, repetitions=settings["repetitions"])
+
+        def run():
+            with tempfile.NamedTemporaryFile() as output, dojo.Population(
+                    player_class, params_kwargs, size, objective, output.name,
+                    bottleneck=max(2, size // 4), opponents=opponents,
+                    processes=processes) as population:
+                population.run(settings["generations"], print_output=False)
+
+        times = time_case(run, settings["seed"], settings["repeat"])
+        record(results, "evolve",
+               {"player_class": player_class.__name__, "population": size,
+                "turns": turns, "processes": processes},
+               times, operations=settings["generations"])
+
+
+def benchmark_swarm(results, settings):
+    opponents = [strategy() for strategy, _ in
+                 settings["opponents_information"]]
+    player_class, params_kwargs = PLAYER_CLASSES[-1]
+    for size, turns in product(settings["populations"], settings["turns"]):
+        objective = dojo.prepare_objective(
+            name="score", turns=turns, repetitions=settings["repetitions"])
+
+        def run():
+            # The swarm reports on stdout, which may be holding the results
+            with redirect_stdout(sys.stderr), dojo.PSO(
+                    player_class, params_kwargs, objective,
+                    opponents=opponents, population=size,
+                    generations=settings["generations"],
+                    debug=False) as pso:
+                pso.swarm()
+
+        record(results, "swarm", {"population": size, "turns": turns},
+               time_case(run, settings["seed"], settings["repeat"]),
+               operations=settings["generations"])
+
+
+def benchmark_pfsm(results, settings):
+    operations = settings["operations"]
+    for num_states in [4, 16]:
+        seed_everything(settings["seed"])
+        players = [EvolvablePFSMPlayer(num_states=num_states,
+                                       mutation_probability=0.1)
+                   for _ in range(2)]
+
+        def mutate():
+            for _ in range(operations):
+                players[0].mutate()
+
+        def crossover():
+            for _ in range(operations):
+                players[0].crossover(players[1])
+
+        def play():
+            axl.Match(players, turns=operations, seed=settings["seed"]).play()
+
+        for operation, function in [("mutate", mutate),
+                                    ("crossover", crossover),
+                                    ("play", play)]:
+            record(results, "pfsm",
+                   {"operation": operation, "num_states": num_states},
+                   time_case(function, settings["seed"], settings["repeat"]),
+                   operations=operations)
+
+
+BENCHMARKS = {
+    "score_player": benchmark_score_player,
+    "evolve": benchmark_evolve,
+    "swarm": benchmark_swarm,
+    "pfsm": benchmark_pfsm,
+}
+
+
+def integers(argument):
+    return [int(value) for value in argument.split(",")]
+
+
+if __name__ == "__main__":
+    arguments = docopt(__doc__, version="Benchmark 0.1")
+    names = arguments["--only"].split(",")
+    for name in names:
+        if name not in BENCHMARKS:
+            raise ValueError("Benchmarks must be among {}".format(
+                ", ".join(BENCHMARKS)))
+    opponents = axl.short_run_time_strategies[:int(arguments["--opponents"])]
+    settings = {
+        "seed": int(arguments["--seed"]),
+        "repeat": int(arguments["--repeat"]),
+        "populations": integers(arguments["--populations"]),
+        "turns": integers(arguments["--turns"]),
+        "processes": integers(arguments["--processes"]),
+        "generations": int(arguments["--generations"]),
+        "repetitions": int(arguments["--repetitions"]),
+        "operations": int(arguments["--operations"]),
+        "opponents_information": [PlayerInfo(s, {}) for s in opponents],
+    }
+
+    results = []
+    for name in names:
+        BENCHMARKS[name](results, settings)
+
+    report = {
+        "axelrod_dojo": dojo.__version__,
+        "axelrod": axl.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in settings.items()
+                     if key != "opponents_information"},
+        "opponents": [str(s()) for s in opponents],
+        "results": results,
+    }
+    if arguments["--output"] == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(arguments["--output"], "w") as output:
+            json.dump(report, output, indent=2)
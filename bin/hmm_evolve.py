@@ -6,6 +6,7 @@ Usage:
     [--mu MUTATION_RATE] [--bottleneck BOTTLENECK] [--processes PROCESSES]
     [--output OUTPUT_FILE] [--objective OBJECTIVE] [--repetitions REPETITIONS]
     [--turns TURNS] [--noise NOISE] [--nmoran NMORAN]
+    [--target_standard_error SEM] [--checkpoint CHECKPOINT_FILE]
     [--states NUM_STATES] [--algorithm ALGORITHM]
 
 Options:
@@ -21,6 +22,8 @@ Options:
     --turns TURNS               Turns in each match [default: 200]
     --noise NOISE               Match noise [default: 0.00]
     --nmoran NMORAN             Moran Population Size, if Moran objective [default: 4]
+    --target_standard_error SEM  Standard error to stop repeating stochastic matches at
+    --checkpoint CHECKPOINT_FILE  File to save the run to every generation and to resume it from
     --states NUM_STATES         Number of FSM states [default: 5]
     --algorithm ALGORITHM       Which algorithm to use (EA for evolutionary algorithm or PS for
                                 particle swarm algorithm) [default: EA]
@@ -10,6 +10,7 @@ Usage:
     [--mu MUTATION_RATE] [--bottleneck BOTTLENECK] [--processes PROCESSES]
     [--output OUTPUT_FILE] [--objective OBJECTIVE] [--repetitions REPETITIONS]
     [--turns TURNS] [--noise NOISE] [--nmoran NMORAN]
+    [--target_standard_error SEM] [--checkpoint CHECKPOINT_FILE]
     [--plays PLAYS] [--op_plays OP_PLAYS] [--op_start_plays OP_START_PLAYS]
     [--algorithm ALGORITHM]
 
@@ -26,6 +27,8 @@ Options:
     --turns TURNS               Turns in each match [default: 200]
     --noise NOISE               Match noise [default: 0.00]
     --nmoran NMORAN             Moran Population Size, if Moran objective [default: 4]
+    --target_standard_error SEM  Standard error to stop repeating stochastic matches at
+    --checkpoint CHECKPOINT_FILE  File to save the run to every generation and to resume it from
     --plays PLAYS               Number of recent plays in the lookup table [default: 2]
     --op_plays OP_PLAYS         Number of recent plays in the lookup table [default: 2]
     --op_start_plays OP_START_PLAYS     Number of opponent starting plays in the lookup table [default: 2]
@@ -17,6 +17,7 @@ setup(
     name='axelrod_dojo',
     version=__version__,
     install_requires=requirements,
+    extras_require={"arrow": ["pyarrow"], "distributed": ["distributed"]},
     author='Marc Harper; Vince Knight; Martin Jones; Georgios Koutsovoulos',
     packages=find_packages('src'),
     package_dir={"": "src"},
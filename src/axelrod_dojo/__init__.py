@@ -1,5 +1,11 @@
 from .version import __version__
 from .arguments import invoke_training
 from .algorithms.evolutionary_algorithm import Population
+from .algorithms.islands import Islands
 from .algorithms.particle_swarm_optimization import PSO
+from .algorithms.steady_state import SteadyStatePopulation
+from .executors import DaskExecutor, PoolExecutor, SerialExecutor
+from .fidelity import FidelitySchedule
+from .genomes import FSMGenomes, LookupGenomes, PFSMGenomes
+from .surrogate import Surrogate
 from .utils import prepare_objective, load_params, PlayerInfo
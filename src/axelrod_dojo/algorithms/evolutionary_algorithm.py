@@ -1,20 +1,108 @@
+from functools import partial
 from itertools import repeat, starmap
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count
 from operator import itemgetter
+import pickle
 from random import randrange
 from statistics import mean, pstdev
+from uuid import uuid4
+
+import numpy as np
 
 import axelrod as axl
-from axelrod_dojo.utils import Outputer, PlayerInfo, score_player
+from axelrod_dojo.canonical import canonical_key
+from axelrod_dojo.executors import PoolExecutor
+from axelrod_dojo.genomes import genome_class, random_genomes
+from axelrod_dojo.match_engine import compile_player
+from axelrod_dojo.utils import (FitnessCache, PlayerInfo, ScoringContext,
+                                average_score, derive_seed, fingerprint,
+                                fitness_key, initialize_worker,
+                                is_deterministic_objective,
+                                make_outputer, map_with_context,
+                                OpponentPool, sample_opponents,
+                                race_player, race_serialized_player,
+                                score_player, score_compiled_players,
+                                score_match_block, score_serialized_player,
+                                random_states, set_random_states,
+                                stochastic_opponents, write_atomically)
 
 
 class Population(object):
-    """Population class that implements the evolutionary algorithm."""
+    """Population class that implements the evolutionary algorithm.
+
+    When more than one process is used the worker pool is started by the
+    first call to `score_all` and stopped by `close` (or on leaving a `with`
+    block). An `executor` (a SerialExecutor, PoolExecutor or DaskExecutor)
+    can be passed instead to share warm workers between populations or to
+    score on a dask cluster; it is then left running by `close`.
+
+    With `granularity="match"` the workers are given one task per player and
+    opponent (and per block of `block_size` repetitions of stochastic
+    matches) rather than one task per player, which keeps many workers busy
+    even for small populations.
+
+    With `racing=True` players that can not make it into the next generation
+    are stopped before playing every opponent (see `race_player`) and given
+    the mean of their partial score; `matches_saved` counts the matches
+    that were not played.
+
+    `repetitions` counts the repetitions of the matches played to score
+    players. With an objective that stops on a `target_standard_error` it
+    shows how many fewer were played than the objective's `repetitions`.
+
+    A row is written to output_filename for every generation. With
+    `flush_interval` the rows are written that many at a time (and by
+    `close`), and `output_format="arrow"` writes them to an Arrow IPC stream
+    file with typed columns instead of a CSV file (see `ArrowOutputer`).
+
+    With a `checkpoint_filename` the state of the run (the population, the
+    generation, the states of the random number generators, the fitness
+    cache, the fidelity schedule and the surrogate) is saved every
+    `checkpoint_interval` generations, and `load_checkpoint` resumes the run
+    where the checkpoint was saved, removing the rows written to the output
+    since then.
+
+    Players that play the same way (see `axelrod_dojo.canonical`) are only
+    scored once in each generation when the evaluation is deterministic, and
+    `duplicates` counts the players that were given the score of another.
+
+    With a `surrogate` (see `axelrod_dojo.surrogate.Surrogate`) every player
+    scored in full (not raced out, and at full fidelity) is added to its
+    regression and `oversampling` times as many crossover children are bred,
+    of which only those with the highest predicted scores are kept and
+    scored.
+
+    With a `fidelity` schedule (see `axelrod_dojo.fidelity.FidelitySchedule`)
+    the early generations are scored against a stratified sample of the
+    opponents with fewer turns and repetitions, and the fidelity rises as
+    the best score stops improving. The `bottleneck` best players of each
+    generation are scored again with the full evaluation, and the best of
+    them is the player written to the output.
+
+    With `batch_breeding=True` the children of each generation are bred as
+    NumPy arrays of genomes (see `axelrod_dojo.genomes`), which is much
+    faster for large populations of finite state machines and lookup tables.
+
+    With a `seed` players are scored with common random numbers: every
+    player of a generation meets the same sample of opponents and the same
+    noise and random moves against each of them (see `score_player`), drawn
+    from a seed derived from `seed` and the generation. Differences between
+    the scores of a generation then come from the players alone, so fewer
+    repetitions rank them reliably, the scores do not depend on the number
+    of processes, and players that play the same way are scored once even
+    when the evaluation is stochastic.
+    """
 
     def __init__(self, player_class, params_kwargs, size, objective, output_filename,
                  bottleneck=None, mutation_probability=.1, opponents=None,
                  processes=1, weights=None,
-                 sample_count=None, population=None, print_output=True):
+                 sample_count=None, population=None, print_output=True,
+                 cache_size=1024, vectorize=True, chunksize=None,
+                 executor=None, granularity="player", block_size=None,
+                 racing=False, racing_confidence=None, output_format="csv",
+                 flush_interval=1, checkpoint_filename=None,
+                 checkpoint_interval=1, surrogate=None, seed=None,
+                 fidelity=None, batch_breeding=False):
         self.print_output = print_output
         self.player_class = player_class
         self.bottleneck = bottleneck
@@ -23,20 +111,18 @@ class Population(object):
         else:
             self.processes = processes
 
-        self.pool = Pool(processes=self.processes)
-
-        self.outputer = Outputer(output_filename, mode='a')
+        self.outputer = make_outputer(output_filename, output_format,
+                                      mode='a', flush_interval=flush_interval)
         self.size = size
-        self.objective = objective
         if not bottleneck:
             self.bottleneck = size // 4
         else:
             self.bottleneck = bottleneck
         if opponents is None:
-            self.opponents_information = [
+            opponents_information = [
                 PlayerInfo(s, {}) for s in axl.short_run_time_strategies]
         else:
-            self.opponents_information = [
+            opponents_information = [
                 PlayerInfo(p.__class__, p.init_kwargs) for p in opponents]
         self.generation = 0
 
@@ -49,21 +135,384 @@ class Population(object):
         else:
             self.population = [player_class(**params_kwargs) for _ in range(self.size)]
 
-        self.weights = weights
         self.sample_count = sample_count
 
-    def score_all(self):
-        starmap_params_zip = zip(
-            self.population,
-            repeat(self.objective),
-            repeat(self.opponents_information),
-            repeat(self.weights),
-            repeat(self.sample_count))
-        if self.processes == 1:
+        # Workers hold the objective and opponents, under the context_key of
+        # each evaluation, so that tasks only carry the serialized parameters
+        # of each player.
+        self.chunksize = chunksize
+        self.executor = executor
+        self._owns_executor = executor is None
+        self._installed = set()
+        if granularity not in ["player", "match"]:
+            raise ValueError("Granularity must be one of player or match")
+        self.granularity = granularity
+        self.block_size = block_size
+        self.vectorize = vectorize
+        self.racing = racing
+        self.racing_confidence = racing_confidence
+        self.matches_saved = 0
+        self.repetitions = 0
+        self.duplicates = 0
+        # The players of the population whose last score is the partial
+        # score of a race
+        self.incomplete = set()
+        self.checkpoint_filename = checkpoint_filename
+        self.checkpoint_interval = checkpoint_interval
+        self.surrogate = surrogate
+        self.seed = seed
+        if batch_breeding and genome_class(player_class) is None:
+            raise ValueError("{} can not be bred in batches".format(
+                player_class.__name__))
+        self.batch_breeding = batch_breeding
+
+        self.full_evaluation = self.evaluation(
+            objective, opponents_information, weights)
+        self.set_evaluation(self.full_evaluation)
+        self.cache = None
+        if cache_size and self.deterministic:
+            self.cache = FitnessCache(maxsize=cache_size)
+
+        self.fidelity = fidelity
+        self.fidelity_evaluations = {}
+        if fidelity is not None:
+            self.fidelity_evaluations[fidelity.levels - 1] = (
+                self.full_evaluation)
+            self.set_fidelity(fidelity.level)
+
+    def evaluation(self, objective, opponents_information, weights):
+        """Return the attributes players are scored with against the given
+        objective, opponents and weights."""
+        evaluation = {
+            "objective": objective,
+            "opponents_information": opponents_information,
+            "weights": weights,
+            "stochastic_opponents": stochastic_opponents(
+                opponents_information),
+            "opponents": OpponentPool(opponents_information),
+            "fingerprint": fingerprint(objective, opponents_information,
+                                       weights),
+            "context_key": uuid4().hex,
+            "compiled_opponents": None,
+        }
+        # Only deterministic evaluations can be cached or shared between
+        # duplicates: a stochastic one would give a different score if it
+        # were run again.
+        evaluation["deterministic"] = (
+            self.sample_count is None
+            and is_deterministic_objective(objective)
+            and not any(evaluation["stochastic_opponents"]))
+
+        # Deterministic matches between compiled players are played in a
+        # single batch by the match engine.
+        if self.vectorize and is_deterministic_objective(objective):
+            compiled_opponents = [
+                compile_player(strategy(**init_kwargs))
+                for strategy, init_kwargs in opponents_information]
+            if all(opponent is not None for opponent in compiled_opponents):
+                evaluation["compiled_opponents"] = compiled_opponents
+        return evaluation
+
+    def set_evaluation(self, evaluation):
+        """Score players with an evaluation given by `evaluation`."""
+        for name, value in evaluation.items():
+            setattr(self, name, value)
+
+    def set_fidelity(self, level):
+        """Score players at a level of the fidelity schedule."""
+        if level not in self.fidelity_evaluations:
+            full = self.full_evaluation
+            self.fidelity_evaluations[level] = self.evaluation(
+                *self.fidelity.evaluation(level, full["objective"],
+                                          full["opponents_information"],
+                                          full["weights"]))
+        self.set_evaluation(self.fidelity_evaluations[level])
+
+    def scoring_context(self):
+        return ScoringContext(self.player_class, self.objective,
+                              self.opponents_information, self.weights,
+                              self.sample_count)
+
+    def get_executor(self):
+        """Return the executor used to score players, starting a pool of
+        workers if needed."""
+        if self.executor is None:
+            self.executor = PoolExecutor(
+                processes=self.processes,
+                initializer=initialize_worker,
+                initargs=(self.context_key, self.scoring_context()))
+            self._installed.add(self.context_key)
+        if self.context_key not in self._installed:
+            # Send the context to the workers of a shared executor once, if
+            # it can; otherwise the tasks carry it when they are sent again.
+            self.executor.run_on_workers(initialize_worker, self.context_key,
+                                         self.scoring_context())
+            self._installed.add(self.context_key)
+        return self.executor
+
+    def close(self):
+        """Write the buffered output and stop the worker processes, unless
+        they belong to an executor that was passed in."""
+        self.outputer.close()
+        if self._owns_executor and self.executor is not None:
+            self.executor.close()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def cache_key(self, player):
+        """Return the fitness cache key of a player or None if its score can
+        not be cached."""
+        if (self.cache is None or not self.deterministic
+                or axl.Classifiers["stochastic"](player)):
+            return None
+        return fitness_key(player, self.fingerprint)
+
+    def phenotype_key(self, player):
+        """Return the key shared by the players that get the same score or
+        None if the score of a player can not be shared."""
+        if self.seed is None and (not self.deterministic or
+                                  axl.Classifiers["stochastic"](player)):
+            return None
+        return canonical_key(player)
+
+    def generation_seed(self):
+        """Return the seed of the common random numbers of the current
+        generation, or None without a seed."""
+        return derive_seed(self.seed, self.generation)
+
+    def score_all(self, players=None):
+        """Return the scores of players, by default the population. Players
+        other than the population are never raced."""
+        racing = self.racing and players is None
+        if players is None:
+            players = self.population
+        keys = [self.cache_key(player) for player in players]
+        scores = [None if key is None else self.cache.get(key)
+                  for key in keys]
+        indices = [i for i, score in enumerate(scores) if score is None]
+
+        # Only score the first of the players that play the same way
+        first, duplicates = {}, []
+        for i in indices:
+            phenotype = self.phenotype_key(players[i])
+            if phenotype is not None and phenotype in first:
+                duplicates.append((i, first[phenotype]))
+            elif phenotype is not None:
+                first[phenotype] = i
+        self.duplicates += len(duplicates)
+        skipped = {i for i, _ in duplicates}
+        indices = [i for i in indices if i not in skipped]
+
+        if self.compiled_opponents is not None:
+            compiled = [(i, compile_player(players[i])) for i in indices]
+            compiled = [(i, player) for i, player in compiled
+                        if player is not None]
+            compiled_scores = score_compiled_players(
+                [player for _, player in compiled], self.objective,
+                self.compiled_opponents, self.weights, self.sample_count,
+                seed=self.generation_seed())
+            for (i, _), score in zip(compiled, compiled_scores):
+                self.record_score(scores, keys, i, score)
+            self.repetitions += len(compiled) * (
+                self.sample_count or len(self.opponents_information))
+            indices = [i for i in indices if scores[i] is None]
+
+        incomplete = set()
+        if racing:
+            incomplete = self.race(scores, keys, indices)
+        else:
+            results = self.score_players([players[i] for i in indices])
+            for i, score in zip(indices, results):
+                self.record_score(scores, keys, i, score)
+        for i, j in duplicates:
+            scores[i] = scores[j]
+            if j in incomplete:
+                incomplete.add(i)
+        if players is self.population:
+            self.incomplete = incomplete
+        return scores
+
+    def record_score(self, scores, keys, i, score):
+        scores[i] = score
+        if keys[i] is not None:
+            self.cache.set(keys[i], score)
+
+    def score_players(self, players):
+        """Return the scores of players against all of the opponents."""
+        if self.executor is None and self.processes == 1:
+            starmap_params_zip = zip(
+                players,
+                repeat(self.objective),
+                repeat(self.opponents_information),
+                repeat(self.weights),
+                repeat(self.sample_count),
+                repeat(self.opponents),
+                repeat(self.generation_seed()),
+                repeat(True))
             results = list(starmap(score_player, starmap_params_zip))
+        elif self.granularity == "match":
+            return self.map_matches(players)
         else:
-            results = self.pool.starmap(score_player, starmap_params_zip)
-        return results
+            results = self.map_serialized(
+                players, function=partial(score_serialized_player,
+                                          return_repetitions=True))
+        self.repetitions += sum(repetitions for _, repetitions in results)
+        return [score for score, _ in results]
+
+    def race(self, scores, keys, indices):
+        """Score the players at indices, stopping early on those that can not
+        be among the `bottleneck` best.
+
+        Players carried over from the last generation come first in the
+        population and are scored in full until `bottleneck` scores are
+        known. The lowest of the best `bottleneck` scores is the threshold
+        the other players race against. In a single process the threshold
+        rises as players are scored; with workers it is fixed for the
+        generation.
+
+        Returns the indices of the players that were stopped early."""
+        known = [score for score in scores if score is not None]
+        num_full = max(0, self.bottleneck - len(known))
+        full, raced = indices[:num_full], indices[num_full:]
+        results = self.score_players([self.population[i] for i in full])
+        for i, score in zip(full, results):
+            self.record_score(scores, keys, i, score)
+
+        known = sorted((score for score in scores if score is not None),
+                       reverse=True)[:self.bottleneck]
+        threshold = float("-inf")
+        if len(known) == self.bottleneck:
+            threshold = known[-1]
+
+        players = [self.population[i] for i in raced]
+        if self.executor is None and self.processes == 1:
+            results = []
+            for player in players:
+                result = race_player(player, self.objective,
+                                     self.opponents_information, threshold,
+                                     weights=self.weights,
+                                     sample_count=self.sample_count,
+                                     confidence=self.racing_confidence,
+                                     opponents=self.opponents,
+                                     seed=self.generation_seed(),
+                                     return_repetitions=True)
+                results.append(result)
+                score, _, complete, _ = result
+                if complete and score > threshold:
+                    known = sorted(known + [score],
+                                   reverse=True)[:self.bottleneck]
+                    if len(known) == self.bottleneck:
+                        threshold = known[-1]
+        else:
+            results = self.map_serialized(
+                players, function=partial(race_serialized_player,
+                                          return_repetitions=True),
+                arguments=(threshold, self.racing_confidence,
+                           self.generation_seed()))
+
+        num_opponents = self.sample_count or len(self.opponents_information)
+        incomplete = set()
+        for i, (score, played, complete, repetitions) in zip(raced, results):
+            if complete:
+                self.record_score(scores, keys, i, score)
+            else:
+                scores[i] = score
+                incomplete.add(i)
+            self.matches_saved += num_opponents - played
+            self.repetitions += repetitions
+        return incomplete
+
+    def map_serialized(self, players, function=score_serialized_player,
+                       arguments=None):
+        """Score players in the workers of the executor.
+
+        Each task is (context_key, serialized player) + arguments + (context,)
+        (see `map_with_context`), the arguments being the seed of the
+        generation by default."""
+        if arguments is None:
+            arguments = (self.generation_seed(),)
+        executor = self.get_executor()
+        tasks = [(self.player_class.serialize_parameters(player),) + arguments
+                 for player in players]
+        return map_with_context(executor, function, self.context_key,
+                                self.scoring_context(), tasks,
+                                chunksize=self.chunksize)
+
+    def repetition_blocks(self, player, opponent_index):
+        """Return the repetitions of each task for a match, None meaning
+        the repetitions of the objective.
+
+        Adaptive repetitions (a target_standard_error) stop on the scores
+        seen so far and seeded repetitions are drawn from a single stream
+        per match, so neither is split."""
+        keywords = getattr(self.objective, "keywords", {})
+        repetitions = keywords.get("repetitions")
+        stochastic = (keywords.get("noise")
+                      or self.stochastic_opponents[opponent_index]
+                      or axl.Classifiers["stochastic"](player))
+        if not (self.block_size and repetitions and stochastic):
+            return [None]
+        if (keywords.get("target_standard_error") is not None
+                or self.seed is not None):
+            return [None]
+        return [min(self.block_size, repetitions - start)
+                for start in range(0, repetitions, self.block_size)]
+
+    def map_matches(self, players):
+        """Score players in the workers of the executor with one task per
+        player, opponent and block of repetitions.
+
+        Results come back in whatever order the tasks finish and are reduced
+        to the weighted mean of `score_player`. Chunks are handed out as
+        workers become free, and are sized so that each worker gets several."""
+        executor = self.get_executor()
+        seed = self.generation_seed()
+        tasks, selections = [], []
+        for p, player in enumerate(players):
+            serialized = self.player_class.serialize_parameters(player)
+            indices, weights = sample_opponents(
+                len(self.opponents_information), self.weights,
+                self.sample_count, seed)
+            selections.append(weights)
+            for position, j in enumerate(indices):
+                for repetitions in self.repetition_blocks(player, j):
+                    tasks.append(((p, position), serialized, j, repetitions,
+                                  derive_seed(seed, 1, position)))
+
+        scores = [[] for _ in tasks]
+        pending = list(range(len(tasks)))
+        context = None
+        while pending:
+            chunksize = self.chunksize or max(
+                1, len(pending) // (4 * executor.processes))
+            task_results = executor.imap_unordered(
+                score_match_block,
+                [(i, self.context_key) + tasks[i][1:] + (context,)
+                 for i in pending],
+                chunksize=chunksize)
+            pending = []
+            for i, task_scores in task_results:
+                if task_scores is None:
+                    pending.append(i)
+                else:
+                    scores[i] = task_scores
+            context = self.scoring_context()
+        self.repetitions += sum(len(task_scores) for task_scores in scores)
+
+        scores_for_all_opponents = [{} for _ in players]
+        for ((p, position), _, _, _, _), task_scores in zip(tasks, scores):
+            scores_for_all_opponents[p].setdefault(position, []).extend(
+                task_scores)
+        return [average_score([by_position[position]
+                               for position in sorted(by_position)],
+                              weights=weights)
+                for by_position, weights in zip(scores_for_all_opponents,
+                                                selections)]
 
     def subset_population(self, indices):
         population = []
@@ -71,6 +520,19 @@ class Population(object):
             population.append(self.population[i])
         self.population = population
 
+    def score_finalists(self, results):
+        """Score the `bottleneck` best players of the sorted (score, index)
+        results again with the full evaluation, and return their full
+        fidelity (score, index) pairs."""
+        indices = [i for _, i in results[:max(1, self.bottleneck)]]
+        level = self.fidelity.level
+        self.set_evaluation(self.full_evaluation)
+        try:
+            scores = self.score_all([self.population[i] for i in indices])
+        finally:
+            self.set_fidelity(level)
+        return list(zip(scores, indices))
+
     @staticmethod
     def crossover(population, num_variants):
         new_variants = []
@@ -90,23 +552,50 @@ class Population(object):
         scores = self.score_all()
         results = list(zip(scores, range(len(scores))))
         results.sort(key=itemgetter(0), reverse=True)
+        best_score, best = results[0]
+        finalists = None
+        if self.fidelity is not None and not self.fidelity.full:
+            finalists = self.score_finalists(results)
+            best_score, best = max(finalists, key=itemgetter(0))
 
         # Report
         if self.print_output:
-            print("Generation", self.generation, "| Best Score:", results[0][0])
+            print("Generation", self.generation, "| Best Score:", best_score)
 
         # Write the data
         # Note: if using this for analysis, for reproducibility it may be useful to
         # pass type(opponent) for each of the opponents. This will allow verification of results post run
 
-        row = [self.generation, mean(scores), pstdev(scores), results[0][0],
-               self.player_class.serialize_parameters(self.population[results[0][1]])]
+        row = [self.generation, mean(scores), pstdev(scores), best_score,
+               self.player_class.serialize_parameters(self.population[best])]
         self.outputer.write_row(row)
 
+        if self.surrogate is not None:
+            # The surrogate only learns complete full fidelity scores
+            if finalists is None:
+                finalists = [(score, i) for i, score in enumerate(scores)
+                             if i not in self.incomplete]
+            for score, i in finalists:
+                self.surrogate.add(self.population[i], score)
+        if self.fidelity is not None:
+            self.set_fidelity(self.fidelity.update(best_score))
+
         # Next Population
         indices_to_keep = [p for (s, p) in results[0: self.bottleneck]]
 
         self.subset_population(indices_to_keep)
+        if self.batch_breeding:
+            self.population += self.breed_batch()
+        else:
+            self.breed()
+
+        if (self.checkpoint_filename is not None
+                and self.generation % self.checkpoint_interval == 0):
+            self.save_checkpoint()
+
+    def breed(self):
+        """Add the children of the players kept from the last generation to
+        the population."""
         # Add mutants of the best players
         best_mutants = [p.clone() for p in self.population]
         for p in best_mutants:
@@ -118,11 +607,104 @@ class Population(object):
         players_to_modify += mutants
         # Crossover
         size_left = self.size - len(self.population)
-        players_to_modify = self.crossover(players_to_modify, size_left)
+        num_variants = size_left
+        if self.surrogate is not None:
+            num_variants *= self.surrogate.oversampling
+        players_to_modify = self.crossover(players_to_modify, num_variants)
         # Mutate
         players_to_modify = [p.mutate() for p in players_to_modify]
+        if self.surrogate is not None:
+            players_to_modify = self.surrogate.screen(players_to_modify,
+                                                      size_left)
         self.population += players_to_modify
 
+    def breed_batch(self):
+        """Return the children of the players kept from the last generation,
+        bred as in `breed` but in batches of genomes (see
+        `axelrod_dojo.genomes`)."""
+        elite = genome_class(self.player_class).from_players(self.population)
+        best_mutants = elite.mutate()
+        variants = random_genomes(self.player_class, self.params_kwargs,
+                                  self.bottleneck // 2)
+        parents = elite.concatenate(best_mutants).concatenate(variants)
+        size_left = max(0, self.size - 2 * len(elite))
+        num_variants = size_left
+        if self.surrogate is not None:
+            num_variants *= self.surrogate.oversampling
+        first = np.random.randint(len(parents), size=num_variants)
+        second = np.random.randint(len(parents), size=num_variants)
+        children = parents.crossover(first, second).mutate().to_players()
+        if self.surrogate is not None:
+            children = self.surrogate.screen(children, size_left)
+        return best_mutants.to_players() + children
+
+    def save_checkpoint(self, filename=None):
+        """Atomically write the state of the run to filename (by default the
+        checkpoint_filename). The output written so far is flushed first,
+        and its end is saved with the state."""
+        if filename is None:
+            filename = self.checkpoint_filename
+        output_position = self.outputer.tell()
+        # The players are restored from their parameters along with the
+        # state of their own random number generators.
+        player_random_states = [
+            player._random._random.get_state()
+            if hasattr(player, "_random") else None
+            for player in self.population]
+        state = {
+            "generation": self.generation,
+            "population": [self.player_class.serialize_parameters(player)
+                           for player in self.population],
+            "player_random_states": player_random_states,
+            "random_states": random_states(),
+            "matches_saved": self.matches_saved,
+            "repetitions": self.repetitions,
+            "cache": None,
+            "fidelity": self.fidelity,
+            "surrogate": self.surrogate,
+            "output_position": output_position,
+        }
+        if self.cache is not None:
+            state["cache"] = (self.fingerprint, self.cache.items())
+        write_atomically(filename, pickle.dumps(state))
+
+    def load_checkpoint(self, filename=None):
+        """Resume the run from a checkpoint written by `save_checkpoint`.
+
+        The rows written to the output after the checkpoint was saved are
+        removed, since the run writes them again. The cached scores are only
+        restored if they were computed against the same objective and
+        opponents."""
+        if filename is None:
+            filename = self.checkpoint_filename
+        with open(filename, 'rb') as checkpoint_file:
+            state = pickle.load(checkpoint_file)
+        self.generation = state["generation"]
+        self.population = [self.player_class.deserialize_parameters(params)
+                           for params in state["population"]]
+        for player, player_random_state in zip(
+                self.population, state["player_random_states"]):
+            if player_random_state is not None and hasattr(player, "_random"):
+                player._random._random.set_state(player_random_state)
+        set_random_states(state["random_states"])
+        self.matches_saved = state["matches_saved"]
+        self.repetitions = state.get("repetitions", 0)
+        if self.fidelity is not None and state.get("fidelity") is not None:
+            self.fidelity = state["fidelity"]
+            self.fidelity_evaluations = {
+                self.fidelity.levels - 1: self.full_evaluation}
+            self.set_fidelity(self.fidelity.level)
+        if self.surrogate is not None and state.get("surrogate") is not None:
+            self.surrogate = state["surrogate"]
+        if state.get("output_position") is not None:
+            self.outputer.truncate(state["output_position"])
+        if self.cache is not None and state["cache"] is not None:
+            cache_fingerprint, items = state["cache"]
+            if cache_fingerprint == self.fingerprint:
+                self.cache.clear()
+                for key, score in items:
+                    self.cache.set(key, score)
+
     def __iter__(self):
         return self
 
@@ -0,0 +1,207 @@
+from multiprocessing import cpu_count
+import os
+import random
+
+import numpy as np
+
+import axelrod as axl
+from axelrod_dojo.algorithms.evolutionary_algorithm import Population
+from axelrod_dojo.executors import PoolExecutor, SerialExecutor
+
+TOPOLOGIES = ["ring", "complete", "random"]
+
+
+def island_filename(filename, index):
+    """Return the output file of island `index`: data.csv becomes
+    data.island0.csv and so on."""
+    root, extension = os.path.splitext(filename)
+    return "{}.island{}{}".format(root, index, extension)
+
+
+def migration_targets(topology, num_islands, random_generator=random):
+    """Return, for each island, the list of islands it sends migrants to.
+
+    In a ring island i sends to island i + 1, in a complete topology every
+    island sends to all of the others and in a random one each island sends
+    to one other island drawn afresh at every migration."""
+    if topology not in TOPOLOGIES:
+        raise ValueError("Topology must be one of {}".format(
+            ", ".join(TOPOLOGIES)))
+    if num_islands < 2:
+        return [[] for _ in range(num_islands)]
+    if topology == "ring":
+        return [[(i + 1) % num_islands] for i in range(num_islands)]
+    if topology == "complete":
+        return [[j for j in range(num_islands) if j != i]
+                for i in range(num_islands)]
+    targets = []
+    for i in range(num_islands):
+        j = random_generator.randrange(num_islands - 1)
+        targets.append([j if j < i else j + 1])
+    return targets
+
+
+def _seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    module_random = getattr(axl, "_module_random", None)
+    if module_random is not None:
+        module_random.seed(seed)
+
+
+def evolve_island(task):
+    """Run an island for a number of generations in a worker.
+
+    The task is (settings, index, players, generation, generations, seed):
+    the keyword arguments of its Population, the index of the island, its
+    players (None to start from random players), the generations already
+    run and the number to run. Returns the players of the island after the
+    last generation, the best of the last scored generation first."""
+    settings, index, players, generation, generations, seed = task
+    _seed(seed)
+    settings = dict(settings)
+    if players is None:
+        players = [settings["player_class"](**settings["params_kwargs"])
+                   for _ in range(settings["size"])]
+    output_filename = island_filename(settings.pop("output_filename"), index)
+    with Population(population=players, output_filename=output_filename,
+                    print_output=False, processes=1, **settings) as island:
+        island.generation = generation
+        island.run(generations, print_output=False)
+        return island.population
+
+
+class Islands(object):
+    """Island model of the evolutionary algorithm.
+
+    `num_islands` populations of `size` players evolve independently, each
+    for `migration_interval` generations at a time in a worker of the
+    executor, and write their rows to their own output file (see
+    `island_filename`). Between these epochs the `migrants` best players of
+    each island are copied to the islands given by the topology ("ring",
+    "complete" or "random"), where they replace the last players of the
+    population (the crossovers and random variants of the generation to
+    come).
+
+    Only the players travel between the workers, so the islands run with
+    little synchronization, and with a seed each island is seeded for every
+    epoch which makes runs reproducible whatever the number of workers.
+    """
+
+    def __init__(self, player_class, params_kwargs, size, objective,
+                 output_filename, num_islands=4, topology="ring",
+                 migration_interval=5, migrants=1, bottleneck=None,
+                 mutation_probability=.1, opponents=None, processes=None,
+                 weights=None, sample_count=None, print_output=True,
+                 executor=None, seed=None, output_format="csv",
+                 flush_interval=1):
+        if topology not in TOPOLOGIES:
+            raise ValueError("Topology must be one of {}".format(
+                ", ".join(TOPOLOGIES)))
+        if not bottleneck:
+            bottleneck = size // 4
+        sources = 1 if topology != "complete" else num_islands - 1
+        if migrants * sources > size - bottleneck:
+            raise ValueError(
+                "Islands can receive at most size - bottleneck migrants")
+        if migration_interval < 1:
+            raise ValueError("The migration interval must be at least 1")
+        self.player_class = player_class
+        self.size = size
+        self.num_islands = num_islands
+        self.topology = topology
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.output_filename = output_filename
+        self.print_output = print_output
+        if "mutation_probability" not in params_kwargs:
+            params_kwargs["mutation_probability"] = mutation_probability
+        self.params_kwargs = params_kwargs
+        if processes is None:
+            processes = num_islands
+        self.processes = processes or cpu_count()
+        self.executor = executor
+        self._owns_executor = executor is None
+        self._random = random.Random(seed)
+        self.generation = 0
+
+        self.settings = {
+            "player_class": player_class,
+            "params_kwargs": params_kwargs,
+            "size": size,
+            "objective": objective,
+            "output_filename": output_filename,
+            "bottleneck": bottleneck,
+            "opponents": opponents,
+            "weights": weights,
+            "sample_count": sample_count,
+            "output_format": output_format,
+            "flush_interval": flush_interval,
+        }
+        # The first players of each island are drawn in its worker.
+        self.islands = [None] * num_islands
+
+    def get_executor(self):
+        """Return the executor running the islands, starting a pool of
+        workers if needed."""
+        if self.executor is None:
+            if self.processes == 1:
+                self.executor = SerialExecutor()
+            else:
+                self.executor = PoolExecutor(
+                    processes=min(self.processes, self.num_islands))
+        return self.executor
+
+    def close(self):
+        """Stop the worker processes, unless they belong to an executor that
+        was passed in."""
+        if self._owns_executor and self.executor is not None:
+            self.executor.close()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def evolve(self, generations=None):
+        """Run every island for `generations` (by default the migration
+        interval) and then migrate."""
+        if generations is None:
+            generations = self.migration_interval
+        tasks = [(self.settings, index, players, self.generation, generations,
+                  self._random.randrange(2 ** 32))
+                 for index, players in enumerate(self.islands)]
+        self.islands = list(self.get_executor().map(evolve_island, tasks,
+                                                    chunksize=1))
+        self.generation += generations
+        if self.print_output:
+            print("Islands migrating at generation {}".format(self.generation))
+        self.migrate()
+
+    def migrate(self):
+        """Replace the last players of each island with copies of the best
+        players of the islands sending to it."""
+        targets = migration_targets(self.topology, self.num_islands,
+                                    self._random)
+        arrivals = [[] for _ in self.islands]
+        for source, destinations in enumerate(targets):
+            emigrants = self.islands[source][:self.migrants]
+            for destination in destinations:
+                for player in emigrants:
+                    migrant = player.clone()
+                    migrant.set_seed(self._random.randrange(2 ** 32))
+                    arrivals[destination].append(migrant)
+        for players, immigrants in zip(self.islands, arrivals):
+            if immigrants:
+                players[-len(immigrants):] = immigrants
+
+    def run(self, generations, print_output=True):
+        """Run the islands for `generations`, migrating every migration
+        interval."""
+        self.print_output = print_output
+        while generations > 0:
+            epoch = min(self.migration_interval, generations)
+            self.evolve(epoch)
+            generations -= epoch
@@ -1,15 +1,36 @@
 from multiprocessing import cpu_count
+import pickle
+from uuid import uuid4
 import axelrod as axl
-import pyswarm
+import numpy as np
+from axelrod_dojo.executors import PoolExecutor
+from axelrod_dojo.match_engine import compile_player
 from axelrod_dojo.utils import score_player
-from axelrod_dojo.utils import PlayerInfo
+from axelrod_dojo.utils import (OpponentPool, PlayerInfo, ScoringContext,
+                                initialize_worker, is_deterministic_objective,
+                                map_with_context, random_states,
+                                score_compiled_players, score_vector,
+                                set_random_states, write_atomically)
 
 
 class PSO(object):
-    """PSO class that implements a particle swarm optimization algorithm."""
+    """PSO class that implements a particle swarm optimization algorithm.
+
+    `score_vectors` scores many particles at once, in a pool of `processes`
+    workers or in the workers of an `executor` (as for Population), and
+    `swarm` runs the built in `synchronous_swarm` so that the particles of
+    each iteration are scored together.
+
+    With a `checkpoint_filename` the state of the swarm (the positions,
+    velocities and best positions of the particles and the states of the
+    random number generators) is saved after every iteration, and
+    `load_checkpoint` resumes the swarm where the checkpoint was saved.
+    """
     def __init__(self, player_class, params_kwargs, objective, opponents=None,
                  population=1, generations=1, debug=True, phip=0.8, phig=0.8,
-                 omega=0.8, weights=None, sample_count=None, processes=1):
+                 omega=0.8, weights=None, sample_count=None, processes=1,
+                 executor=None, chunksize=None, vectorize=True,
+                 checkpoint_filename=None):
 
         self.player_class = player_class
         self.params_kwargs = params_kwargs
@@ -20,6 +41,7 @@ class PSO(object):
         else:
             self.opponents_information = [
                     PlayerInfo(p.__class__, p.init_kwargs) for p in opponents]
+        self.opponents = OpponentPool(self.opponents_information)
         self.population = population
         self.generations = generations
         self.debug = debug
@@ -33,33 +55,197 @@ class PSO(object):
         else:
             self.processes = processes
 
+        self.chunksize = chunksize
+        self.context_key = uuid4().hex
+        self.executor = executor
+        self._owns_executor = executor is None
+        self._installed = False
+        self.checkpoint_filename = checkpoint_filename
+        self.iteration = 0
+        # The state of the swarm to resume from, set by load_checkpoint
+        self._swarm_state = None
+
+        # Deterministic matches between compiled players are played in a
+        # single batch by the match engine.
+        self.compiled_opponents = None
+        if vectorize and is_deterministic_objective(objective):
+            compiled_opponents = [
+                compile_player(strategy(**init_kwargs))
+                for strategy, init_kwargs in self.opponents_information]
+            if all(opponent is not None for opponent in compiled_opponents):
+                self.compiled_opponents = compiled_opponents
+
+    def scoring_context(self):
+        return ScoringContext(self.player_class, self.objective,
+                              self.opponents_information, self.weights,
+                              self.sample_count, self.params_kwargs)
+
+    def get_executor(self):
+        """Return the executor used to score particles, starting a pool of
+        workers if needed."""
+        if self.executor is None:
+            self.executor = PoolExecutor(
+                processes=self.processes,
+                initializer=initialize_worker,
+                initargs=(self.context_key, self.scoring_context()))
+            self._installed = True
+        if not self._installed:
+            self.executor.run_on_workers(initialize_worker, self.context_key,
+                                         self.scoring_context())
+            self._installed = True
+        return self.executor
+
+    def score_vectors(self, vectors):
+        """Return the score of the player given by each vector.
+
+        Deterministic players are scored in a single batch by the match
+        engine when the objective allows it (as in `Population.score_all`),
+        the others in the workers."""
+        players = []
+        for vector in vectors:
+            player = self.player_class(**self.params_kwargs)
+            player.receive_vector(vector=vector)
+            players.append(player)
+        scores = [None] * len(players)
+        indices = list(range(len(players)))
+
+        if self.compiled_opponents is not None:
+            compiled = [(i, compile_player(player))
+                        for i, player in enumerate(players)]
+            compiled = [(i, player) for i, player in compiled
+                        if player is not None]
+            compiled_scores = score_compiled_players(
+                [player for _, player in compiled], self.objective,
+                self.compiled_opponents, self.weights, self.sample_count)
+            for (i, _), score in zip(compiled, compiled_scores):
+                scores[i] = score
+            indices = [i for i in indices if scores[i] is None]
+
+        if self.executor is None and self.processes == 1:
+            for i in indices:
+                scores[i] = score_player(
+                    players[i], objective=self.objective,
+                    opponents_information=self.opponents_information,
+                    weights=self.weights, sample_count=self.sample_count,
+                    opponents=self.opponents)
+        elif indices:
+            results = map_with_context(
+                self.get_executor(), score_vector, self.context_key,
+                self.scoring_context(), [(vectors[i],) for i in indices],
+                chunksize=self.chunksize)
+            for i, score in zip(indices, results):
+                scores[i] = score
+        return scores
+
+    def close(self):
+        """Stop the worker processes, unless they belong to an executor that
+        was passed in."""
+        if self._owns_executor and self.executor is not None:
+            self.executor.close()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def swarm(self):
+        """Return the best vector found and minus its score.
+
+        The swarm is run by `synchronous_swarm`, which scores all the
+        particles of an iteration at once: in a single batch by the match
+        engine when they can be compiled, otherwise one at a time with a
+        single process or in the workers."""
+        return self.synchronous_swarm()
+
+    def synchronous_swarm(self, minstep=1e-8, minfunc=1e-8):
+        """Run the particle swarm with the updates of pyswarm, except that
+        every particle of an iteration moves with the best position of the
+        swarm from the previous iteration, so that the particles of an
+        iteration are scored as a single batch by `score_vectors`.
+
+        The search stops after `generations` iterations, or as soon as the
+        best position of the swarm improves by less than minfunc in score or
+        minstep in position. Returns the best vector and minus its score."""
         player = self.player_class(**self.params_kwargs)
         lb, ub = player.create_vector_bounds()
+        lb, ub = np.array(lb), np.array(ub)
+        vhigh = np.abs(ub - lb)
+        vlow = -vhigh
 
-        def objective_function(vector):
-            player.receive_vector(vector=vector)
-
-            return -score_player(player, objective=self.objective,
-                                 opponents_information=self.opponents_information,
-                                 weights=self.weights,
-                                 sample_count=self.sample_count
-                                 )
-
-        # TODO remove check once v 0.7 is pip installable
-        # There is a multiprocessing version (0.7) of pyswarm available at
-        # https://github.com/tisimst/pyswarm, just pass processes=X
-        # Pip installs version 0.6
-        if pyswarm.__version__ == "0.7":
-            xopt, fopt = pyswarm.pso(objective_function, lb, ub,
-                                     swarmsize=self.population,
-                                     maxiter=self.generations, debug=self.debug,
-                                     phip=self.phip, phig=self.phig,
-                                     omega=self.omega, processes=self.processes)
+        if self._swarm_state is not None:
+            state, self._swarm_state = self._swarm_state, None
+            x, v, p, fp = state["x"], state["v"], state["p"], state["fp"]
+            g, fg = state["g"], state["fg"]
+            if state["converged"]:
+                return g, fg
         else:
-            xopt, fopt = pyswarm.pso(objective_function, lb, ub,
-                                     swarmsize=self.population,
-                                     maxiter=self.generations, debug=self.debug,
-                                     phip=self.phip, phig=self.phig,
-                                     omega=self.omega)
-        return xopt, fopt
+            size, dimension = self.population, len(lb)
+            x = lb + np.random.rand(size, dimension) * (ub - lb)
+            v = vlow + np.random.rand(size, dimension) * (vhigh - vlow)
+            p = x.copy()
+            fp = -np.array(self.score_vectors(list(x)))
+            best = np.argmin(fp)
+            g, fg = p[best].copy(), fp[best]
+            self.iteration = 0
+            if self.checkpoint_filename is not None:
+                self.save_checkpoint(x, v, p, fp, g, fg)
+        size, dimension = x.shape
+
+        for iteration in range(self.iteration + 1, self.generations + 1):
+            rp = np.random.uniform(size=(size, dimension))
+            rg = np.random.uniform(size=(size, dimension))
+            v = (self.omega * v + self.phip * rp * (p - x)
+                 + self.phig * rg * (g - x))
+            x = np.clip(x + v, lb, ub)
+            fx = -np.array(self.score_vectors(list(x)))
+
+            improved = fx < fp
+            p[improved] = x[improved]
+            fp[improved] = fx[improved]
+
+            best = np.argmin(fp)
+            converged = False
+            if fp[best] < fg:
+                if self.debug:
+                    print('New best for swarm at iteration {:}: {:} {:}'.format(
+                        iteration, p[best], fp[best]))
+                stepsize = np.sqrt(np.sum((g - p[best]) ** 2))
+                converged = (np.abs(fg - fp[best]) <= minfunc
+                             or stepsize <= minstep)
+                g, fg = p[best].copy(), fp[best]
+            self.iteration = iteration
+            if self.checkpoint_filename is not None:
+                self.save_checkpoint(x, v, p, fp, g, fg, converged)
+            if converged:
+                break
+            if self.debug:
+                print('Best after iteration {:}: {:} {:}'.format(
+                    iteration, g, fg))
+        return g, fg
+
+    def save_checkpoint(self, x, v, p, fp, g, fg, converged=False,
+                        filename=None):
+        """Atomically write the state of `synchronous_swarm` after the
+        current iteration to filename (by default the checkpoint_filename):
+        the positions x, velocities v and best positions p (with minus
+        their scores fp) of the particles and the best position g of the
+        swarm (with minus its score fg)."""
+        if filename is None:
+            filename = self.checkpoint_filename
+        state = {"iteration": self.iteration, "x": x, "v": v, "p": p,
+                 "fp": fp, "g": g, "fg": fg, "converged": converged,
+                 "random_states": random_states()}
+        write_atomically(filename, pickle.dumps(state))
+
+    def load_checkpoint(self, filename=None):
+        """Resume the swarm from a checkpoint written by `save_checkpoint`:
+        the next call to `swarm` goes on from the saved iteration."""
+        if filename is None:
+            filename = self.checkpoint_filename
+        with open(filename, 'rb') as checkpoint_file:
+            state = pickle.load(checkpoint_file)
+        self.iteration = state["iteration"]
+        set_random_states(state["random_states"])
+        self._swarm_state = state
@@ -0,0 +1,167 @@
+from functools import partial
+from queue import Queue
+from random import randrange
+from statistics import mean, pstdev
+
+from axelrod_dojo.algorithms.evolutionary_algorithm import Population
+from axelrod_dojo.executors import SerialExecutor
+from axelrod_dojo.utils import score_serialized_player
+
+# Options of Population that the steady state algorithm does not implement,
+# with their default values.
+UNSUPPORTED_OPTIONS = {"granularity": "player", "block_size": None,
+                       "racing": False, "racing_confidence": None,
+                       "checkpoint_filename": None, "surrogate": None,
+                       "fidelity": None, "batch_breeding": False}
+
+
+class SteadyStatePopulation(Population):
+    """Asynchronous steady state variant of the evolutionary algorithm.
+
+    Rather than scoring a whole generation before selecting, a player is
+    sent to a worker as soon as one is free: when a score comes back the
+    player joins the population (replacing the worst player if it scores
+    better) and a child of the current elite, the `bottleneck` best players,
+    is bred and sent in its place. `pending` tasks (by default twice the
+    number of workers) are kept in flight so that a slow evaluation never
+    stalls the others.
+
+    A generation is `size` evaluations: a row is written to the output after
+    each of them, with the statistics of the current population.
+
+    The other arguments are those of `Population`; players are always scored
+    in the workers of the executor (in this process if there is just one),
+    so the vectorized match engine is not used. The options in
+    UNSUPPORTED_OPTIONS (granularity, racing, checkpoints, a surrogate, a
+    fidelity schedule and batch breeding) raise ValueError.
+    """
+
+    def __init__(self, *args, pending=None, **kwargs):
+        for name, default in UNSUPPORTED_OPTIONS.items():
+            if kwargs.get(name, default) != default:
+                raise ValueError(
+                    "SteadyStatePopulation does not support {}".format(name))
+        super().__init__(*args, **kwargs)
+        self.pending = pending
+        # The population holds the scored players, the initial players are
+        # scored first.
+        self.unscored = self.population
+        self.population = []
+        self.scores = []
+        self.evaluations = 0
+
+    def get_executor(self):
+        if self.executor is None and self.processes == 1:
+            self.executor = SerialExecutor()
+        return super().get_executor()
+
+    def elite(self):
+        """Return the `bottleneck` best players scored so far."""
+        ranked = sorted(range(len(self.scores)), key=self.scores.__getitem__,
+                        reverse=True)
+        return [self.population[i] for i in ranked[:self.bottleneck]]
+
+    def breed(self):
+        """Return a mutated crossover of two parents, drawn from the elite and
+        (as for the random variants of `Population.evolve`) fresh players."""
+        elite = self.elite()
+        if not elite:
+            return self.player_class(**self.params_kwargs)
+        candidates = len(elite) + self.bottleneck // 2
+
+        def parent():
+            i = randrange(candidates)
+            if i < len(elite):
+                return elite[i].clone()
+            return self.player_class(**self.params_kwargs)
+
+        return parent().crossover(parent()).mutate()
+
+    def insert(self, player, score):
+        """Add a scored player to the population, replacing the worst player
+        once the population is full if the new player scores better."""
+        if len(self.population) < self.size:
+            self.population.append(player)
+            self.scores.append(score)
+            return
+        worst = min(range(len(self.scores)), key=self.scores.__getitem__)
+        if score > self.scores[worst]:
+            self.population[worst] = player
+            self.scores[worst] = score
+
+    def write_generation(self):
+        self.generation += 1
+        best = max(range(len(self.scores)), key=self.scores.__getitem__)
+        if self.print_output:
+            print("Generation", self.generation, "| Best Score:",
+                  self.scores[best])
+        row = [self.generation, mean(self.scores), pstdev(self.scores),
+               self.scores[best],
+               self.player_class.serialize_parameters(self.population[best])]
+        self.outputer.write_row(row)
+
+    def evolve(self, evaluations=None):
+        """Score `evaluations` players (by default `size`), breeding each new
+        player as soon as a worker is free.
+
+        The initial players that have not been scored yet are sent first."""
+        if evaluations is None:
+            evaluations = self.size
+        executor = self.get_executor()
+        pending = self.pending or 2 * executor.processes
+        results = Queue()
+        in_flight = {}
+        submitted = 0
+        token = 0
+
+        def submit(player, context=None):
+            nonlocal token
+            token += 1
+            in_flight[token] = player
+            key = self.cache_key(player)
+            if key is not None and key in self.cache:
+                results.put((token, (self.cache.get(key), 0), None))
+                return
+            task = (self.context_key,
+                    self.player_class.serialize_parameters(player),
+                    self.generation_seed(), context)
+            executor.submit(
+                partial(score_serialized_player, return_repetitions=True),
+                task,
+                callback=lambda result, token=token: results.put(
+                    (token, result, None)),
+                error_callback=lambda error, token=token: results.put(
+                    (token, None, error)))
+
+        def next_player():
+            if self.unscored:
+                return self.unscored.pop(0)
+            return self.breed()
+
+        while submitted < min(pending, evaluations):
+            submitted += 1
+            submit(next_player())
+        while in_flight:
+            finished, result, error = results.get()
+            if error is not None:
+                raise error
+            player = in_flight.pop(finished)
+            if result is None:
+                # The worker does not have the scoring context yet
+                submit(player, context=self.scoring_context())
+                continue
+            score, repetitions = result
+            self.repetitions += repetitions
+            key = self.cache_key(player)
+            if key is not None:
+                self.cache.set(key, score)
+            self.insert(player, score)
+            self.evaluations += 1
+            if self.evaluations % self.size == 0:
+                self.write_generation()
+            if submitted < evaluations:
+                submitted += 1
+                submit(next_player())
+
+    def __next__(self):
+        self.evolve()
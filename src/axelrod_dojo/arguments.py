@@ -1,3 +1,5 @@
+import os
+
 from docopt import docopt
 from .utils import prepare_objective
 from .algorithms.evolutionary_algorithm import Population
@@ -23,15 +25,20 @@ def parse_arguments(doc, version=None):
         "repetitions": int(arguments['--repetitions']),
         "turns": int(arguments['--turns']),
         "noise": float(arguments['--noise']),
-        "nmoran": int(arguments['--nmoran'])
+        "nmoran": int(arguments['--nmoran']),
+        "target_standard_error": None,
     }
+    if arguments.get('--target_standard_error'):
+        algorithm_arguments["target_standard_error"] = float(
+            arguments['--target_standard_error'])
 
     objective = prepare_objective(
         algorithm_arguments["name"],
         algorithm_arguments["turns"],
         algorithm_arguments["noise"],
         algorithm_arguments["repetitions"],
-        algorithm_arguments["nmoran"]
+        algorithm_arguments["nmoran"],
+        target_standard_error=algorithm_arguments["target_standard_error"]
     )
 
     return arguments, algorithm, algorithm_arguments, objective
@@ -44,20 +51,27 @@ def invoke_training(doc, version, player_class, player_kwargs_func):
 
     # Evolutionary Algorithm
     if algorithm == "ea":
-        population = Population(
-            player_class,
-            player_kwargs,
-            algorithm_arguments["population"],
-            objective,
-            algorithm_arguments["output_filename"],
-            algorithm_arguments["bottleneck"],
-            algorithm_arguments["mutation_probability"],
-            processes=algorithm_arguments["processes"])
+        checkpoint = arguments.get('--checkpoint')
+        with Population(
+                player_class,
+                player_kwargs,
+                algorithm_arguments["population"],
+                objective,
+                algorithm_arguments["output_filename"],
+                algorithm_arguments["bottleneck"],
+                algorithm_arguments["mutation_probability"],
+                processes=algorithm_arguments["processes"],
+                checkpoint_filename=checkpoint) as population:
 
-        population.run(algorithm_arguments["generations"])
+            # Resume an interrupted run
+            if checkpoint is not None and os.path.exists(checkpoint):
+                population.load_checkpoint()
+                print("Resuming from generation", population.generation)
+            population.run(
+                algorithm_arguments["generations"] - population.generation)
 
-        # Get the best member of the population to output.
-        scores = population.score_all()
+            # Get the best member of the population to output.
+            scores = population.score_all()
         record, record_holder = 0, -1
         for i, s in enumerate(scores):
             if s >= record:
@@ -67,13 +81,21 @@ def invoke_training(doc, version, player_class, player_kwargs_func):
 
     # Particle Swarm Algorithm
     elif algorithm == "ps":
-        pso = PSO(player_class,
-                  player_kwargs,
-                  objective=objective,
-                  population=algorithm_arguments["population"],
-                  generations=algorithm_arguments["generations"]
-                  )
-        xopt_helper, fopt = pso.swarm()
+        checkpoint = arguments.get('--checkpoint')
+        with PSO(player_class,
+                 player_kwargs,
+                 objective=objective,
+                 population=algorithm_arguments["population"],
+                 generations=algorithm_arguments["generations"],
+                 processes=algorithm_arguments["processes"],
+                 checkpoint_filename=checkpoint
+                 ) as pso:
+
+            # Resume an interrupted run
+            if checkpoint is not None and os.path.exists(checkpoint):
+                pso.load_checkpoint()
+                print("Resuming from iteration", pso.iteration)
+            xopt_helper, fopt = pso.swarm()
         xopt = player_class(**player_kwargs)
         # xopt.read_vector(xopt_helper, num_states)
 
@@ -0,0 +1,115 @@
+"""
+Canonical forms of the players that the dojo trains.
+
+Different genomes often describe the same behaviour: a finite state machine
+with unreachable states or with its states numbered in another order, two
+machines with equivalent states, or a cycle that repeats itself. Two players
+with the same canonical key play the same way against every opponent, so a
+population only needs to score one of them.
+"""
+from collections import deque
+
+import axelrod as axl
+from axelrod.action import Action
+from axelrod.strategies.cycler import Cycler
+from axelrod.strategies.finite_state_machines import FSMPlayer
+
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = Action.C, Action.D
+
+
+def reachable_states(state_transitions, initial_state):
+    """Return the states reachable from the initial state, in breadth first
+    order following the opponent playing C before D."""
+    order = [initial_state]
+    seen = {initial_state}
+    queue = deque(order)
+    while queue:
+        state = queue.popleft()
+        for coplay in (C, D):
+            next_state = state_transitions[(state, coplay)][0]
+            if next_state not in seen:
+                seen.add(next_state)
+                order.append(next_state)
+                queue.append(next_state)
+    return order
+
+
+def minimize_fsm(state_transitions, states):
+    """Return a map from each of the states to the block of equivalent states
+    it belongs to (states that play the same way from then on).
+
+    The blocks are refined from the actions played in each state until the
+    states of a block move to the same blocks."""
+    blocks = {state: tuple(state_transitions[(state, coplay)][1]
+                           for coplay in (C, D))
+              for state in states}
+    while True:
+        signatures = {
+            state: (blocks[state],) + tuple(
+                blocks[state_transitions[(state, coplay)][0]]
+                for coplay in (C, D))
+            for state in states}
+        numbers = {}
+        refined = {state: numbers.setdefault(signature, len(numbers))
+                   for state, signature in signatures.items()}
+        if len(numbers) == len(set(blocks.values())):
+            return refined
+        blocks = refined
+
+
+def canonical_fsm(transitions, initial_state, initial_action):
+    """Return the canonical (transitions, initial_state, initial_action) of a
+    finite state machine.
+
+    Unreachable states are pruned, equivalent states merged and the states
+    that are left are numbered in the breadth first order in which they are
+    reached from the initial state, which becomes state 0."""
+    state_transitions = {(row[0], row[1]): (row[2], row[3])
+                         for row in transitions}
+    states = reachable_states(state_transitions, initial_state)
+    blocks = minimize_fsm(state_transitions, states)
+
+    # One representative of each block, in the order the blocks are reached
+    representatives = {}
+    for state in states:
+        representatives.setdefault(blocks[state], state)
+    block_transitions = {
+        (block, coplay): (blocks[state_transitions[(state, coplay)][0]],
+                          state_transitions[(state, coplay)][1])
+        for block, state in representatives.items() for coplay in (C, D)}
+    order = reachable_states(block_transitions, blocks[initial_state])
+    labels = {block: label for label, block in enumerate(order)}
+    rows = tuple((labels[block], coplay,
+                  labels[block_transitions[(block, coplay)][0]],
+                  block_transitions[(block, coplay)][1])
+                 for block in order for coplay in (C, D))
+    return rows, 0, initial_action
+
+
+def canonical_cycle(cycle):
+    """Return the shortest cycle that repeats to the given one."""
+    length = len(cycle)
+    for period in range(1, length + 1):
+        if length % period == 0 and cycle[:period] * (length // period) == cycle:
+            return cycle[:period]
+    return cycle
+
+
+def canonical_key(player):
+    """Return a hashable key that is the same for players that play the same
+    way: the canonical form of a deterministic finite state machine or cycle
+    and otherwise the serialized parameters of the player."""
+    if not axl.Classifiers["stochastic"](player):
+        if isinstance(player, EvolvablePFSMPlayer):
+            return ("fsm",) + canonical_fsm(player.action_transitions(),
+                                            player.initial_state,
+                                            player.initial_action)
+        if isinstance(player, FSMPlayer):
+            return ("fsm",) + canonical_fsm(player.fsm.transitions(),
+                                            player.initial_state,
+                                            player.initial_action)
+        if isinstance(player, Cycler):
+            return "cycle", canonical_cycle(player.cycle)
+    return type(player).__name__, player.serialize_parameters()
@@ -0,0 +1,256 @@
+from multiprocessing import Pool, cpu_count
+
+try:
+    from distributed import Client, LocalCluster, WorkerPlugin, as_completed
+except ImportError:  # pragma: no cover
+    Client = None
+    WorkerPlugin = object
+
+
+def _run_all(setups):
+    for function, args in setups:
+        function(*args)
+
+
+def _apply_chunk(function, chunk):
+    return [function(item) for item in chunk]
+
+
+def _chunks(items, chunksize):
+    chunksize = max(1, chunksize or 1)
+    return [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+
+class SerialExecutor(object):
+    """Executor that runs every task in the calling process."""
+
+    processes = 1
+
+    def map(self, function, iterable, chunksize=None):
+        return list(map(function, iterable))
+
+    def imap_unordered(self, function, iterable, chunksize=1):
+        return map(function, iterable)
+
+    def submit(self, function, argument, callback, error_callback=None):
+        """Call callback(function(argument)), or error_callback with the
+        exception it raised."""
+        try:
+            result = function(argument)
+        except Exception as error:
+            if error_callback is None:
+                raise
+            error_callback(error)
+        else:
+            callback(result)
+
+    def run_on_workers(self, function, *args):
+        """Run function(*args) in every worker, including those that start
+        later. Returns False if that is not possible."""
+        function(*args)
+        return True
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PoolExecutor(object):
+    """
+    Executor backed by a multiprocessing pool.
+
+    The pool is only started by the first call to `map` and is kept warm
+    until `close` is called, so a single PoolExecutor can be shared by many
+    Population instances (for example across a hyperparameter sweep).
+    """
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        if not processes:
+            processes = cpu_count()
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self._setups = []
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            setups = list(self._setups)
+            if self.initializer is not None:
+                setups.insert(0, (self.initializer, self.initargs))
+            self._pool = Pool(processes=self.processes,
+                              initializer=_run_all, initargs=(setups,))
+        return self._pool
+
+    def map(self, function, iterable, chunksize=None):
+        return self.pool.map(function, iterable, chunksize=chunksize)
+
+    def imap_unordered(self, function, iterable, chunksize=1):
+        return self.pool.imap_unordered(function, iterable,
+                                        chunksize=chunksize)
+
+    def submit(self, function, argument, callback, error_callback=None):
+        """Run function(argument) in a worker and call callback with the
+        result (or error_callback with the exception) in a thread of this
+        process as soon as it is done."""
+        self.pool.apply_async(function, (argument,), callback=callback,
+                              error_callback=error_callback)
+
+    def run_on_workers(self, function, *args):
+        """Run function(*args) in every worker when the pool starts. Returns
+        False if the pool is already running."""
+        if self._pool is not None:
+            return False
+        self._setups.append((function, args))
+        return True
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # A running pool can't be pickled; a copy starts its own when needed.
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+
+class _RunOnWorkers(WorkerPlugin):
+    """Worker plugin calling function(*args) on every dask worker."""
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+
+    def setup(self, worker):
+        self.function(*self.args)
+
+
+class DaskExecutor(object):
+    """
+    Executor backed by a dask.distributed cluster.
+
+    Connects to the scheduler at address, or uses client, or else starts a
+    LocalCluster of `processes` single threaded worker processes (which
+    needs no network access). As for PoolExecutor the cluster is only
+    started by the first call to `map` and stopped by `close`; a client or
+    scheduler that was passed in is left running.
+
+    `run_on_workers` registers a worker plugin, so that the scoring context
+    of a Population is sent once to every worker, including the workers
+    that join the cluster later. The plugins are unregistered by `close`,
+    so that they do not pile up on a long lived cluster.
+    """
+
+    def __init__(self, address=None, processes=None, client=None):
+        if Client is None:
+            raise ImportError("DaskExecutor requires dask.distributed")
+        self.address = address
+        self.requested_processes = processes or cpu_count()
+        self._client = client
+        self._owns_client = client is None
+        self._cluster = None
+        self._submitted = set()
+        self._plugins = set()
+
+    @property
+    def client(self):
+        if self._client is None:
+            if self.address is not None:
+                self._client = Client(self.address)
+            else:
+                self._cluster = LocalCluster(
+                    n_workers=self.requested_processes, threads_per_worker=1,
+                    processes=True, dashboard_address=None)
+                self._client = Client(self._cluster)
+        return self._client
+
+    @property
+    def processes(self):
+        """The number of threads of the workers in the cluster."""
+        if self._client is None and self.address is None:
+            return self.requested_processes
+        return max(1, sum(self.client.nthreads().values()))
+
+    def submit_chunks(self, function, iterable, chunksize):
+        items = list(iterable)
+        chunks = _chunks(items, chunksize)
+        return self.client.map(_apply_chunk, [function] * len(chunks), chunks,
+                               pure=False)
+
+    def map(self, function, iterable, chunksize=None):
+        futures = self.submit_chunks(function, iterable, chunksize)
+        return [result for chunk in self.client.gather(futures)
+                for result in chunk]
+
+    def imap_unordered(self, function, iterable, chunksize=1):
+        futures = self.submit_chunks(function, iterable, chunksize)
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+    def submit(self, function, argument, callback, error_callback=None):
+        """Run function(argument) on a worker and call callback with the
+        result (or error_callback with the exception) in a thread of this
+        process as soon as it is done."""
+        future = self.client.submit(function, argument, pure=False)
+        # Dask cancels the futures that are no longer referenced.
+        self._submitted.add(future)
+
+        def done(future):
+            self._submitted.discard(future)
+            if future.status == "error":
+                if error_callback is not None:
+                    error_callback(future.exception())
+            elif future.status == "finished":
+                callback(future.result())
+
+        future.add_done_callback(done)
+
+    def run_on_workers(self, function, *args):
+        """Run function(*args) on every worker, including those that join
+        later.
+
+        The plugin is named after the function and its first argument (the
+        key of `initialize_worker`), so that running the function again
+        with the same key replaces the plugin rather than adding one."""
+        name = "axelrod_dojo-{}.{}".format(function.__module__,
+                                           function.__qualname__)
+        if args:
+            name += "-{}".format(args[0])
+        self.client.register_plugin(_RunOnWorkers(function, args), name=name)
+        self._plugins.add(name)
+        return True
+
+    def close(self):
+        self._submitted.clear()
+        if self._client is not None:
+            for name in self._plugins:
+                self._client.unregister_worker_plugin(name)
+        self._plugins.clear()
+        if self._owns_client and self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._cluster is not None:
+            self._cluster.close()
+            self._cluster = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,154 @@
+"""
+Multi-fidelity evaluation: scoring players cheaply while a run explores.
+
+A `FidelitySchedule` is a list of levels, each scoring players against a
+fraction of the opponents (a stratified sample, see `stratified_sample`)
+and with a fraction of the turns and repetitions of the objective. The last
+level is the full evaluation. A Population with a schedule starts at the
+first level and moves up a level whenever the best full fidelity score has
+not improved for `patience` generations (or after `max_generations` at a
+level), while its finalists, the `bottleneck` best players of each
+generation, are always scored again in full before the best of them is
+written to the output.
+"""
+from functools import partial
+import math
+import random
+
+import axelrod as axl
+
+
+def opponent_strata(opponents_information):
+    """Return the indices of the opponents grouped into strata of opponents
+    that are alike: stochastic or not and with the same memory depth."""
+    strata = {}
+    for index, (strategy, init_kwargs) in enumerate(opponents_information):
+        opponent = strategy(**init_kwargs)
+        key = (axl.Classifiers["stochastic"](opponent),
+               axl.Classifiers["memory_depth"](opponent))
+        strata.setdefault(key, []).append(index)
+    return list(strata.values())
+
+
+def stratified_sample(strata, num, random_generator=random):
+    """Return the sorted indices of num opponents drawn without replacement
+    from the strata, and their weights.
+
+    Every stratum gets an opponent if there are enough to go round and the
+    others are shared out in proportion to the sizes of the strata. Each
+    opponent drawn from a stratum is weighted by the size of the stratum
+    over the number drawn, so that the weighted mean of the scores against
+    the sample estimates the mean against all of the opponents."""
+    num = min(num, sum(len(stratum) for stratum in strata))
+    counts = [1 if num >= len(strata) else 0 for _ in strata]
+    while sum(counts) < num:
+        i = max((i for i, stratum in enumerate(strata)
+                 if counts[i] < len(stratum)),
+                key=lambda i: len(strata[i]) / (counts[i] + 1))
+        counts[i] += 1
+    sample = []
+    for stratum, count in zip(strata, counts):
+        if not count:
+            continue
+        for index in random_generator.sample(stratum, count):
+            sample.append((index, len(stratum) / count))
+    sample.sort()
+    return [index for index, _ in sample], [weight for _, weight in sample]
+
+
+class FidelitySchedule(object):
+    """Levels of fidelity of the evaluation of a Population.
+
+    Level i plays `opponent_fractions[i]` of the opponents,
+    `turn_fractions[i]` of the turns and `repetition_fractions[i]` of the
+    repetitions of the objective; the last level must be the full evaluation.
+    The sample of opponents of each level is drawn once, from seed.
+    """
+
+    def __init__(self, opponent_fractions=(.25, .5, 1.),
+                 turn_fractions=(.25, .5, 1.),
+                 repetition_fractions=(.25, .5, 1.), patience=3,
+                 max_generations=None, seed=None):
+        levels = len(opponent_fractions)
+        if not levels or any(len(fractions) != levels for fractions in
+                             [turn_fractions, repetition_fractions]):
+            raise ValueError(
+                "Every fraction of a fidelity schedule needs one value per "
+                "level")
+        for fractions in [opponent_fractions, turn_fractions,
+                          repetition_fractions]:
+            if any(not 0 < fraction <= 1 for fraction in fractions):
+                raise ValueError("Fidelity fractions must be in (0, 1]")
+            if fractions[-1] != 1:
+                raise ValueError(
+                    "The last level of a fidelity schedule must be the full "
+                    "evaluation")
+        if patience < 1:
+            raise ValueError("Patience must be at least 1")
+        self.opponent_fractions = tuple(opponent_fractions)
+        self.turn_fractions = tuple(turn_fractions)
+        self.repetition_fractions = tuple(repetition_fractions)
+        self.patience = patience
+        self.max_generations = max_generations
+        self.levels = levels
+        self.level = 0
+        self.best = None
+        self.stalled = 0
+        self.generations = 0
+        self.samples = {}
+        self._random = random.Random(seed)
+
+    @property
+    def full(self):
+        """Whether the current level is the full evaluation."""
+        return self.level == self.levels - 1
+
+    def objective(self, level, objective):
+        """Return the objective with the turns and repetitions of a level.
+        Objectives that are not partial functions are left as they are."""
+        keywords = getattr(objective, "keywords", None)
+        if keywords is None:
+            return objective
+        changes = {}
+        if keywords.get("turns"):
+            changes["turns"] = max(1, round(
+                keywords["turns"] * self.turn_fractions[level]))
+        if keywords.get("repetitions"):
+            changes["repetitions"] = max(1, math.ceil(
+                keywords["repetitions"] * self.repetition_fractions[level]))
+        return partial(objective.func, *objective.args,
+                       **dict(keywords, **changes))
+
+    def evaluation(self, level, objective, opponents_information,
+                   weights=None):
+        """Return the (objective, opponents_information, weights) players are
+        scored with at a level."""
+        if level not in self.samples:
+            num = max(1, round(len(opponents_information)
+                               * self.opponent_fractions[level]))
+            self.samples[level] = stratified_sample(
+                opponent_strata(opponents_information), num, self._random)
+        indices, sample_weights = self.samples[level]
+        if weights is not None:
+            sample_weights = [weights[i] * weight
+                              for i, weight in zip(indices, sample_weights)]
+        return (self.objective(level, objective),
+                [opponents_information[i] for i in indices], sample_weights)
+
+    def update(self, score):
+        """Record the full fidelity score of the best player of a generation
+        and return the level the next generation is scored at."""
+        self.generations += 1
+        if self.best is None or score > self.best:
+            self.best = score
+            self.stalled = 0
+        else:
+            self.stalled += 1
+        if not self.full and (
+                self.stalled >= self.patience or
+                (self.max_generations is not None and
+                 self.generations >= self.max_generations)):
+            self.level += 1
+            self.stalled = 0
+            self.generations = 0
+        return self.level
@@ -0,0 +1,424 @@
+"""
+Batched genomes: a whole population of finite state machines, probabilistic
+finite state machines or lookup tables held in NumPy arrays.
+
+Breeding players one at a time with `clone`, `mutate` and `crossover` is a
+serial phase of every generation on the main process. The genome classes
+here breed all of the children of a generation with a few array operations,
+following the same rules as the evolvable players of the Axelrod library,
+and only build Player objects with `to_players` when they are needed.
+
+Actions are stored as 0 for C and 1 for D, and the actions of probabilistic
+machines as the probability of playing C.
+"""
+import numpy as np
+
+import axelrod as axl
+from axelrod.action import Action
+from axelrod.strategies.lookerup import create_lookup_table_keys
+
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = Action.C, Action.D
+ACTIONS = (C, D)
+
+
+class FSMGenomes(object):
+    """Finite state machines of `num_states` states.
+
+    `tables` has shape (size, 2 * num_states, 2): row state * 2 + opponent
+    action (0 for C, 1 for D) of each machine holds the next state and the
+    action played. `initial_states` and `initial_actions` have shape (size,).
+    """
+
+    dtype = np.int64
+
+    def __init__(self, tables, initial_states, initial_actions,
+                 player_class=axl.EvolvableFSMPlayer, mutation_probability=.1,
+                 random_state=None):
+        tables = np.asarray(tables, dtype=self.dtype)
+        if tables.ndim != 3 or tables.shape[1] % 2 or tables.shape[2] != 2:
+            raise ValueError(
+                "FSM tables must have shape (size, 2 * num_states, 2)")
+        self.tables = tables
+        self.initial_states = np.asarray(initial_states, dtype=np.int64)
+        self.initial_actions = np.asarray(initial_actions, dtype=np.int64)
+        self.player_class = player_class
+        self.mutation_probability = mutation_probability
+        self.random_state = np.random if random_state is None else random_state
+
+    @property
+    def num_states(self):
+        return self.tables.shape[1] // 2
+
+    def __len__(self):
+        return len(self.tables)
+
+    def settings(self):
+        """Return the keyword arguments, other than the arrays, of these
+        genomes."""
+        return {"player_class": self.player_class,
+                "mutation_probability": self.mutation_probability,
+                "random_state": self.random_state}
+
+    def new(self, tables, initial_states, initial_actions):
+        """Return genomes with the settings of these ones."""
+        return type(self)(tables, initial_states, initial_actions,
+                          **self.settings())
+
+    @staticmethod
+    def random_actions(rng, shape):
+        """Return random values of the action column of the tables."""
+        return rng.randint(2, size=shape)
+
+    @classmethod
+    def random(cls, size, num_states, random_state=None, **settings):
+        """Return `size` random machines."""
+        rng = np.random if random_state is None else random_state
+        tables = np.stack([rng.randint(num_states,
+                                       size=(size, 2 * num_states)),
+                           cls.random_actions(rng, (size, 2 * num_states))],
+                          axis=2)
+        return cls(tables, rng.randint(num_states, size=size),
+                   rng.randint(2, size=size), random_state=random_state,
+                   **settings)
+
+    @staticmethod
+    def encode(action):
+        """Return the value in the tables of the action of a transition."""
+        return action.value
+
+    @staticmethod
+    def decode(value):
+        """Return the action of a transition from its value in the tables."""
+        return ACTIONS[int(value)]
+
+    @classmethod
+    def player_settings(cls, player):
+        """Return the settings of the genomes of a player."""
+        return {"player_class": type(player),
+                "mutation_probability": player.mutation_probability}
+
+    @classmethod
+    def from_players(cls, players, random_state=None):
+        """Return the genomes of FSM players, which must all have the same
+        number of states."""
+        tables, initial_states, initial_actions = [], [], []
+        for player in players:
+            rows = sorted(player.fsm.transitions(),
+                          key=lambda row: (row[0], row[1].value))
+            tables.append([(row[2], cls.encode(row[3])) for row in rows])
+            initial_states.append(player.initial_state)
+            initial_actions.append(player.initial_action.value)
+        if len({len(table) for table in tables}) > 1:
+            raise ValueError("All players must have the same number of states")
+        return cls(tables, initial_states, initial_actions,
+                   random_state=random_state,
+                   **cls.player_settings(players[0]))
+
+    def take(self, indices):
+        """Return the genomes at indices."""
+        return self.new(self.tables[indices], self.initial_states[indices],
+                        self.initial_actions[indices])
+
+    def concatenate(self, other):
+        """Return these genomes followed by other."""
+        return self.new(np.concatenate([self.tables, other.tables]),
+                        np.concatenate([self.initial_states,
+                                        other.initial_states]),
+                        np.concatenate([self.initial_actions,
+                                        other.initial_actions]))
+
+    def mutate_actions(self, actions):
+        """Return the action column of the tables with each action flipped
+        with the mutation probability."""
+        flips = self.random_state.random_sample(actions.shape)
+        return actions ^ (flips < self.mutation_probability)
+
+    def mutate(self):
+        """Return a mutant of every machine.
+
+        As for `EvolvableFSMPlayer.mutate` each action of the table is
+        mutated (see `mutate_actions`), half of the machines swap the rows of
+        two distinct states, the initial action flips with a tenth of the
+        mutation probability and the initial state is drawn again with a
+        tenth of it over the number of states."""
+        rng = self.random_state
+        size, num_states = len(self), self.num_states
+        p = self.mutation_probability
+        tables = self.tables.copy()
+        tables[:, :, 1] = self.mutate_actions(tables[:, :, 1])
+
+        if num_states > 1:
+            swapping = np.flatnonzero(rng.random_sample(size) < .5)
+            n1 = rng.randint(num_states, size=len(swapping))
+            n2 = rng.randint(num_states - 1, size=len(swapping))
+            n2 += n2 >= n1
+            for opponent_action in (0, 1):
+                rows1 = 2 * n1 + opponent_action
+                rows2 = 2 * n2 + opponent_action
+                first = tables[swapping, rows1].copy()
+                tables[swapping, rows1] = tables[swapping, rows2]
+                tables[swapping, rows2] = first
+
+        initial_actions = self.initial_actions ^ (
+            rng.random_sample(size) < p / 10)
+        initial_states = np.where(
+            rng.random_sample(size) < p / (10 * num_states),
+            rng.randint(num_states, size=size), self.initial_states)
+        return self.new(tables, initial_states, initial_actions)
+
+    def crossover(self, first, second):
+        """Return the children of the pairs of machines at indices first and
+        second: the rows of the states before a random state come from the
+        first parent, the others from the second, and the initial state and
+        action from the first."""
+        first, second = np.asarray(first), np.asarray(second)
+        cross_points = 2 * self.random_state.randint(self.num_states,
+                                                     size=len(first))
+        from_first = (np.arange(2 * self.num_states)[None, :]
+                      < cross_points[:, None])
+        tables = np.where(from_first[:, :, None], self.tables[first],
+                          self.tables[second])
+        return self.new(tables, self.initial_states[first],
+                        self.initial_actions[first])
+
+    def transitions(self, index):
+        """Return the transitions of the machine at index."""
+        return tuple((row // 2, ACTIONS[row % 2], int(next_state),
+                      self.decode(action))
+                     for row, (next_state, action)
+                     in enumerate(self.tables[index].tolist()))
+
+    def player_kwargs(self):
+        """Return the keyword arguments of the players, other than their
+        machines."""
+        return {"mutation_probability": self.mutation_probability}
+
+    def to_players(self, indices=None):
+        """Return the players of the genomes at indices, by default all."""
+        if indices is None:
+            indices = range(len(self))
+        return [self.player_class(
+                    transitions=self.transitions(i),
+                    initial_state=int(self.initial_states[i]),
+                    initial_action=ACTIONS[self.initial_actions[i]],
+                    **self.player_kwargs())
+                for i in indices]
+
+
+class PFSMGenomes(FSMGenomes):
+    """Probabilistic finite state machines of `EvolvablePFSMPlayer`.
+
+    The tables are those of `FSMGenomes` except that the second column holds
+    the probability of playing C. As for `EvolvablePFSMPlayer.mutate` a
+    mutation adds Gaussian noise of standard deviation `mutation_distance` to
+    a probability, clipped to [0, 1].
+    """
+
+    dtype = np.float64
+
+    def __init__(self, tables, initial_states, initial_actions,
+                 player_class=EvolvablePFSMPlayer, mutation_probability=.1,
+                 mutation_distance=.1, random_state=None):
+        super().__init__(tables, initial_states, initial_actions,
+                         player_class=player_class,
+                         mutation_probability=mutation_probability,
+                         random_state=random_state)
+        self.mutation_distance = mutation_distance
+
+    def settings(self):
+        return dict(super().settings(),
+                    mutation_distance=self.mutation_distance)
+
+    @staticmethod
+    def random_actions(rng, shape):
+        return rng.random_sample(shape)
+
+    @staticmethod
+    def encode(probability):
+        return probability
+
+    @staticmethod
+    def decode(value):
+        return value
+
+    @classmethod
+    def player_settings(cls, player):
+        return dict(super().player_settings(player),
+                    mutation_distance=player.mutation_distance)
+
+    def mutate_actions(self, actions):
+        """Return the probabilities with Gaussian noise added to each of them
+        with the mutation probability."""
+        rng = self.random_state
+        mutated = rng.random_sample(actions.shape) < self.mutation_probability
+        noise = rng.normal(0, self.mutation_distance, size=actions.shape)
+        return np.clip(actions + mutated * noise, 0, 1)
+
+    def player_kwargs(self):
+        return dict(super().player_kwargs(),
+                    mutation_distance=self.mutation_distance)
+
+
+class LookupGenomes(object):
+    """Lookup tables with the given (plays, op_plays, op_start_plays)
+    parameters.
+
+    `tables` has shape (size, keys): the action for each key of
+    `create_lookup_table_keys`, and `initial_actions` has shape (size,
+    depth), the depth being the largest of the parameters. The mutation
+    probability defaults to 2 over the number of keys, as for
+    `EvolvableLookerUp`.
+    """
+
+    def __init__(self, tables, initial_actions, parameters,
+                 player_class=axl.EvolvableLookerUp, mutation_probability=None,
+                 random_state=None):
+        self.parameters = tuple(parameters)
+        self.keys = create_lookup_table_keys(*self.parameters)
+        tables = np.asarray(tables, dtype=np.int64)
+        if tables.ndim != 2 or tables.shape[1] != len(self.keys):
+            raise ValueError("Lookup tables must have shape (size, {})".format(
+                len(self.keys)))
+        self.tables = tables
+        self.initial_actions = np.asarray(
+            initial_actions, dtype=np.int64).reshape(len(tables), -1)
+        self.player_class = player_class
+        if mutation_probability is None:
+            mutation_probability = 2. / len(self.keys)
+        self.mutation_probability = mutation_probability
+        self.random_state = np.random if random_state is None else random_state
+
+    def __len__(self):
+        return len(self.tables)
+
+    def new(self, tables, initial_actions):
+        """Return genomes with the settings of these ones."""
+        return type(self)(tables, initial_actions, self.parameters,
+                          player_class=self.player_class,
+                          mutation_probability=self.mutation_probability,
+                          random_state=self.random_state)
+
+    @classmethod
+    def random(cls, size, parameters, player_class=axl.EvolvableLookerUp,
+               mutation_probability=None, initial_actions=None,
+               random_state=None):
+        """Return `size` random lookup tables. As for `EvolvableLookerUp`
+        the initial actions are random unless given, in which case they are
+        cut down, or padded with C, to the depth of the tables."""
+        rng = np.random if random_state is None else random_state
+        num_keys = len(create_lookup_table_keys(*parameters))
+        depth = max(parameters)
+        tables = rng.randint(2, size=(size, num_keys))
+        if initial_actions:
+            values = [action.value for action in initial_actions][:depth]
+            values += [C.value] * (depth - len(values))
+            initial_actions = np.tile(values, (size, 1))
+        else:
+            initial_actions = rng.randint(2, size=(size, depth))
+        return cls(tables, initial_actions, parameters,
+                   player_class=player_class,
+                   mutation_probability=mutation_probability,
+                   random_state=random_state)
+
+    @classmethod
+    def from_players(cls, players, random_state=None):
+        """Return the genomes of lookup players, which must all have the
+        same parameters."""
+        first = players[0]
+        parameters = first.init_kwargs["parameters"]
+        keys = create_lookup_table_keys(*parameters)
+        tables, initial_actions = [], []
+        for player in players:
+            if tuple(player.init_kwargs["parameters"]) != tuple(parameters):
+                raise ValueError("All players must have the same parameters")
+            tables.append([player.lookup_dict[key].value for key in keys])
+            initial_actions.append([action.value
+                                    for action in player.initial_actions])
+        return cls(tables, initial_actions, parameters,
+                   player_class=type(first),
+                   mutation_probability=first.mutation_probability,
+                   random_state=random_state)
+
+    def take(self, indices):
+        """Return the genomes at indices."""
+        return self.new(self.tables[indices], self.initial_actions[indices])
+
+    def concatenate(self, other):
+        """Return these genomes followed by other."""
+        return self.new(np.concatenate([self.tables, other.tables]),
+                        np.concatenate([self.initial_actions,
+                                        other.initial_actions]))
+
+    def mutate(self):
+        """Return a mutant of every table: as for `EvolvableLookerUp.mutate`
+        each action of the table and each initial action flips with the
+        mutation probability."""
+        rng = self.random_state
+        p = self.mutation_probability
+        tables = self.tables ^ (rng.random_sample(self.tables.shape) < p)
+        initial_actions = self.initial_actions ^ (
+            rng.random_sample(self.initial_actions.shape) < p)
+        return self.new(tables, initial_actions)
+
+    def crossover(self, first, second):
+        """Return the children of the pairs of tables at indices first and
+        second: the actions of the keys before a random key come from the
+        first parent, the others from the second, and the initial actions
+        from the first."""
+        first, second = np.asarray(first), np.asarray(second)
+        cross_points = self.random_state.randint(len(self.keys),
+                                                 size=len(first))
+        from_first = (np.arange(len(self.keys))[None, :]
+                      < cross_points[:, None])
+        tables = np.where(from_first, self.tables[first], self.tables[second])
+        return self.new(tables, self.initial_actions[first])
+
+    def to_players(self, indices=None):
+        """Return the players of the genomes at indices, by default all."""
+        if indices is None:
+            indices = range(len(self))
+        return [self.player_class(
+                    pattern=tuple(ACTIONS[a] for a in self.tables[i].tolist()),
+                    parameters=self.parameters,
+                    initial_actions=tuple(
+                        ACTIONS[a] for a in self.initial_actions[i].tolist()),
+                    mutation_probability=self.mutation_probability)
+                for i in indices]
+
+
+def genome_class(player_class):
+    """Return the genome class of a player class, or None if its players
+    can not be bred in batches."""
+    for base, genomes in [(axl.EvolvableFSMPlayer, FSMGenomes),
+                          (EvolvablePFSMPlayer, PFSMGenomes),
+                          (axl.EvolvableLookerUp, LookupGenomes)]:
+        if issubclass(player_class, base):
+            return genomes
+    return None
+
+
+def random_genomes(player_class, params_kwargs, size, random_state=None):
+    """Return `size` random genomes of players built from params_kwargs, as
+    the keyword arguments of player_class."""
+    genomes = genome_class(player_class)
+    mutation_probability = params_kwargs.get("mutation_probability")
+    if genomes in (FSMGenomes, PFSMGenomes):
+        names = ["mutation_probability"]
+        if genomes is PFSMGenomes:
+            names.append("mutation_distance")
+        settings = {name: params_kwargs[name] for name in names
+                    if params_kwargs.get(name) is not None}
+        return genomes.random(size, params_kwargs["num_states"],
+                              player_class=player_class,
+                              random_state=random_state, **settings)
+    if genomes is LookupGenomes:
+        return LookupGenomes.random(size, params_kwargs["parameters"],
+                                    player_class=player_class,
+                                    mutation_probability=mutation_probability,
+                                    initial_actions=params_kwargs.get(
+                                        "initial_actions"),
+                                    random_state=random_state)
+    raise ValueError("{} can not be bred in batches".format(
+        player_class.__name__))
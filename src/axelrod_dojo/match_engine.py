@@ -0,0 +1,422 @@
+"""
+A fast path for noise free matches between deterministic players.
+
+The players that the dojo trains (finite state machines, cyclers and lookup
+tables) and a handful of simple opponents are compiled to Moore machines: an
+array holding the action played in each state and an array of next states
+indexed by the current state and the action of the opponent. A match between
+two compiled players is then a pure function of their tables and many matches
+can be played at once with NumPy.
+
+Players that can not be compiled are reported by `compile_player` returning
+None so that callers can fall back to `axelrod.Match`.
+
+Opponents whose moves do not depend on the moves of the player (cycles and
+open loop state machines) can be replaced by a `ReplayPlayer` that plays
+their precomputed sequence of moves, with or without noise.
+"""
+from collections import deque, OrderedDict
+
+import numpy as np
+import axelrod as axl
+from axelrod.action import Action, str_to_actions
+from axelrod.evolvable_player import EvolvablePlayer
+from axelrod.strategies.cycler import Cycler
+from axelrod.strategies.finite_state_machines import FSMPlayer
+from axelrod.strategies.lookerup import LookerUp
+from axelrod.player import Player
+
+from axelrod_dojo.canonical import canonical_key
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = Action.C, Action.D
+
+# Compilation gives up on players with more (Moore) states than this.
+MAX_STATES = 4096
+
+# Machines of evolvable players recently compiled by `play_match`, by
+# canonical key: an objective plays one player against many opponents.
+_compiled_players = OrderedDict()
+MAX_COMPILED_PLAYERS = 64
+
+
+class CompiledPlayer(object):
+    """A deterministic player represented as a Moore machine.
+
+    actions[s] is the action (0 for C and 1 for D) played in state s and
+    transitions[s, a] is the state after the opponent played action a.
+    """
+
+    def __init__(self, actions, transitions, initial_state=0):
+        self.actions = np.asarray(actions, dtype=np.intp)
+        self.transitions = np.asarray(transitions, dtype=np.intp).reshape(-1, 2)
+        self.initial_state = initial_state
+
+    @property
+    def num_states(self):
+        return len(self.actions)
+
+
+def build_machine(initial, action, step):
+    """Enumerate the reachable states of a player into a CompiledPlayer.
+
+    `initial` is a hashable description of the state of the player before the
+    first turn, `action(state)` is the action played in a state and
+    `step(state, play, coplay)` is the state after a turn. Returns None if
+    there are more than MAX_STATES reachable states.
+    """
+    index = {initial: 0}
+    queue = deque([initial])
+    actions, transitions = [], []
+    while queue:
+        state = queue.popleft()
+        play = action(state)
+        actions.append(play.value)
+        row = []
+        for coplay in (C, D):
+            next_state = step(state, play, coplay)
+            if next_state not in index:
+                if len(index) == MAX_STATES:
+                    return None
+                index[next_state] = len(index)
+                queue.append(next_state)
+            row.append(index[next_state])
+        transitions.append(row)
+    return CompiledPlayer(actions, transitions)
+
+
+def _fsm_state_transitions(player):
+    """Return the state transitions of a deterministic finite state machine
+    player, with the actions played (rather than the probabilities of a
+    probabilistic machine)."""
+    if isinstance(player, EvolvablePFSMPlayer):
+        return {(state, coplay): (next_state, action)
+                for state, coplay, next_state, action
+                in player.action_transitions()}
+    return player.fsm.state_transitions
+
+
+def _compile_fsm(player):
+    state_transitions = _fsm_state_transitions(player)
+
+    def step(state, play, coplay):
+        return state_transitions[(state[0], coplay)]
+
+    initial = (player.initial_state, player.initial_action)
+    return build_machine(initial, action=lambda state: state[1], step=step)
+
+
+def _compile_cycler(player):
+    cycle = [action.value for action in str_to_actions(player.cycle)]
+    length = len(cycle)
+    transitions = [[(i + 1) % length] * 2 for i in range(length)]
+    return CompiledPlayer(cycle, transitions)
+
+
+def _compile_lookerup(player):
+    lookup = player._lookup
+    initial_actions = tuple(player._initial_actions_pool)
+    depth = len(initial_actions)
+
+    def tail(plays, play, length):
+        if length == 0:
+            return ()
+        return (plays + (play,))[-length:]
+
+    def action(state):
+        turn, plays, op_plays, op_openings = state
+        if turn < depth:
+            return initial_actions[turn]
+        return lookup.get(plays, op_plays, op_openings)
+
+    def step(state, play, coplay):
+        turn, plays, op_plays, op_openings = state
+        if len(op_openings) < lookup.op_openings_depth:
+            op_openings += (coplay,)
+        return (min(turn + 1, depth),
+                tail(plays, play, lookup.player_depth),
+                tail(op_plays, coplay, lookup.op_depth),
+                op_openings)
+
+    return build_machine((0, (), (), ()), action=action, step=step)
+
+
+class ReplayPlayer(Player):
+    """Plays the moves in prefix and then repeats the moves in cycle,
+    whatever its opponent plays."""
+
+    name = "Replay"
+    classifier = {
+        "memory_depth": float("inf"),
+        "stochastic": False,
+        "long_run_time": False,
+        "inspects_source": False,
+        "manipulates_source": False,
+        "manipulates_state": False,
+    }
+
+    def __init__(self, prefix=(), cycle=(C,), name="Replay"):
+        Player.__init__(self)
+        self.prefix = tuple(prefix)
+        self.cycle = tuple(cycle)
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def strategy(self, opponent):
+        turn = len(self.history)
+        if turn < len(self.prefix):
+            return self.prefix[turn]
+        return self.cycle[(turn - len(self.prefix)) % len(self.cycle)]
+
+
+def _compile_replay(player):
+    actions = [action.value for action in player.prefix + player.cycle]
+    length = len(actions)
+    transitions = [[i + 1] * 2 for i in range(length - 1)]
+    transitions.append([len(player.prefix)] * 2)
+    return CompiledPlayer(actions, transitions)
+
+
+def open_loop_moves(player):
+    """Return the moves (prefix, cycle) of a player whose moves do not
+    depend on those of its opponent, or None for any other player.
+
+    Only players whose moves do not depend on their own history either are
+    recognised, so that the moves are the same in a noisy match."""
+    if axl.Classifiers["stochastic"](player):
+        return None
+    strategy = type(player).strategy
+    if strategy == axl.Cooperator.strategy:
+        return (), (C,)
+    if strategy == axl.Defector.strategy:
+        return (), (D,)
+    if strategy == Cycler.strategy:
+        return (), tuple(str_to_actions(player.cycle))
+    if strategy in (FSMPlayer.strategy, EvolvablePFSMPlayer.strategy):
+        machine = _compile_fsm(player)
+        if machine is None or (machine.transitions[:, 0]
+                               != machine.transitions[:, 1]).any():
+            return None
+        # Follow the states until one repeats
+        visits, state = {}, machine.initial_state
+        while state not in visits:
+            visits[state] = len(visits)
+            state = machine.transitions[state, 0]
+        moves = [Action(machine.actions[s]) for s in visits]
+        return tuple(moves[:visits[state]]), tuple(moves[visits[state]:])
+    return None
+
+
+def replay_player(player):
+    """Return a ReplayPlayer playing the moves of an open loop player, or
+    None if the moves of the player depend on the play."""
+    moves = open_loop_moves(player)
+    if moves is None:
+        return None
+    prefix, cycle = moves
+    return ReplayPlayer(prefix, cycle, name=str(player))
+
+
+# Simple opponents, keyed on their strategy method.
+_MACHINES = {
+    axl.Cooperator.strategy: ([C.value], [[0, 0]]),
+    axl.Defector.strategy: ([D.value], [[0, 0]]),
+    axl.TitForTat.strategy: ([C.value, D.value], [[0, 1], [0, 1]]),
+    axl.Grudger.strategy: ([C.value, D.value], [[0, 1], [1, 1]]),
+    axl.Alternator.strategy: ([C.value, D.value], [[1, 1], [0, 0]]),
+}
+
+_COMPILERS = {
+    FSMPlayer.strategy: _compile_fsm,
+    EvolvablePFSMPlayer.strategy: _compile_fsm,
+    Cycler.strategy: _compile_cycler,
+    LookerUp.strategy: _compile_lookerup,
+    ReplayPlayer.strategy: _compile_replay,
+}
+
+
+def compile_player(player):
+    """Compile a player to a CompiledPlayer or return None if it can't be."""
+    if axl.Classifiers["stochastic"](player):
+        return None
+    strategy = type(player).strategy
+    if strategy in _MACHINES:
+        return CompiledPlayer(*_MACHINES[strategy])
+    if strategy in _COMPILERS:
+        return _COMPILERS[strategy](player)
+    return None
+
+
+def can_compile(player):
+    """Return whether `compile_player` may compile a player, from its type
+    alone: a player for which this is True can still fail to compile (if it
+    has too many states)."""
+    if axl.Classifiers["stochastic"](player):
+        return False
+    strategy = type(player).strategy
+    return strategy in _MACHINES or strategy in _COMPILERS
+
+
+def cached_compile_player(player):
+    """Return `compile_player(player)`, with the machines of evolvable
+    players cached by canonical key."""
+    if not isinstance(player, EvolvablePlayer):
+        return compile_player(player)
+    key = canonical_key(player)
+    if key in _compiled_players:
+        _compiled_players.move_to_end(key)
+        return _compiled_players[key]
+    machine = compile_player(player)
+    _compiled_players[key] = machine
+    while len(_compiled_players) > MAX_COMPILED_PLAYERS:
+        _compiled_players.popitem(last=False)
+    return machine
+
+
+def payoff_matrix(game=None):
+    """Return the payoffs of the row player indexed by (play, coplay)."""
+    if game is None:
+        game = axl.Game()
+    R, P, S, T = game.RPST()
+    return np.array([[R, S], [T, P]])
+
+
+def play_match(player, opponent, turns, game=None):
+    """Play a single noise free match between two players.
+
+    Returns the total payoffs of the player and of the opponent, or None if
+    either of them can not be compiled. The opponent is checked first (see
+    `can_compile`) so that nothing is compiled when it can not be, and the
+    machines of evolvable players are cached.
+
+    The pair of machine states determines all of the remaining play, so as
+    soon as it repeats the rest of the match is a repetition of the cycle
+    since its last visit and the totals are completed in closed form. With
+    integer payoffs this gives exactly the totals of playing every turn.
+    """
+    if not (can_compile(opponent) and can_compile(player)):
+        return None
+    opponent = cached_compile_player(opponent)
+    if opponent is None:
+        return None
+    player = cached_compile_player(player)
+    if player is None:
+        return None
+    payoffs = payoff_matrix(game)
+    detect_cycles = np.issubdtype(payoffs.dtype, np.integer)
+    payoffs = payoffs.tolist()
+    actions, transitions = player.actions.tolist(), player.transitions.tolist()
+    co_actions = opponent.actions.tolist()
+    co_transitions = opponent.transitions.tolist()
+    state, co_state = player.initial_state, opponent.initial_state
+    score, co_score = 0, 0
+    visits = {}
+    totals = []
+    for turn in range(turns):
+        if detect_cycles:
+            joint_state = (state, co_state)
+            if joint_state in visits:
+                first = visits[joint_state]
+                period = turn - first
+                cycles, remainder = divmod(turns - turn, period)
+                first_score, first_co_score = totals[first]
+                last_score, last_co_score = totals[first + remainder]
+                score += (cycles * (score - first_score)
+                          + last_score - first_score)
+                co_score += (cycles * (co_score - first_co_score)
+                             + last_co_score - first_co_score)
+                return score, co_score
+            visits[joint_state] = turn
+            totals.append((score, co_score))
+        play, coplay = actions[state], co_actions[co_state]
+        score += payoffs[play][coplay]
+        co_score += payoffs[coplay][play]
+        state = transitions[state][coplay]
+        co_state = co_transitions[co_state][play]
+    return score, co_score
+
+
+def play_batch(players, opponents, pairs, turns, game=None):
+    """Play the matches between players[i] and opponents[j] for every (i, j)
+    in pairs, where all players and opponents are CompiledPlayers.
+
+    Returns two arrays with the total payoff of the player and of the opponent
+    in each match.
+
+    Cycles in the pairs of machine states are found with Brent's algorithm:
+    the states are compared to a snapshot taken at turns 1, 2, 4, 8, ... and
+    a match that returns to its snapshot skips all the whole cycles left. It
+    then only plays the turns of the last partial cycle.
+    """
+    payoffs = payoff_matrix(game)
+    if len(pairs) == 0:
+        return np.zeros(0, dtype=payoffs.dtype), np.zeros(0, dtype=payoffs.dtype)
+    detect_cycles = np.issubdtype(payoffs.dtype, np.integer)
+    machines = list(players) + list(opponents)
+    sizes = [machine.num_states for machine in machines]
+    offsets = np.cumsum([0] + sizes[:-1])
+    actions = np.concatenate([machine.actions for machine in machines])
+    transitions = np.concatenate(
+        [machine.transitions + offset
+         for machine, offset in zip(machines, offsets)])
+    starts = np.array([machine.initial_state for machine in machines]) + offsets
+
+    pairs = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+    total_scores = np.zeros(len(pairs), dtype=payoffs.dtype)
+    total_co_scores = np.zeros(len(pairs), dtype=payoffs.dtype)
+
+    # State of the matches still being played
+    live = np.arange(len(pairs))
+    states = starts[pairs[:, 0]]
+    co_states = starts[pairs[:, 1] + len(players)]
+    scores = np.zeros(len(pairs), dtype=payoffs.dtype)
+    co_scores = np.zeros(len(pairs), dtype=payoffs.dtype)
+    remaining = np.full(len(pairs), turns)
+    detecting = np.full(len(pairs), detect_cycles)
+
+    # Brent's snapshot
+    snapshot_turn, power = 0, 1
+    snapshot = (states, co_states, scores, co_scores)
+
+    turn = 0
+    while len(live) and turn < turns:
+        plays = actions[states]
+        coplays = actions[co_states]
+        scores = scores + payoffs[plays, coplays]
+        co_scores = co_scores + payoffs[coplays, plays]
+        states = transitions[states, coplays]
+        co_states = transitions[co_states, plays]
+        remaining = remaining - 1
+        turn += 1
+
+        if detecting.any():
+            snapshot_states, snapshot_co_states, snapshot_scores, \
+                snapshot_co_scores = snapshot
+            found = (detecting & (states == snapshot_states)
+                     & (co_states == snapshot_co_states))
+            if found.any():
+                cycles, remainder = divmod(remaining[found],
+                                           turn - snapshot_turn)
+                scores[found] += cycles * (scores[found]
+                                           - snapshot_scores[found])
+                co_scores[found] += cycles * (co_scores[found]
+                                              - snapshot_co_scores[found])
+                remaining[found] = remainder
+                detecting[found] = False
+            if turn - snapshot_turn == power:
+                snapshot = (states, co_states, scores, co_scores)
+                snapshot_turn, power = turn, 2 * power
+
+        finished = remaining == 0
+        if finished.any():
+            total_scores[live[finished]] = scores[finished]
+            total_co_scores[live[finished]] = co_scores[finished]
+            playing = ~finished
+            live = live[playing]
+            states, co_states = states[playing], co_states[playing]
+            scores, co_scores = scores[playing], co_scores[playing]
+            remaining, detecting = remaining[playing], detecting[playing]
+            snapshot = tuple(array[playing] for array in snapshot)
+    return total_scores, total_co_scores
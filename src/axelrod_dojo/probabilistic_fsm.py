@@ -1,5 +1,4 @@
-import itertools
-from typing import Any, Dict,List, Sequence, Text, Tuple
+from typing import Any, Dict,List, Optional, Sequence, Text, Tuple
 
 from axelrod.strategies.finite_state_machines import FSMPlayer, SimpleFSM
 from axelrod.action import Action
@@ -9,11 +8,161 @@ from axelrod.evolvable_player import (
     copy_lists,
 )
 from axelrod.player import Player
+from axelrod.random_ import RandomGenerator
 
 
 C, D = Action.C, Action.D
 actions = (C, D)
-Transition = Tuple[int, Action, int, Action]
+Transition = Tuple[int, Action, int, float]
+
+# The number of random numbers a player draws from its generator at a time.
+RANDOM_BLOCK = 256
+
+
+class BlockRandomGenerator(RandomGenerator):
+    """
+    RandomGenerator that hands out uniform random numbers drawn in blocks of
+    `block_size`, so that a stochastic player does not call the underlying
+    generator on every turn, and that can draw Gaussian noise.
+    """
+
+    def __init__(self, seed: Optional[int] = None,
+                 block_size: int = RANDOM_BLOCK) -> None:
+        self.block_size = block_size
+        self._block = []  # type: List[float]
+        super().__init__(seed=seed)
+
+    def seed(self, seed_: Optional[int] = None):
+        """Sets a seed and discards the numbers drawn so far."""
+        super().seed(seed_)
+        self._block = []
+
+    def draw(self) -> float:
+        """Return the next uniform random number of the block."""
+        if not self._block:
+            self._block = self._random.rand(self.block_size).tolist()
+        return self._block.pop()
+
+    def normal(self, *args, **kwargs):
+        return self._random.normal(*args, **kwargs)
+
+
+class ArrayFSM(object):
+    """
+    Finite state machine stored as two arrays indexed by
+    state * 2 + opponent action (0 for C, 1 for D): the next state and the
+    action played (for EvolvablePFSMPlayer, the probability of playing C).
+
+    It has the interface of SimpleFSM (`state`, `state_transitions`,
+    `transitions`, `move` and `num_states`) but a move is an index into
+    these arrays rather than a dictionary lookup. Rows of states that are
+    not in the transitions hold None.
+    """
+
+    __slots__ = ("next_states", "actions", "_state")
+
+    def __init__(self, transitions: Sequence[Sequence], initial_state: int) -> None:
+        size = 2 * (max(row[0] for row in transitions) + 1)
+        next_states = [None] * size  # type: List[Optional[int]]
+        next_actions = [None] * size  # type: List[Any]
+        for state, action, next_state, next_action in transitions:
+            row = 2 * state + (action == D)
+            next_states[row] = next_state
+            next_actions[row] = next_action
+        self.next_states = tuple(next_states)
+        self.actions = tuple(next_actions)
+        self._state = initial_state
+        self._raise_error_for_bad_input()
+
+    @classmethod
+    def from_arrays(
+        cls, next_states: Sequence[int], next_actions: Sequence[Any],
+        initial_state: int
+    ) -> "ArrayFSM":
+        """Return the machine with the given arrays."""
+        fsm = cls.__new__(cls)
+        fsm.next_states = tuple(next_states)
+        fsm.actions = tuple(next_actions)
+        fsm._state = initial_state
+        fsm._raise_error_for_bad_input()
+        return fsm
+
+    def _raise_error_for_bad_input(self):
+        callable_states = set(
+            state for state in self.next_states if state is not None)
+        callable_states.add(self._state)
+        for state in callable_states:
+            self._raise_error_for_bad_state(state)
+
+    def _raise_error_for_bad_state(self, state: int):
+        if not (0 <= 2 * state < len(self.next_states)
+                and self.next_states[2 * state] is not None
+                and self.next_states[2 * state + 1] is not None):
+            raise ValueError(
+                "state: {} does not have values for both C and D".format(state)
+            )
+
+    @property
+    def state(self) -> int:
+        return self._state
+
+    @state.setter
+    def state(self, new_state: int):
+        self._raise_error_for_bad_state(new_state)
+        self._state = new_state
+
+    @property
+    def state_transitions(self) -> dict:
+        return {
+            (row // 2, actions[row % 2]): (next_state, self.actions[row])
+            for row, next_state in enumerate(self.next_states)
+            if next_state is not None
+        }
+
+    def transitions(self) -> list:
+        return [
+            [row // 2, actions[row % 2], next_state, self.actions[row]]
+            for row, next_state in enumerate(self.next_states)
+            if next_state is not None
+        ]
+
+    def move(self, opponent_action: Action) -> Action:
+        """Computes the response move and changes state."""
+        row = 2 * self._state + (opponent_action == D)
+        self._state = self.next_states[row]
+        return self.actions[row]
+
+    def __eq__(self, other) -> bool:
+        """Equality of two FSMs"""
+        if not isinstance(other, (ArrayFSM, SimpleFSM)):
+            return False
+        return (self._state, self.state_transitions) == (
+            other.state,
+            other.state_transitions,
+        )
+
+    def num_states(self):
+        """Return the number of states of the machine."""
+        return sum(
+            next_state is not None for next_state in self.next_states[::2])
+
+    def swap(self, n1: int, n2: int) -> "ArrayFSM":
+        """Return the machine with the rows of states n1 and n2 swapped."""
+        next_states = list(self.next_states)
+        next_actions = list(self.actions)
+        for offset in (0, 1):
+            i, j = 2 * n1 + offset, 2 * n2 + offset
+            next_states[i], next_states[j] = next_states[j], next_states[i]
+            next_actions[i], next_actions[j] = next_actions[j], next_actions[i]
+        return ArrayFSM.from_arrays(next_states, next_actions, self._state)
+
+    def splice(self, other: "ArrayFSM", cross_point: int) -> "ArrayFSM":
+        """Return the machine with the rows of this one before cross_point
+        and the rows of other after it."""
+        return ArrayFSM.from_arrays(
+            self.next_states[:cross_point] + other.next_states[cross_point:],
+            self.actions[:cross_point] + other.actions[cross_point:],
+            self._state)
 
 
 class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
@@ -22,13 +171,24 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
     
     Instead of representing what result to return, a probability value is store (0.0-1.0).
     This value is used to determine the probability that C will be chosen.
+
+    The machine is an ArrayFSM whose actions are these probabilities, so that
+    each turn of a match only indexes its arrays, and mutation, crossover and
+    `receive_vector` work on these arrays directly. The uniform random numbers
+    of a match are drawn from the generator of the player in blocks (see
+    `BlockRandomGenerator`) and only for transitions whose probability is
+    strictly between 0 and 1. A player whose probabilities are all 0 or 1 is
+    deterministic.
+
+    Mutation adds Gaussian noise of standard deviation `mutation_distance` to
+    each probability with the mutation probability.
     """
 
     name = "EvolvablePFSMPlayer"
 
     classifier = {
         "memory_depth": 1,
-        "stochastic": False,
+        "stochastic": True,
         "long_run_time": False,
         "inspects_source": False,
         "manipulates_source": False,
@@ -42,6 +202,7 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
         initial_action: Action = None,
         num_states: int = None,
         mutation_probability: float = 0.1,
+        mutation_distance: float = 0.1,
         seed: int = None,
     ) -> None:
         """If transitions, initial_state, and initial_action are None
@@ -55,13 +216,12 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
         ) = self._normalize_parameters(
             transitions, initial_state, initial_action, num_states
         )
-        FSMPlayer.__init__(
-            self,
-            transitions=transitions,
-            initial_state=initial_state,
-            initial_action=initial_action,
-        )
+        Player.__init__(self)
+        self.initial_state = initial_state
+        self.initial_action = initial_action
+        self.fsm = ArrayFSM(transitions, initial_state)
         self.mutation_probability = mutation_probability
+        self.mutation_distance = mutation_distance
         self.overwrite_init_kwargs(
             transitions=transitions,
             initial_state=initial_state,
@@ -69,14 +229,31 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
             num_states=self.num_states,
         )
 
+    def _post_init(self) -> None:
+        self.classifier["stochastic"] = self.is_stochastic()
+
+    def set_seed(self, seed: Optional[int]) -> None:
+        """Set a random seed for the player's block random number
+        generator."""
+        super().set_seed(seed)
+        self._random = BlockRandomGenerator(seed=self._seed)
+
     @classmethod
     def normalize_transitions(
         cls, transitions: Sequence[Sequence]
     ) -> Tuple[Tuple[Any, ...], ...]:
-        """Translate a list of lists to a tuple of tuples."""
+        """Translate a list of lists to a tuple of tuples, with the action of
+        each transition as the probability of playing C (1.0 for C and 0.0
+        for D)."""
         normalized = []
-        for t in transitions:
-            normalized.append(tuple(t))
+        for state, action, next_state, probability in transitions:
+            if isinstance(probability, Action):
+                probability = 1.0 if probability == C else 0.0
+            probability = float(probability)
+            if not 0 <= probability <= 1:
+                raise ValueError(
+                    "Transition probabilities must be in [0, 1]")
+            normalized.append((state, action, next_state, probability))
         return tuple(normalized)
 
     def _normalize_parameters(
@@ -106,6 +283,36 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
     def num_states(self) -> int:
         return self.fsm.num_states()
 
+    def is_stochastic(self) -> bool:
+        """Return whether any transition has a probability strictly between 0
+        and 1."""
+        return any(0 < probability < 1 for probability in self.fsm.actions
+                   if probability is not None)
+
+    def action_transitions(self) -> List[List]:
+        """Return the transitions of a deterministic player with the actions
+        played rather than their probabilities."""
+        if self.is_stochastic():
+            raise ValueError(
+                "The transitions of a stochastic player are not actions")
+        return [[state, action, next_state, C if probability else D]
+                for state, action, next_state, probability
+                in self.fsm.transitions()]
+
+    def strategy(self, opponent: Player) -> Action:
+        """Actual strategy definition that determines player's action."""
+        if not self.history:
+            return self.initial_action
+        fsm = self.fsm
+        row = 2 * fsm._state + (opponent.history[-1] == D)
+        fsm._state = fsm.next_states[row]
+        probability = fsm.actions[row]
+        if probability >= 1:
+            return C
+        if probability <= 0:
+            return D
+        return C if self._random.draw() < probability else D
+
     def random_params(
         self, num_states: int
     ) -> Tuple[Tuple[Transition, ...], int, Action]:
@@ -113,32 +320,47 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
         for j in range(num_states):
             for action in actions:
                 next_state = self._random.randint(num_states)
-                next_action = self._random.choice(actions)
-                row = (j, action, next_state, next_action)
+                probability = self._random.random()
+                row = (j, action, next_state, probability)
                 rows.append(row)
         initial_state = self._random.randint(0, num_states)
         initial_action = self._random.choice(actions)
         return tuple(rows), initial_state, initial_action
 
-    def mutate_rows(self, rows: List[List], mutation_probability: float):
-        rows = list(rows)
-        randoms = self._random.random(len(rows))
-        # Flip each value with a probability proportional to the mutation rate
-        for i, row in enumerate(rows):
-            if randoms[i] < mutation_probability:
-                row[3] = row[3].flip()
+    def mutate_fsm(self, fsm: ArrayFSM, mutation_probability: float) -> ArrayFSM:
+        """Return the machine with Gaussian noise of standard deviation
+        `mutation_distance` added to each probability with the mutation
+        probability (clipped to [0, 1]) and, half of the time, the rows of two
+        distinct states swapped."""
+        randoms = self._random.random(len(fsm.actions))
+        mutated = [row for row, r in enumerate(randoms)
+                   if r < mutation_probability
+                   and fsm.actions[row] is not None]
+        if mutated:
+            probabilities = list(fsm.actions)
+            noise = self._random.normal(0, self.mutation_distance,
+                                        len(mutated))
+            for row, delta in zip(mutated, noise.tolist()):
+                probabilities[row] = min(1.0, max(0.0,
+                                                  probabilities[row] + delta))
+            fsm = ArrayFSM.from_arrays(fsm.next_states, probabilities,
+                                       fsm._state)
         # Swap Two Nodes?
-        if self._random.random() < 0.5:
-            nodes = len(rows) // 2
+        nodes = len(fsm.next_states) // 2
+        if self._random.random() < 0.5 and nodes > 1:
+            # Draw two distinct nodes: swapping a node with itself would
+            # leave the rows unchanged
             n1 = self._random.randint(0, nodes)
-            n2 = self._random.randint(0, nodes)
-            for j, row in enumerate(rows):
-                if row[0] == n1:
-                    row[0] = n2
-                elif row[0] == n2:
-                    row[0] = n1
-            rows.sort(key=lambda x: (x[0], 0 if x[1] == C else 1))
-        return rows
+            n2 = self._random.randint(0, nodes - 1)
+            if n2 >= n1:
+                n2 += 1
+            fsm = fsm.swap(n1, n2)
+        return fsm
+
+    def mutate_rows(self, rows: List[List], mutation_probability: float):
+        rows = self.normalize_transitions(rows)
+        fsm = self.mutate_fsm(ArrayFSM(rows, rows[0][0]), mutation_probability)
+        return fsm.transitions()
 
     def mutate(self):
         initial_action = self.initial_action
@@ -149,16 +371,9 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
             10 * self.num_states
         ):
             initial_state = self._random.randint(0, self.num_states)
-        try:
-            transitions = self.mutate_rows(
-                self.fsm.transitions(), self.mutation_probability
-            )
-            self.fsm = SimpleFSM(transitions, self.initial_state)
-        except ValueError:
-            # If the FSM is malformed, try again.
-            return self.mutate()
+        fsm = self.mutate_fsm(self.fsm, self.mutation_probability)
         return self.create_new(
-            transitions=transitions,
+            transitions=self.normalize_transitions(fsm.transitions()),
             initial_state=initial_state,
             initial_action=initial_action,
         )
@@ -177,10 +392,10 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
             raise TypeError(
                 "Crossover must be between the same player classes."
             )
-        transitions = self.crossover_rows(
-            self.fsm.transitions(), other.fsm.transitions()
-        )
-        transitions = self.normalize_transitions(transitions)
+        num_states = len(self.fsm.next_states) // 2
+        cross_point = 2 * self._random.randint(0, num_states)
+        fsm = self.fsm.splice(other.fsm, cross_point)
+        transitions = self.normalize_transitions(fsm.transitions())
         return self.create_new(transitions=transitions)
 
     def receive_vector(self, vector):
@@ -191,29 +406,24 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
         The vector has three parts. The first is used to define the next state
         (for each of the player's states - for each opponents action).
 
-        The second part is the player's next moves (for each state - for
-        each opponent's actions).
+        The second part is the probability of playing C (for each state - for
+        each opponent's actions), clipped to [0, 1].
 
         Finally, a probability to determine the player's first move.
         """
         num_states = self.fsm.num_states()
         state_scale = vector[: num_states * 2]
         next_states = [int(s * (num_states - 1)) for s in state_scale]
-        actions = vector[num_states * 2 : -1]
+        probabilities = [min(1.0, max(0.0, float(p)))
+                         for p in vector[num_states * 2 : -1]]
 
         self.initial_action = C if round(vector[-1]) == 0 else D
         self.initial_state = 1
 
-        transitions = []
-        for i, (initial_state, action) in enumerate(
-            itertools.product(range(num_states), [C, D])
-        ):
-            next_action = C if round(actions[i]) == 0 else D
-            transitions.append(
-                [initial_state, action, next_states[i], next_action]
-            )
-        transitions = self.normalize_transitions(transitions)
-        self.fsm = SimpleFSM(transitions, self.initial_state)
+        self.fsm = ArrayFSM.from_arrays(next_states, probabilities,
+                                        self.initial_state)
+        self._post_init()
+        transitions = self.normalize_transitions(self.fsm.transitions())
         self.overwrite_init_kwargs(
             transitions=transitions,
             initial_state=self.initial_state,
@@ -225,4 +435,4 @@ class EvolvablePFSMPlayer(FSMPlayer, EvolvablePlayer):
         size = len(self.fsm.transitions()) * 2 + 1
         lb = [0] * size
         ub = [1] * size
-        return lb, ub
\ No newline at end of file
+        return lb, ub
@@ -0,0 +1,136 @@
+"""
+A cheap model of the score of a player, used to screen offspring.
+
+Players are described by the numbers in their `init_kwargs` (their genome:
+transitions, weights, lookup tables, cycles...) and a ridge regression from
+these features to the score is fitted on every player scored so far and on
+the rows of earlier output files. The regression only keeps the sums of the
+features and of their products, so that it can learn from any number of
+scores in constant memory.
+
+A Population with a surrogate breeds `oversampling` times as many children
+as it needs and only scores those with the highest predicted scores.
+"""
+import numpy as np
+from axelrod.action import Action
+
+from axelrod_dojo.utils import iter_results
+
+# Keyword arguments that configure a player rather than describe it.
+IGNORED_KWARGS = ["seed", "mutation_probability", "mutation_distance",
+                  "mutation_potency"]
+
+
+def flatten(value):
+    """Return the numbers in value (actions counting as 0 for C and 1 for D)
+    as a list of floats."""
+    if value is None:
+        return []
+    if isinstance(value, Action):
+        return [float(value.value)]
+    if isinstance(value, str):
+        return [float(Action.from_char(char).value) for char in value
+                if char in "CD"]
+    if isinstance(value, (bool, int, float, np.number)):
+        return [float(value)]
+    if isinstance(value, dict):
+        value = list(value.values())
+    features = []
+    for item in value:
+        features += flatten(item)
+    return features
+
+
+def player_features(player):
+    """Return the features of a player, from its init_kwargs."""
+    features = []
+    for name, value in sorted(player.init_kwargs.items()):
+        if name not in IGNORED_KWARGS:
+            features += flatten(value)
+    return np.array(features)
+
+
+class Surrogate(object):
+    """Ridge regression from the features of players to their score.
+
+    `ridge` is the penalty on the weights of the standardized features, and
+    predictions are only used once `min_samples` scores have been added.
+    """
+
+    def __init__(self, oversampling=4, ridge=1.0, min_samples=20):
+        if oversampling < 1:
+            raise ValueError("Oversampling must be at least 1")
+        self.oversampling = oversampling
+        self.ridge = ridge
+        self.min_samples = min_samples
+        self.samples = 0
+        self._sum_x = None
+        self._sum_y = 0.
+        self._xtx = None
+        self._xty = None
+        self._model = None
+
+    def add_features(self, features, score):
+        if self._sum_x is None:
+            size = len(features)
+            self._sum_x = np.zeros(size)
+            self._xtx = np.zeros((size, size))
+            self._xty = np.zeros(size)
+        if len(features) != len(self._sum_x):
+            raise ValueError(
+                "All players of a surrogate must have the same parameters")
+        self.samples += 1
+        self._sum_x += features
+        self._sum_y += score
+        self._xtx += np.outer(features, features)
+        self._xty += features * score
+        self._model = None
+
+    def add(self, player, score):
+        """Learn from the score of a player."""
+        self.add_features(player_features(player), score)
+
+    def add_results(self, player_class, filename):
+        """Learn from the best players of every row of an output file (CSV or
+        Arrow). Returns the number of rows read."""
+        rows = 0
+        for score, rep, _ in iter_results(filename):
+            self.add(player_class.deserialize_parameters(rep), score)
+            rows += 1
+        return rows
+
+    @property
+    def trained(self):
+        return self.samples >= max(self.min_samples, 1)
+
+    def fit(self):
+        """Return the intercept and weights of the regression."""
+        if self._model is None:
+            n = self.samples
+            mean_x = self._sum_x / n
+            mean_y = self._sum_y / n
+            covariance = self._xtx - n * np.outer(mean_x, mean_x)
+            cross = self._xty - n * mean_x * mean_y
+            scale = np.sqrt(np.clip(np.diag(covariance), 0, None) / n)
+            scale[scale == 0] = 1
+            standardized = covariance / np.outer(scale, scale)
+            penalty = self.ridge * n * np.eye(len(scale))
+            weights = np.linalg.solve(standardized + penalty,
+                                      cross / scale) / scale
+            self._model = (mean_y - mean_x @ weights, weights)
+        return self._model
+
+    def predict(self, players):
+        """Return the predicted scores of players."""
+        intercept, weights = self.fit()
+        features = np.array([player_features(player) for player in players])
+        return intercept + features @ weights
+
+    def screen(self, players, num):
+        """Return the num players with the highest predicted scores, or the
+        first num players until the surrogate is trained."""
+        if not self.trained or len(players) <= num:
+            return players[:num]
+        predictions = self.predict(players)
+        best = np.argsort(-predictions, kind="stable")[:num]
+        return [players[i] for i in sorted(best)]
@@ -1,11 +1,26 @@
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import csv
 from functools import partial
-from statistics import mean
+import heapq
+import json
+from math import log, sqrt
+import os
+import random
+from statistics import mean, stdev
+import tempfile
 
 import numpy as np
 import axelrod as axl
 
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover
+    pa = None
+
+from axelrod_dojo import match_engine
+from axelrod_dojo.canonical import canonical_key
+
 
 PlayerInfo = namedtuple('PlayerInfo', ['strategy', 'init_kwargs'])
 
@@ -13,29 +28,335 @@ PlayerInfo = namedtuple('PlayerInfo', ['strategy', 'init_kwargs'])
 # Output Evolutionary Algorithm results
 
 class Outputer(object):
-    def __init__(self, filename, mode='a'):
+    """
+    Write rows to a CSV file.
+
+    Rows are buffered and written flush_interval at a time, so that the file
+    is opened once per flush rather than once per row. Call `flush` (or
+    `close`) to write the rows left in the buffer. With mode 'w' the file is
+    truncated by the first flush only.
+    """
+
+    def __init__(self, filename, mode='a', flush_interval=1):
         self.file = filename
         self.mode = mode
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self._flushed = False
 
     def write_row(self, row):
-        with open(self.file, self.mode, newline='') as file_writer:
+        self.buffer.append(row)
+        if len(self.buffer) >= self.flush_interval:
+            self.flush()
+
+    def file_mode(self):
+        """Return the mode to open the file with in the next flush."""
+        if self._flushed and self.mode == 'w':
+            return 'a'
+        return self.mode
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.write_rows(self.buffer)
+        self.buffer = []
+        self._flushed = True
+
+    def write_rows(self, rows):
+        with open(self.file, self.file_mode(), newline='') as file_writer:
             writer = csv.writer(file_writer)
-            writer.writerow(row)
+            writer.writerows(rows)
+
+    def close(self):
+        self.flush()
+
+    def tell(self):
+        """Flush the buffer and return the position of the end of the
+        output, to be given to `truncate`."""
+        self.flush()
+        if not os.path.exists(self.file):
+            return 0
+        return os.path.getsize(self.file)
+
+    def truncate(self, position):
+        """Drop the buffered rows and the rows written after `tell` returned
+        position."""
+        self.buffer = []
+        if os.path.exists(self.file):
+            with open(self.file, 'r+b') as output_file:
+                output_file.truncate(position)
+        self._flushed = True
+
+
+# Columns of the rows written by Population.evolve
+OUTPUT_COLUMNS = ["generation", "mean_score", "pstdev_score", "best_score",
+                  "best_params"]
+
+
+class ArrowOutputer(Outputer):
+    """
+    Write the rows of `Population.evolve` to an Arrow IPC stream file, with
+    typed columns (see OUTPUT_COLUMNS).
+
+    The file is a single stream that is kept open from the first flush until
+    `close`, and each flush writes a record batch of the buffered rows, so
+    that `pyarrow.ipc.open_stream` reads every row flushed so far. In mode
+    'a' the rows already in the file are written again at the start of the
+    new stream, in a temporary file that then replaces the file (as in
+    `write_atomically`), so that they are not lost if the process is killed
+    while they are copied. Requires pyarrow.
+    """
+
+    def __init__(self, filename, mode='a', flush_interval=1):
+        if pa is None:
+            raise ImportError("The arrow output format requires pyarrow")
+        super().__init__(filename, mode=mode, flush_interval=flush_interval)
+        self.schema = pa.schema([("generation", pa.int64()),
+                                 ("mean_score", pa.float64()),
+                                 ("pstdev_score", pa.float64()),
+                                 ("best_score", pa.float64()),
+                                 ("best_params", pa.string())])
+        self._sink = None
+        self._writer = None
+        self._rows = 0
+
+    def _existing_rows(self):
+        """Return the table of the rows already in the file that the stream
+        starts with, or None."""
+        if (self.file_mode() == 'a' and os.path.exists(self.file)
+                and os.path.getsize(self.file)):
+            return read_arrow(self.file)
+        return None
+
+    def open(self, keep=None):
+        """Start the stream, with the rows already in the file in mode 'a'
+        (only the first `keep` of them if it is given)."""
+        existing = self._existing_rows()
+        if existing is not None and keep is not None:
+            existing = existing.slice(0, keep)
+        self._rows = 0 if existing is None else existing.num_rows
+        if existing is None:
+            self._sink = open(self.file, 'wb')
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+            return
+        directory = os.path.dirname(os.path.abspath(self.file))
+        descriptor, temporary = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.file), suffix=".tmp")
+        try:
+            self._sink = os.fdopen(descriptor, 'wb')
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+            self._writer.write_table(existing)
+            self._sink.flush()
+            os.fsync(self._sink.fileno())
+            # The stream goes on in the file that replaced the old one
+            os.replace(temporary, self.file)
+        except BaseException:
+            if self._sink is not None:
+                self._sink.close()
+            else:
+                os.close(descriptor)
+            self._writer = self._sink = None
+            os.remove(temporary)
+            raise
+
+    def write_rows(self, rows):
+        if self._writer is None:
+            self.open()
+        columns = [list(column) for column in zip(*rows)]
+        self._writer.write_batch(pa.record_batch(columns, schema=self.schema))
+        self._sink.flush()
+        self._rows += len(rows)
+
+    def _close_stream(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def close(self):
+        super().close()
+        self._close_stream()
+
+    def tell(self):
+        """Flush the buffer and return the number of rows in the file."""
+        self.flush()
+        if self._writer is not None:
+            return self._rows
+        existing = self._existing_rows()
+        return 0 if existing is None else existing.num_rows
+
+    def truncate(self, position):
+        """Drop the buffered rows and the rows after the first position of
+        the file, which is rewritten as in `open`."""
+        self.buffer = []
+        self._close_stream()
+        self._flushed = True
+        if os.path.exists(self.file):
+            self.open(keep=position)
+
+
+def _arrow_batches(source, offset=0):
+    """Yield the record batches of the Arrow stream in source from the byte
+    offset on (or from its first batch), with the offset after each."""
+    if not source.size():
+        return
+    schema = pa.ipc.read_schema(pa.ipc.read_message(source))
+    if offset > source.tell():
+        source.seek(offset)
+    size = source.size()
+    while source.tell() < size:
+        try:
+            message = pa.ipc.read_message(source)
+        except EOFError:
+            # The end of a closed stream
+            return
+        yield pa.ipc.read_record_batch(message, schema), source.tell()
+
+
+def read_arrow(filename):
+    """Return the table of all the rows written by an ArrowOutputer, or None
+    if there are none."""
+    if pa is None:
+        raise ImportError("The arrow output format requires pyarrow")
+    with pa.OSFile(filename, 'rb') as source:
+        batches = [batch for batch, _ in _arrow_batches(source)]
+    if not batches:
+        return None
+    return pa.Table.from_batches(batches)
+
+
+OUTPUTERS = {"csv": Outputer, "arrow": ArrowOutputer}
+
+
+def make_outputer(filename, output_format="csv", mode='a', flush_interval=1):
+    """Return the outputer of the given format ("csv" or "arrow")."""
+    if output_format not in OUTPUTERS:
+        raise ValueError("Output format must be one of csv or arrow")
+    return OUTPUTERS[output_format](filename, mode=mode,
+                                    flush_interval=flush_interval)
+
+
+# Cache of fitness scores
+
+class FitnessCache(object):
+    """A bounded least recently used cache of fitness scores.
+
+    Keys are built by `fitness_key` from the canonical form of a player (see
+    `axelrod_dojo.canonical`) and a fingerprint of the context it was scored
+    in."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, key):
+        return key in self._scores
+
+    def get(self, key, default=None):
+        try:
+            score = self._scores[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def set(self, key, score):
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.maxsize:
+            self._scores.popitem(last=False)
+
+    def clear(self):
+        self._scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def items(self):
+        """Return the (key, score) pairs from least to most recently used."""
+        return list(self._scores.items())
+
+
+def fingerprint(objective, opponents_information, weights=None, seed=None):
+    """Return a hashable summary of everything other than the player that
+    determines the result of `score_player`."""
+    if isinstance(objective, partial):
+        keywords = sorted((k, repr(v)) for k, v in objective.keywords.items())
+        objective_key = (objective.func.__module__, objective.func.__qualname__,
+                         repr(objective.args), tuple(keywords))
+    else:
+        objective_key = (objective.__module__, objective.__qualname__)
+    opponents_key = tuple(
+        (strategy.__module__, strategy.__qualname__,
+         repr(sorted(init_kwargs.items())))
+        for strategy, init_kwargs in opponents_information)
+    if weights is not None:
+        weights = tuple(weights)
+    return objective_key, opponents_key, weights, seed
+
+
+def fitness_key(player, context_fingerprint):
+    """Return the cache key of a player scored in the given context: players
+    that play the same way share their key."""
+    return canonical_key(player), context_fingerprint
+
+
+def is_deterministic_objective(objective):
+    """Return True if the objective gives the same scores on every call for
+    deterministic players."""
+    if not isinstance(objective, partial):
+        return False
+    if objective.func not in (objective_score, objective_score_diff):
+        return False
+    return not objective.keywords.get("noise", 0)
+
+
+def stochastic_opponents(opponents_information):
+    """Return whether each of the opponents is stochastic."""
+    return [axl.Classifiers["stochastic"](strategy(**init_kwargs))
+            for strategy, init_kwargs in opponents_information]
+
+
+def has_deterministic_opponents(opponents_information):
+    """Return True if none of the opponents is stochastic."""
+    return not any(stochastic_opponents(opponents_information))
 
 
 # Objective functions for optimization
 
 def prepare_objective(name="score", turns=200, noise=0., repetitions=None,
-                      nmoran=None, match_attributes=None):
+                      nmoran=None, match_attributes=None,
+                      target_standard_error=None):
+    """
+    Return the objective function with the given name and parameters.
+
+    If target_standard_error is given the repetitions of a stochastic match
+    stop as soon as the standard error of the mean of the scores is below
+    it, so `repetitions` is the most that are played. The fast_moran
+    objective simulates all of its repetitions at once and does not take it.
+    """
     name = name.lower()
-    if name not in ["score", "score_diff", "moran"]:
-        raise ValueError("Score must be one of score, score_diff, or moran")
-    if name == "moran":
+    if name not in ["score", "score_diff", "moran", "fast_moran"]:
+        raise ValueError("Score must be one of score, score_diff, moran "
+                         "or fast_moran")
+    if name == "fast_moran" and target_standard_error is not None:
+        raise ValueError("The fast_moran objective does not take a "
+                         "target_standard_error")
+    if name in ["moran", "fast_moran"]:
         if repetitions is None:
             repetitions = 1000
         if nmoran is None:
             nmoran = 4
-        objective = partial(objective_moran_win, turns=turns, noise=noise,
+        function = objective_moran_win
+        if name == "fast_moran":
+            function = objective_fast_moran_win
+        objective = partial(function, turns=turns, noise=noise,
                             repetitions=repetitions, N=nmoran,
                             match_attributes=match_attributes)
     elif name == "score":
@@ -50,96 +371,833 @@ def prepare_objective(name="score", turns=200, noise=0., repetitions=None,
         objective = partial(objective_score_diff, turns=turns, noise=noise,
                             repetitions=repetitions,
                             match_attributes=match_attributes)
+    if target_standard_error is not None:
+        objective.keywords["target_standard_error"] = target_standard_error
     return objective
 
 
-def objective_score(me, other, turns, noise, repetitions, match_attributes=None):
-    """Objective function to maximize total score over matches."""
+# Common random numbers
+
+def derive_seed(seed, *keys):
+    """Return the seed of one part of an evaluation seeded with seed, where
+    the part is given by non negative integer keys (for example an opponent
+    and a block of repetitions), or None if seed is None."""
+    if seed is None:
+        return None
+    entropy = [int(seed)] + [int(key) for key in keys]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+def random_state(seed):
+    """Return a RandomState seeded with seed, or the global numpy random
+    number generator if seed is None."""
+    if seed is None:
+        return np.random
+    return np.random.RandomState(seed)
+
+
+def play_objective(objective, player, opponent, seed=None):
+    """Return the scores of the objective for a player and an opponent,
+    with the random numbers of the matches drawn from seed if it is not
+    None."""
+    if seed is None:
+        return objective(player, opponent)
+    return objective(player, opponent, seed=seed)
+
+
+# Adaptive repetitions never stop before this many samples.
+MIN_REPETITIONS = 5
+
+
+def standard_error(samples):
+    """Return the standard error of the mean of the samples."""
+    if len(samples) < 2:
+        return float("inf")
+    return stdev(samples) / sqrt(len(samples))
+
+
+def binary_standard_error(samples, z=3):
+    """
+    Return a standard error of the mean of samples that are all 0 or 1 that
+    does not vanish when the samples are all the same.
+
+    It is sqrt(p * (1 - p) / n) for the p of the Wilson score interval (of
+    z standard deviations) around the mean that is closest to 1/2, so that
+    a run of rare events that has not happened yet does not stop the
+    repetitions with an estimate of 0.
+    """
+    n = len(samples)
+    if not n:
+        return float("inf")
+    mean_sample = sum(samples) / n
+    z2 = z * z
+    centre = (mean_sample + z2 / (2 * n)) / (1 + z2 / n)
+    half_width = z * sqrt(mean_sample * (1 - mean_sample) / n
+                          + z2 / (4 * n * n)) / (1 + z2 / n)
+    low, high = centre - half_width, centre + half_width
+    if low <= .5 <= high:
+        p = .5
+    elif high < .5:
+        p = high
+    else:
+        p = low
+    return sqrt(p * (1 - p) / n)
+
+
+def repeat_until(sample, repetitions, target_standard_error=None,
+                 binary=False):
+    """
+    Return the list of the values of `sample()` over `repetitions` calls.
+
+    If target_standard_error is given, stop as soon as (at least
+    MIN_REPETITIONS samples were drawn and) the standard error of their
+    mean is below it. The length of the list is the number of repetitions
+    used. Samples that are all 0 or 1 must be marked as binary: their
+    standard error is then `binary_standard_error`.
+    """
+    error = binary_standard_error if binary else standard_error
+    samples = []
+    for _ in range(repetitions):
+        samples.append(sample())
+        if (target_standard_error is not None
+                and len(samples) >= MIN_REPETITIONS
+                and error(samples) < target_standard_error):
+            break
+    return samples
+
+
+def objective_score(me, other, turns, noise, repetitions, match_attributes=None,
+                    target_standard_error=None, seed=None):
+    """Objective function to maximize total score over matches.
+
+    With a seed the noise and the moves of stochastic players in the
+    repetitions of the match are drawn from it."""
+    if not noise:
+        scores = match_engine.play_match(me, other, turns)
+        if scores is not None:
+            return [scores[0] / turns]
     match = axl.Match((me, other), turns=turns, noise=noise,
-                      match_attributes=match_attributes)
+                      match_attributes=match_attributes, seed=seed)
     if not match._stochastic:
         repetitions = 1
-    scores_for_this_opponent = []
 
-    for _ in range(repetitions):
+    def sample():
         match.play()
-        scores_for_this_opponent.append(match.final_score_per_turn()[0])
-    return scores_for_this_opponent
+        return match.final_score_per_turn()[0]
+
+    return repeat_until(sample, repetitions, target_standard_error)
 
 
 def objective_score_diff(me, other, turns, noise, repetitions,
-                         match_attributes=None):
-    """Objective function to maximize total score difference over matches."""
+                         match_attributes=None, target_standard_error=None,
+                         seed=None):
+    """Objective function to maximize total score difference over matches.
+
+    The seed is used as for `objective_score`."""
+    if not noise:
+        scores = match_engine.play_match(me, other, turns)
+        if scores is not None:
+            return [scores[0] / turns - scores[1] / turns]
     match = axl.Match((me, other), turns=turns, noise=noise,
-                      match_attributes=match_attributes)
+                      match_attributes=match_attributes, seed=seed)
     if not match._stochastic:
         repetitions = 1
-    scores_for_this_opponent = []
 
-    for _ in range(repetitions):
+    def sample():
         match.play()
         final_scores = match.final_score_per_turn()
-        score_diff = final_scores[0] - final_scores[1]
-        scores_for_this_opponent.append(score_diff)
-    return scores_for_this_opponent
+        return final_scores[0] - final_scores[1]
+
+    return repeat_until(sample, repetitions, target_standard_error)
 
 
 def objective_moran_win(me, other, turns, noise, repetitions, N=5,
-                        match_attributes=None):
+                        match_attributes=None, target_standard_error=None,
+                        seed=None):
     """Objective function to maximize Moran fixations over N=4 matches"""
     population = []
     for _ in range(N):
         population.append(me.clone())
         population.append(other.clone())
-    mp = axl.MoranProcess(population, turns=turns, noise=noise)
-
-    scores_for_this_opponent = []
+    mp = axl.MoranProcess(population, turns=turns, noise=noise, seed=seed)
 
-    for _ in range(repetitions):
+    def sample():
         mp.reset()
         mp.play()
         if mp.winning_strategy_name == str(me):
-            scores_for_this_opponent.append(1)
-        else:
-            scores_for_this_opponent.append(0)
-    return scores_for_this_opponent
+            return 1
+        return 0
+
+    return repeat_until(sample, repetitions, target_standard_error,
+                        binary=True)
 
 
-def score_player(player, objective, opponents_information, weights=None, sample_count=None):
+def mean_payoffs(me, other, turns, noise, repetitions,
+                 match_attributes=None, seed=None):
+    """Return the mean scores per turn of me and of other in their matches."""
+    if not noise:
+        scores = match_engine.play_match(me, other, turns)
+        if scores is not None:
+            return scores[0] / turns, scores[1] / turns
+    match = axl.Match((me, other), turns=turns, noise=noise,
+                      match_attributes=match_attributes, seed=seed)
+    if not match._stochastic:
+        repetitions = 1
+    scores = []
+    for _ in range(repetitions):
+        match.play()
+        scores.append(match.final_score_per_turn())
+    return tuple(np.mean(scores, axis=0))
+
+
+def objective_fast_moran_win(me, other, turns, noise, repetitions, N=5,
+                             match_attributes=None, match_repetitions=20,
+                             seed=None):
     """
-    Return the overall mean score of a Player
+    Objective function to maximize Moran fixations over N=4 matches, where
+    the matches between the two types of players are played once.
+
+    The mean payoffs s_mm, s_mo, s_om and s_oo of me against me, me against
+    other, other against me and other against other are estimated over
+    `match_repetitions` matches. With a copies of me and b = n - a copies of
+    other (out of n = 2N) the fitnesses are then
+
+        f_me = (a - 1) * s_mm + b * s_mo,
+        f_other = a * s_om + (b - 1) * s_oo,
+
+    a copy of me is born with probability p = a * f_me / (a * f_me + b *
+    f_other) and the player that dies is any of the n players (as in the
+    birth death MoranProcess). So a goes up by one with probability
+    p * b / n and down by one with probability (1 - p) * a / n. Only these
+    changes matter for fixation, so the chain of changes is simulated for all
+    of the repetitions at once, starting from a = N.
+
+    Returns a list of 1 for the repetitions where me fixates and 0 for the
+    others. With a seed the matches and the chain are drawn from seeds
+    derived from it.
     """
-    scores_for_all_opponents = []
+    if str(me) == str(other):
+        return [1] * repetitions
+    payoffs = partial(mean_payoffs, turns=turns, noise=noise,
+                      repetitions=match_repetitions,
+                      match_attributes=match_attributes)
+    s_mm, _ = payoffs(me.clone(), me.clone(), seed=derive_seed(seed, 0))
+    s_mo, s_om = payoffs(me.clone(), other.clone(), seed=derive_seed(seed, 1))
+    s_oo, _ = payoffs(other.clone(), other.clone(), seed=derive_seed(seed, 2))
+    random_numbers = random_state(derive_seed(seed, 3))
+
+    n = 2 * N
+    counts = np.full(repetitions, N)
+    live = np.arange(repetitions)
+    while len(live):
+        a = counts[live]
+        b = n - a
+        fitness_me = a * ((a - 1) * s_mm + b * s_mo)
+        fitness_other = b * (a * s_om + (b - 1) * s_oo)
+        total = fitness_me + fitness_other
+        p_birth = np.divide(fitness_me, total, out=a / n, where=total > 0)
+        up = p_birth * b
+        down = (1 - p_birth) * a
+        draws = random_numbers.random_sample(len(live))
+        counts[live] += np.where(draws * (up + down) < up, 1, -1)
+        live = live[(counts[live] > 0) & (counts[live] < n)]
+
+    return (counts == n).astype(int).tolist()
 
+
+def sample_opponents(num_opponents, weights=None, sample_count=None,
+                     seed=None):
+    """
+    Return the indices of the opponents a player is scored against, drawn
+    with replacement, and their weights.
+
+    With a seed the same opponents are drawn for every player.
+    """
+    indices = list(range(num_opponents))
     if sample_count is not None:
-        indices = np.random.choice(len(opponents_information), sample_count)
-        opponents_information = [opponents_information[i] for i in indices]
+        indices = random_state(derive_seed(seed, 0)).choice(num_opponents,
+                                                            sample_count)
         if weights is not None:
             weights = [weights[i] for i in indices]
+    return indices, weights
+
+
+def average_score(scores_for_all_opponents, weights=None):
+    """
+    Return the overall mean score from the lists of scores against each
+    opponent.
+    """
+    return np.average([mean(scores) for scores in scores_for_all_opponents],
+                      weights=weights)
+
+
+def objective_bounds(objective):
+    """
+    Return the smallest and largest value that a single score of the
+    objective can take, or None if they are not known.
+    """
+    func = getattr(objective, "func", objective)
+    payoffs = axl.Game().RPST()
+    if func == objective_score:
+        return min(payoffs), max(payoffs)
+    if func == objective_score_diff:
+        spread = max(payoffs) - min(payoffs)
+        return -spread, spread
+    if func in (objective_moran_win, objective_fast_moran_win):
+        return 0, 1
+    return None
+
+
+class OpponentPool(object):
+    """
+    The opponents of a list of PlayerInfo, each built once and then used for
+    every match against it.
 
-    for strategy, init_kwargs in opponents_information:
+    The objectives reset their players before playing (as `axl.Match` does)
+    so an opponent can be reused without building it again. With
+    replay=True the opponents whose moves do not depend on the play are
+    replaced by a `match_engine.ReplayPlayer` of their precomputed moves.
+    """
+
+    def __init__(self, opponents_information, replay=True):
+        self.opponents_information = opponents_information
+        self.replay = replay
+        self._opponents = [None] * len(opponents_information)
+
+    def __len__(self):
+        return len(self.opponents_information)
+
+    def get(self, index):
+        """Return the opponent at index."""
+        opponent = self._opponents[index]
+        if opponent is None:
+            strategy, init_kwargs = self.opponents_information[index]
+            opponent = strategy(**init_kwargs)
+            if self.replay:
+                opponent = match_engine.replay_player(opponent) or opponent
+            self._opponents[index] = opponent
+        return opponent
+
+
+def _opponent(opponents_information, opponents, index):
+    if opponents is not None:
+        return opponents.get(index)
+    strategy, init_kwargs = opponents_information[index]
+    return strategy(**init_kwargs)
+
+
+def score_player(player, objective, opponents_information, weights=None,
+                 sample_count=None, opponents=None, seed=None,
+                 return_repetitions=False):
+    """
+    Return the overall mean score of a Player
+
+    The opponents are taken from an OpponentPool of the opponents_information
+    if one is given, and are built for each match otherwise.
+
+    With a seed the evaluation uses common random numbers: the sample of
+    opponents and the random numbers of the matches against each of them are
+    drawn from seeds derived from it, so that every player scored with the
+    same seed meets the same opponents and the same noise.
+
+    With return_repetitions=True a tuple (score, repetitions) is returned,
+    repetitions being the number of repetitions played against all the
+    opponents (fewer than the most the objective allows when it stops on a
+    target_standard_error).
+    """
+    scores_for_all_opponents = []
+    repetitions = 0
+
+    indices, weights = sample_opponents(len(opponents_information), weights,
+                                        sample_count, seed)
+
+    for position, index in enumerate(indices):
         player.reset()
-        opponent = strategy(**init_kwargs)
-        scores_for_this_opponent = objective(player, opponent)
+        opponent = _opponent(opponents_information, opponents, index)
+        scores_for_this_opponent = play_objective(
+            objective, player, opponent, derive_seed(seed, 1, position))
+        repetitions += len(scores_for_this_opponent)
         mean_vs_opponent = mean(scores_for_this_opponent)
         scores_for_all_opponents.append(mean_vs_opponent)
 
     overall_mean_score = np.average(scores_for_all_opponents, weights=weights)
+    if return_repetitions:
+        return overall_mean_score, repetitions
     return overall_mean_score
 
 
-def load_params(player_class, filename, num):
-    """Load the best num parameters from the given file."""
+def race_player(player, objective, opponents_information, threshold,
+                weights=None, sample_count=None, confidence=None,
+                opponents=None, seed=None, return_repetitions=False):
+    """
+    Return the overall mean score of a Player, stopping as soon as it can not
+    reach threshold.
+
+    The opponents are played in a random order. After each match the
+    overall mean is bounded above by assuming the best possible score (from
+    `objective_bounds`) against every opponent left. If a confidence level
+    is given (and there are no weights) a Hoeffding-Serfling bound on the
+    mean of the opponents left is used as well, so that the player is only
+    stopped with that confidence.
+
+    Returns a tuple (score, matches played, complete). A player that was
+    stopped early is given the mean score against the opponents it played,
+    which is below threshold. As for `score_player` the opponents can be
+    taken from an OpponentPool and a seed gives common random numbers, and
+    with return_repetitions=True the number of repetitions played is added
+    to the tuple.
+    """
+    indices, selected_weights = sample_opponents(
+        len(opponents_information), weights, sample_count, seed)
+    num_opponents = len(indices)
+    bounds = objective_bounds(objective)
+    match_weights = selected_weights
+    if match_weights is None:
+        match_weights = [1] * num_opponents
+    total_weight = sum(match_weights)
+    if bounds is None or total_weight <= 0:
+        threshold = float("-inf")
+        bounds = (0, 0)
+    low, high = bounds
+    remaining_bound = sum(w * (high if w > 0 else low) for w in match_weights)
+
+    scores_for_all_opponents = [None] * num_opponents
+    weighted_sum, played_weight = 0, 0
+    repetitions = 0
+
+    def result(score, played, complete):
+        if return_repetitions:
+            return score, played, complete, repetitions
+        return score, played, complete
+
+    order = random_state(derive_seed(seed, 2)).permutation(num_opponents)
+    for played, k in enumerate(order, 1):
+        player.reset()
+        opponent = _opponent(opponents_information, opponents, indices[k])
+        scores_for_all_opponents[k] = play_objective(
+            objective, player, opponent, derive_seed(seed, 1, k))
+        repetitions += len(scores_for_all_opponents[k])
+        weight = match_weights[k]
+        weighted_sum += weight * mean(scores_for_all_opponents[k])
+        played_weight += weight
+        remaining_bound -= weight * (high if weight > 0 else low)
+        if played == num_opponents:
+            break
+
+        upper_bound = (weighted_sum + remaining_bound) / total_weight
+        if confidence is not None and selected_weights is None:
+            margin = (high - low) * sqrt(
+                (1 - (played - 1) / num_opponents)
+                * log(1 / (1 - confidence)) / (2 * played))
+            upper_bound = min(upper_bound, weighted_sum / played + margin)
+        if upper_bound < threshold:
+            if played_weight > 0:
+                return result(weighted_sum / played_weight, played, False)
+            return result(upper_bound, played, False)
+
+    score = average_score(scores_for_all_opponents, weights=selected_weights)
+    return result(score, num_opponents, True)
+
+
+# Scoring in worker processes
+
+ScoringContext = namedtuple('ScoringContext', ['player_class', 'objective',
+                                               'opponents_information',
+                                               'weights', 'sample_count',
+                                               'params_kwargs'],
+                            defaults=(None,))
+
+# Contexts installed in this worker process, by key. A worker can be shared
+# by several populations so a few of them are kept.
+_worker_contexts = OrderedDict()
+MAX_WORKER_CONTEXTS = 8
+
+# The opponents of the contexts installed in this worker process, by key.
+_worker_opponents = OrderedDict()
+
+
+def initialize_worker(key, context):
+    """
+    Install a ScoringContext in a worker process.
+
+    This is used as the initializer of a process pool so that the objective
+    and the opponents are sent once per worker and each task only carries the
+    serialized parameters of a player.
+    """
+    _worker_contexts[key] = context
+    _worker_contexts.move_to_end(key)
+    _worker_opponents.pop(key, None)
+    while len(_worker_contexts) > MAX_WORKER_CONTEXTS:
+        _worker_contexts.popitem(last=False)
+
+
+def _installed_context(key, context):
+    if context is not None:
+        initialize_worker(key, context)
+        return context
+    return _worker_contexts.get(key)
+
+
+def _opponent_pool(key, context):
+    """Return the OpponentPool of the context installed under key, so that
+    a worker builds each opponent once."""
+    pool = _worker_opponents.get(key)
+    if pool is None:
+        pool = OpponentPool(context.opponents_information)
+        _worker_opponents[key] = pool
+    _worker_opponents.move_to_end(key)
+    while len(_worker_opponents) > MAX_WORKER_CONTEXTS:
+        _worker_opponents.popitem(last=False)
+    return pool
+
+
+# Players recently deserialized in this worker process, by parameters. The
+# tasks of one player against many opponents often land on the same worker.
+_worker_players = OrderedDict()
+MAX_WORKER_PLAYERS = 64
+
+
+def _deserialize_player(player_class, serialized):
+    key = (player_class, serialized)
+    if key in _worker_players:
+        _worker_players.move_to_end(key)
+        return _worker_players[key]
+    player = player_class.deserialize_parameters(serialized)
+    _worker_players[key] = player
+    while len(_worker_players) > MAX_WORKER_PLAYERS:
+        _worker_players.popitem(last=False)
+    return player
+
+
+def score_serialized_player(task, return_repetitions=False):
+    """
+    Return the overall mean score of a Player given by its serialized
+    parameters (and the repetitions played, as for `score_player`).
+
+    The task is a tuple (key, serialized, seed, context), the seed being that
+    of the common random numbers of `score_player` (or None). If context is
+    None the one installed under key is used, and None is returned when this
+    worker does not have it: the caller then sends the task again with its
+    context.
+    """
+    key, serialized, seed, context = task
+    context = _installed_context(key, context)
+    if context is None:
+        return None
+    player = context.player_class.deserialize_parameters(serialized)
+    return score_player(player,
+                        objective=context.objective,
+                        opponents_information=context.opponents_information,
+                        weights=context.weights,
+                        sample_count=context.sample_count,
+                        opponents=_opponent_pool(key, context),
+                        seed=seed, return_repetitions=return_repetitions)
+
+
+def score_vector(task):
+    """
+    Return the overall mean score of the Player built from the parameters of
+    the context and given vector with `receive_vector`.
+
+    The task is a tuple (key, vector, context), with the context as for
+    `score_serialized_player`.
+    """
+    key, vector, context = task
+    context = _installed_context(key, context)
+    if context is None:
+        return None
+    player = context.player_class(**context.params_kwargs)
+    player.receive_vector(vector=vector)
+    return score_player(player,
+                        objective=context.objective,
+                        opponents_information=context.opponents_information,
+                        weights=context.weights,
+                        sample_count=context.sample_count,
+                        opponents=_opponent_pool(key, context))
+
+
+def race_serialized_player(task, return_repetitions=False):
+    """
+    Race a Player given by its serialized parameters with `race_player`.
+
+    The task is a tuple (key, serialized, threshold, confidence, seed,
+    context), as for `score_serialized_player`. Returns None if the context
+    is missing.
+    """
+    key, serialized, threshold, confidence, seed, context = task
+    context = _installed_context(key, context)
+    if context is None:
+        return None
+    player = context.player_class.deserialize_parameters(serialized)
+    return race_player(player,
+                       objective=context.objective,
+                       opponents_information=context.opponents_information,
+                       threshold=threshold,
+                       weights=context.weights,
+                       sample_count=context.sample_count,
+                       confidence=confidence,
+                       opponents=_opponent_pool(key, context),
+                       seed=seed, return_repetitions=return_repetitions)
+
+
+def score_match_block(task):
+    """
+    Return the scores of a Player given by its serialized parameters against
+    a single opponent.
+
+    The task is a tuple (task_id, key, serialized, opponent_index,
+    repetitions, seed, context). If repetitions is not None it overrides the
+    repetitions of the objective, so that the repetitions of a stochastic
+    match can be split into blocks, and the random numbers of the match are
+    drawn from seed if it is not None. As in `score_serialized_player` the
+    context is only needed if it is not installed under key already.
+    Returns (task_id, scores), where scores is None if the context is missing.
+    """
+    task_id, key, serialized, opponent_index, repetitions, seed, context = task
+    context = _installed_context(key, context)
+    if context is None:
+        return task_id, None
+    player = _deserialize_player(context.player_class, serialized)
+    opponent = _opponent_pool(key, context).get(opponent_index)
+    objective = context.objective
+    if repetitions is not None:
+        objective = partial(objective, repetitions=repetitions)
+    player.reset()
+    return task_id, play_objective(objective, player, opponent, seed)
+
+
+def map_with_context(executor, function, key, context, tasks,
+                     chunksize=None):
+    """
+    Map function over the tasks in the workers of an executor, where each
+    task is sent as (key,) + task + (context,).
+
+    The context is only attached when sending a task again: a worker that
+    does not have the context installed under key yet (because it belongs to
+    a shared executor) returns None for the task.
+    """
+    results = executor.map(function,
+                           [(key,) + task + (None,) for task in tasks],
+                           chunksize=chunksize)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        retried = executor.map(function,
+                               [(key,) + tasks[i] + (context,)
+                                for i in missing],
+                               chunksize=chunksize)
+        for i, result in zip(missing, retried):
+            results[i] = result
+    return results
+
+
+def score_compiled_players(players, objective, opponents, weights=None,
+                           sample_count=None, seed=None):
+    """
+    Return the overall mean score of each of a list of compiled players
+    against a list of compiled opponents.
+
+    This gives the same scores as `score_player` (with the same seed) for the
+    deterministic objectives but plays all the matches at once with the match
+    engine.
+    """
+    turns = objective.keywords["turns"]
+    selections = [sample_opponents(len(opponents), weights, sample_count, seed)
+                  for _ in players]
+
+    pairs = [(i, j) for i, (indices, _) in enumerate(selections)
+             for j in indices]
+    scores, co_scores = match_engine.play_batch(players, opponents, pairs,
+                                                turns)
+    if objective.func == objective_score_diff:
+        match_scores = [score / turns - co_score / turns
+                        for score, co_score in zip(scores.tolist(),
+                                                   co_scores.tolist())]
+    else:
+        match_scores = [score / turns for score in scores.tolist()]
+
+    overall_mean_scores = []
+    start = 0
+    for indices, player_weights in selections:
+        scores_for_all_opponents = [
+            [score] for score in match_scores[start: start + len(indices)]]
+        start += len(indices)
+        overall_mean_scores.append(
+            average_score(scores_for_all_opponents, weights=player_weights))
+    return overall_mean_scores
+
+
+# Checkpoints
+
+def write_atomically(filename, data):
+    """
+    Write bytes to filename so that it holds either its old contents or all
+    of data, even if the process is killed while writing.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    descriptor, temporary = tempfile.mkstemp(dir=directory,
+                                             prefix=os.path.basename(filename),
+                                             suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, 'wb') as temporary_file:
+            temporary_file.write(data)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def random_states():
+    """Return the states of the random number generators used in training."""
+    states = {"random": random.getstate(),
+              "numpy": np.random.get_state()}
+    module_random = getattr(axl, "_module_random", None)
+    if module_random is not None:
+        states["axelrod"] = module_random._random.get_state()
+    return states
+
+
+def set_random_states(states):
+    """Restore the states returned by `random_states`."""
+    random.setstate(states["random"])
+    np.random.set_state(states["numpy"])
+    module_random = getattr(axl, "_module_random", None)
+    if module_random is not None and "axelrod" in states:
+        module_random._random.set_state(states["axelrod"])
+
+
+# Reading the output of an Evolutionary Algorithm
+
+# The first bytes of an Arrow IPC stream
+ARROW_MARKER = b"\xff\xff\xff\xff"
+
+
+def is_arrow_file(filename):
+    """Return True if filename was written by an ArrowOutputer."""
+    with open(filename, 'rb') as datafile:
+        return datafile.read(len(ARROW_MARKER)) == ARROW_MARKER
+
+
+def iter_results(filename, offset=0):
+    """
+    Yield (best score, serialized parameters, end) for every row of an output
+    file from the byte offset on, where end is the offset after the row.
+
+    The file is read a row (or an Arrow stream) at a time. A CSV row that is
+    not terminated yet (because it is being written) is not read.
+    """
+    if is_arrow_file(filename):
+        if pa is None:
+            raise ImportError("The arrow output format requires pyarrow")
+        with pa.OSFile(filename, 'rb') as source:
+            # A batch holds the rows of a single flush
+            for batch, end in _arrow_batches(source, offset):
+                scores = batch.column("best_score").to_pylist()
+                reps = batch.column("best_params").to_pylist()
+                for score, rep in zip(scores, reps):
+                    yield score, rep, end
+        return
+
+    with open(filename, 'rb') as datafile:
+        datafile.seek(offset)
+        end = offset
+        for line in datafile:
+            if not line.endswith(b"\n"):
+                break
+            end += len(line)
+            row = next(csv.reader([line.decode()]))
+            yield float(row[-2]), row[-1], end
+
+
+def best_results(filename, num, offset=0):
+    """
+    Return the num rows of an output file with the highest scores, as (score,
+    serialized parameters) in decreasing order, along with the number of rows
+    read and the offset the file was read up to.
+
+    Only num rows are held in memory at a time.
+    """
+    progress = [0, offset]
+
+    def results():
+        for score, rep, end in iter_results(filename, offset):
+            progress[0] += 1
+            progress[1] = end
+            yield score, rep
+
+    best = heapq.nlargest(num, results())
+    return best, progress[0], progress[1]
+
+
+# Rows kept in the index of an output file, if fewer are asked for
+INDEX_SIZE = 100
+
+
+def index_filename(filename):
+    return filename + ".index"
+
+
+def _tail(filename, offset, length=64):
+    """Return the hex of the bytes of the file before offset."""
+    with open(filename, 'rb') as datafile:
+        datafile.seek(max(0, offset - length))
+        return datafile.read(offset - max(0, offset - length)).hex()
+
+
+def read_index(filename):
+    """Return the index of an output file or None if there is no index or if
+    the file was rewritten since the index was built."""
+    try:
+        with open(index_filename(filename)) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    if (os.path.getsize(filename) < index["offset"]
+            or _tail(filename, index["offset"]) != index["tail"]):
+        return None
+    return index
+
+
+def best_indexed_results(filename, num):
+    """
+    Return the num rows of an output file with the highest scores, using and
+    updating a sidecar index (filename + ".index").
+
+    The index holds the best rows (at least INDEX_SIZE) of the file up to the
+    offset it was built to. As output files are only appended to, only the
+    rows written since then are read, so that a query on a file that did not
+    change reads the index alone.
+    """
+    capacity = max(num, INDEX_SIZE)
+    index = read_index(filename)
+    if (index is None
+            or (index["capacity"] < num and index["rows"] > index["capacity"])):
+        index = {"offset": 0, "rows": 0, "capacity": capacity, "best": []}
+    capacity = max(capacity, index["capacity"])
+
+    new, rows, offset = best_results(filename, capacity, index["offset"])
+    best = index["best"]
+    if rows:
+        best = heapq.nlargest(capacity, [tuple(row) for row in best] + new)
+        index = {"offset": offset, "rows": index["rows"] + rows,
+                 "capacity": capacity, "tail": _tail(filename, offset),
+                 "best": best}
+        with open(index_filename(filename), 'w') as index_file:
+            json.dump(index, index_file)
+    return [tuple(row) for row in best[:num]]
+
+
+def load_params(player_class, filename, num, index=False):
+    """
+    Load the best num parameters from the given file (CSV or Arrow).
+
+    With index=True a sidecar index of the best rows is used and kept up to
+    date (see `best_indexed_results`).
+    """
     parser = player_class.deserialize_parameters
-    all_params = []
-
-    with open(filename) as datafile:
-        reader = csv.reader(datafile)
-        for line in reader:
-            score, rep = float(line[-2]), line[-1]
-            all_params.append((score, rep))
-    all_params.sort(reverse=True)
-    best_params = []
-    for score, rep in all_params[:num]:
-        best_params.append(parser(rep))
-    return best_params
+    if index:
+        best = best_indexed_results(filename, num)
+    else:
+        best, _, _ = best_results(filename, num)
+    return [parser(rep) for score, rep in best]
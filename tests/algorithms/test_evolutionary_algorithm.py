@@ -0,0 +1,700 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import axelrod as axl
+import axelrod_dojo as dojo
+from axelrod_dojo import utils
+from axelrod_dojo.algorithms import islands
+from axelrod_dojo.utils import score_player
+
+
+class TestFitnessCache(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def test_survivors_are_not_rescored(self):
+        objective = dojo.prepare_objective(name="score", turns=10, repetitions=1)
+        opponents = [axl.TitForTat(), axl.Alternator()]
+        population = dojo.Population(player_class=axl.EvolvableCycler,
+                                     params_kwargs={"cycle_length": 5},
+                                     size=8,
+                                     bottleneck=2,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=opponents)
+        population.run(3, print_output=False)
+        self.assertGreaterEqual(population.cache.hits, 2 * 2)
+        self.assertGreater(population.cache.misses, 0)
+
+        scores = population.score_all()
+        for player, score in zip(population.population, scores):
+            self.assertEqual(score, score_player(
+                player, objective, population.opponents_information))
+
+    def test_cache_disabled_for_stochastic_evaluation(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           noise=0.1, repetitions=1)
+        population = dojo.Population(player_class=axl.EvolvableCycler,
+                                     params_kwargs={"cycle_length": 5},
+                                     size=4,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=[axl.TitForTat()])
+        self.assertIsNone(population.cache)
+
+    def test_cache_disabled_by_size(self):
+        objective = dojo.prepare_objective(name="score", turns=10, repetitions=1)
+        population = dojo.Population(player_class=axl.EvolvableCycler,
+                                     params_kwargs={"cycle_length": 5},
+                                     size=4,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=[axl.TitForTat()],
+                                     cache_size=0)
+        self.assertIsNone(population.cache)
+
+
+class TestVectorizedScoring(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def test_scores_match_score_player(self):
+        opponents = [axl.TitForTat(), axl.Alternator(), axl.Fortress3(),
+                     axl.EvolvedLookerUp2_2_2()]
+        for name in ["score", "score_diff"]:
+            objective = dojo.prepare_objective(name=name, turns=20,
+                                               repetitions=1)
+            population = dojo.Population(
+                player_class=axl.EvolvableFSMPlayer,
+                params_kwargs={"num_states": 4},
+                size=6,
+                objective=objective,
+                output_filename=self.temporary_file.name,
+                opponents=opponents,
+                weights=[1, 2, 3, 4],
+                cache_size=0)
+            self.assertIsNotNone(population.compiled_opponents)
+            scores = population.score_all()
+            for player, score in zip(population.population, scores):
+                self.assertEqual(score, score_player(
+                    player, objective, population.opponents_information,
+                    weights=population.weights))
+
+    def test_falls_back_for_uncompiled_opponents(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        population = dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                                     params_kwargs={"num_states": 2},
+                                     size=4,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=[axl.WinStayLoseShift()])
+        self.assertIsNone(population.compiled_opponents)
+        self.assertEqual(len(population.score_all()), 4)
+
+
+class TestDeduplication(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, noise=0):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           noise=noise, repetitions=1)
+        player = axl.EvolvableCycler(cycle="CD")
+        return dojo.Population(player_class=axl.EvolvableCycler,
+                               params_kwargs={"cycle_length": 4},
+                               size=4,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=[axl.WinStayLoseShift()],
+                               population=[player, player.clone(),
+                                           axl.EvolvableCycler(cycle="CDCD"),
+                                           axl.EvolvableCycler(cycle="DDCD")],
+                               cache_size=0)
+
+    def test_equivalent_players_are_scored_once(self):
+        population = self.population()
+        scores = population.score_all()
+        self.assertEqual(population.duplicates, 2)
+        self.assertEqual(scores[0], scores[1])
+        self.assertEqual(scores[0], scores[2])
+        for player, score in zip(population.population, scores):
+            self.assertEqual(score, score_player(
+                player, population.objective,
+                population.opponents_information))
+
+    def test_stochastic_evaluations_are_not_shared(self):
+        population = self.population(noise=0.1)
+        population.score_all()
+        self.assertEqual(population.duplicates, 0)
+
+
+class TestCommonRandomNumbers(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           noise=0.1, repetitions=2)
+        players = [axl.EvolvableCycler(cycle=cycle)
+                   for cycle in ["CD", "CDCD", "DDCD", "CCCD"]]
+        return dojo.Population(player_class=axl.EvolvableCycler,
+                               params_kwargs={"cycle_length": 4},
+                               size=4,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=[axl.TitForTat(), axl.Random()],
+                               population=players, seed=7, **kwargs)
+
+    def test_scores_do_not_depend_on_the_processes(self):
+        serial = self.population().score_all()
+        with self.population(processes=2) as population:
+            self.assertEqual(population.score_all(), serial)
+        with self.population(processes=2,
+                             granularity="match") as population:
+            self.assertEqual(population.score_all(), serial)
+
+    def test_equivalent_players_are_scored_once(self):
+        population = self.population()
+        scores = population.score_all()
+        self.assertEqual(population.duplicates, 1)
+        self.assertEqual(scores[0], scores[1])
+
+    def test_generations_have_their_own_seeds(self):
+        population = self.population()
+        seed = population.generation_seed()
+        population.generation += 1
+        self.assertNotEqual(population.generation_seed(), seed)
+
+
+class TestWorkerPool(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def test_pool_scores_match_serial_scores(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        opponents = [axl.WinStayLoseShift(), axl.TitForTat()]
+        population = dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                                     params_kwargs={"num_states": 3},
+                                     size=6,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=opponents,
+                                     processes=2,
+                                     chunksize=2,
+                                     cache_size=0)
+        scores = population.score_all()
+        for player, score in zip(population.population, scores):
+            self.assertEqual(score, score_player(
+                player, objective, population.opponents_information))
+
+    def test_initialize_worker(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        opponents_information = [utils.PlayerInfo(axl.TitForTat, {})]
+        context = utils.ScoringContext(axl.EvolvableCycler, objective,
+                                       opponents_information, None, None)
+        player = axl.EvolvableCycler(cycle="CD", seed=0)
+        serialized = player.serialize_parameters()
+        expected = score_player(player, objective, opponents_information)
+
+        self.assertIsNone(utils.score_serialized_player(
+            ("missing", serialized, None, None)))
+        utils.initialize_worker("key", context)
+        self.assertEqual(utils.score_serialized_player(
+            ("key", serialized, None, None)), expected)
+        self.assertEqual(utils.score_serialized_player(
+            ("other", serialized, None, context)), expected)
+        self.assertEqual(utils.score_serialized_player(
+            ("other", serialized, None, None)), expected)
+
+
+class TestLifecycle(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        return dojo.Population(player_class=axl.EvolvableCycler,
+                               params_kwargs={"cycle_length": 4},
+                               size=4,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=[axl.WinStayLoseShift()],
+                               cache_size=0,
+                               **kwargs)
+
+    def test_serial_population_has_no_pool(self):
+        with self.population() as population:
+            population.run(1, print_output=False)
+            self.assertIsNone(population.executor)
+
+    def test_pool_is_started_lazily_and_closed(self):
+        with self.population(processes=2) as population:
+            self.assertIsNone(population.executor)
+            population.run(1, print_output=False)
+            self.assertIsInstance(population.executor, dojo.PoolExecutor)
+            executor = population.executor
+        self.assertIsNone(population.executor)
+        self.assertIsNone(executor._pool)
+
+    def test_shared_executor(self):
+        with dojo.PoolExecutor(processes=2) as executor:
+            for _ in range(2):
+                with self.population(executor=executor) as population:
+                    scores = population.score_all()
+                    for player, score in zip(population.population, scores):
+                        self.assertEqual(score, score_player(
+                            player, population.objective,
+                            population.opponents_information))
+                self.assertIs(population.executor, executor)
+                self.assertIsNotNone(executor._pool)
+        self.assertIsNone(executor._pool)
+
+    def test_serial_executor(self):
+        population = self.population(executor=dojo.SerialExecutor())
+        self.assertEqual(len(population.score_all()), 4)
+        population.close()
+
+
+class TestMatchGranularity(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, objective, opponents, **kwargs):
+        return dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                               params_kwargs={"num_states": 3},
+                               size=4,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=opponents,
+                               granularity="match",
+                               cache_size=0,
+                               vectorize=False,
+                               **kwargs)
+
+    def test_invalid_granularity(self):
+        objective = dojo.prepare_objective(name="score", turns=10)
+        with self.assertRaises(ValueError):
+            dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                            params_kwargs={"num_states": 3},
+                            size=4,
+                            objective=objective,
+                            output_filename=self.temporary_file.name,
+                            granularity="opponent")
+
+    def test_scores_match_score_player(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        opponents = [axl.WinStayLoseShift(), axl.TitForTat(), axl.Grudger()]
+        for kwargs in [{}, {"weights": [1, 0, 3]}, {"sample_count": 5}]:
+            with self.population(objective, opponents, processes=2,
+                                 **kwargs) as population:
+                np.random.seed(0)
+                scores = population.score_all()
+                np.random.seed(0)
+                for player, score in zip(population.population, scores):
+                    self.assertEqual(score, score_player(
+                        player, objective, population.opponents_information,
+                        weights=population.weights,
+                        sample_count=population.sample_count))
+
+    def test_repetition_blocks(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=10)
+        opponents = [axl.TitForTat(), axl.Random()]
+        population = self.population(objective, opponents, block_size=4,
+                                     executor=dojo.SerialExecutor())
+        player = population.population[0]
+        self.assertEqual(population.repetition_blocks(player, 0), [None])
+        self.assertEqual(population.repetition_blocks(player, 1), [4, 4, 2])
+        scores = population.score_all()
+        self.assertEqual(len(scores), 4)
+        for score in scores:
+            self.assertTrue(0 <= score <= 5)
+
+
+class TestRacing(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        # Any cooperation against a Cooperator loses to the best players,
+        # and long cycles keep few players duplicates of each other
+        opponents = [axl.Cooperator()] * 10
+        return dojo.Population(player_class=axl.EvolvableCycler,
+                               params_kwargs={"cycle_length": 6},
+                               size=10,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=opponents,
+                               bottleneck=2,
+                               cache_size=0,
+                               vectorize=False,
+                               racing=True,
+                               **kwargs)
+
+    def test_racing_saves_matches(self):
+        for kwargs in [{}, {"processes": 2}]:
+            random.seed(0)
+            np.random.seed(0)
+            players = [axl.EvolvableCycler(cycle_length=6, seed=seed)
+                       for seed in range(10)]
+            with self.population(population=players,
+                                 **kwargs) as population:
+                population.run(3, print_output=False)
+                self.assertGreater(population.matches_saved, 0)
+                self.assertEqual(len(population.population), 10)
+
+    def test_complete_scores_are_exact(self):
+        population = self.population()
+        population.bottleneck = len(population.population)
+        scores = population.score_all()
+        self.assertEqual(population.matches_saved, 0)
+        np.random.seed(0)
+        for player, score in zip(population.population, scores):
+            self.assertAlmostEqual(score, score_player(
+                player, population.objective,
+                population.opponents_information))
+
+
+class TestRepetitionCount(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, objective, **kwargs):
+        return dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                               params_kwargs={"num_states": 3},
+                               size=4,
+                               bottleneck=2,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=[axl.Defector(), axl.Cooperator()],
+                               cache_size=0,
+                               vectorize=False,
+                               **kwargs)
+
+    def test_adaptive_repetitions_are_counted(self):
+        most = 4 * 2 * 50
+        objective = dojo.prepare_objective(name="score", turns=200,
+                                           noise=0.01, repetitions=50)
+        population = self.population(objective)
+        population.score_all()
+        self.assertEqual(population.repetitions, most)
+
+        objective = dojo.prepare_objective(name="score", turns=200,
+                                           noise=0.01, repetitions=50,
+                                           target_standard_error=0.1)
+        for kwargs in [{}, {"racing": True},
+                       {"executor": dojo.SerialExecutor()},
+                       {"executor": dojo.SerialExecutor(), "racing": True},
+                       {"executor": dojo.SerialExecutor(),
+                        "granularity": "match"}]:
+            with self.population(objective, **kwargs) as population:
+                population.score_all()
+                self.assertGreaterEqual(population.repetitions,
+                                        2 * utils.MIN_REPETITIONS)
+                self.assertLess(population.repetitions, most)
+
+
+class TestOutput(unittest.TestCase):
+    def test_buffered_rows_are_written_on_close(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        for output_format in ["csv", "arrow"]:
+            with tempfile.NamedTemporaryFile() as temporary_file:
+                with dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                                     params_kwargs={"num_states": 2},
+                                     size=4,
+                                     objective=objective,
+                                     output_filename=temporary_file.name,
+                                     opponents=[axl.TitForTat()],
+                                     output_format=output_format,
+                                     flush_interval=10) as population:
+                    population.run(3, print_output=False)
+                    self.assertEqual(len(population.outputer.buffer), 3)
+                if output_format == "csv":
+                    with open(temporary_file.name) as f:
+                        generations = [int(line.split(",")[0]) for line in f]
+                else:
+                    table = utils.read_arrow(temporary_file.name)
+                    generations = table.column("generation").to_pylist()
+                self.assertEqual(generations, [1, 2, 3])
+
+
+class TestCheckpoint(unittest.TestCase):
+    def population(self, output_filename, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        return dojo.Population(player_class=axl.EvolvableFSMPlayer,
+                               params_kwargs={"num_states": 3},
+                               size=8,
+                               objective=objective,
+                               output_filename=output_filename,
+                               opponents=[axl.TitForTat(), axl.Grudger(),
+                                          axl.Alternator()],
+                               **kwargs)
+
+    @staticmethod
+    def seed(seed):
+        random.seed(seed)
+        np.random.seed(seed)
+        axl._module_random.seed(seed)
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            uninterrupted = directory + "/uninterrupted.csv"
+            resumed = directory + "/resumed.csv"
+            checkpoint = directory + "/checkpoint"
+
+            self.seed(0)
+            self.population(uninterrupted, sample_count=2).run(
+                4, print_output=False)
+
+            self.seed(0)
+            population = self.population(resumed, sample_count=2,
+                                         checkpoint_filename=checkpoint)
+            population.run(2, print_output=False)
+
+            self.seed(1)
+            population = self.population(resumed, sample_count=2,
+                                         checkpoint_filename=checkpoint)
+            population.load_checkpoint()
+            self.assertEqual(population.generation, 2)
+            population.run(2, print_output=False)
+
+            with open(uninterrupted) as f, open(resumed) as g:
+                self.assertEqual(f.read(), g.read())
+
+    def test_resumed_run_keeps_the_surrogate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            uninterrupted = directory + "/uninterrupted.csv"
+            resumed = directory + "/resumed.csv"
+            checkpoint = directory + "/checkpoint"
+
+            def surrogate():
+                return dojo.Surrogate(oversampling=2, min_samples=4)
+
+            self.seed(0)
+            self.population(uninterrupted, surrogate=surrogate()).run(
+                4, print_output=False)
+
+            self.seed(0)
+            population = self.population(resumed, surrogate=surrogate(),
+                                         checkpoint_filename=checkpoint)
+            population.run(2, print_output=False)
+            samples = population.surrogate.samples
+
+            self.seed(1)
+            population = self.population(resumed, surrogate=surrogate(),
+                                         checkpoint_filename=checkpoint)
+            population.load_checkpoint()
+            self.assertEqual(population.surrogate.samples, samples)
+            population.run(2, print_output=False)
+
+            with open(uninterrupted) as f, open(resumed) as g:
+                self.assertEqual(f.read(), g.read())
+
+    def test_resumed_run_removes_rows_after_the_checkpoint(self):
+        for output_format in ["csv", "arrow"]:
+            with tempfile.TemporaryDirectory() as directory:
+                uninterrupted = directory + "/uninterrupted"
+                resumed = directory + "/resumed"
+                checkpoint = directory + "/checkpoint"
+                settings = {"sample_count": 2, "output_format": output_format}
+
+                def read(filename):
+                    if output_format == "arrow":
+                        return utils.read_arrow(filename).to_pylist()
+                    with open(filename) as f:
+                        return f.read()
+
+                self.seed(0)
+                with self.population(uninterrupted, **settings) as population:
+                    population.run(7, print_output=False)
+
+                # Stopped two generations after the checkpoint of the third
+                self.seed(0)
+                with self.population(resumed, checkpoint_filename=checkpoint,
+                                     checkpoint_interval=3,
+                                     **settings) as population:
+                    population.run(5, print_output=False)
+
+                self.seed(1)
+                with self.population(resumed, checkpoint_filename=checkpoint,
+                                     checkpoint_interval=3,
+                                     **settings) as population:
+                    population.load_checkpoint()
+                    self.assertEqual(population.generation, 3)
+                    population.run(4, print_output=False)
+
+                self.assertEqual(read(uninterrupted), read(resumed))
+
+    def test_checkpoint_interval_and_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = directory + "/checkpoint"
+            population = self.population(directory + "/output.csv",
+                                         checkpoint_filename=checkpoint,
+                                         checkpoint_interval=2)
+            population.run(3, print_output=False)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["checkpoint", "output.csv"])
+
+            resumed = self.population(directory + "/output.csv")
+            resumed.load_checkpoint(checkpoint)
+            self.assertEqual(resumed.generation, 2)
+            self.assertGreater(len(resumed.cache), 0)
+
+
+class TestDaskExecutor(unittest.TestCase):
+    def test_scores_match_serial_scores(self):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        opponents = [axl.TitForTat(), axl.Grudger(), axl.Alternator()]
+        with tempfile.NamedTemporaryFile() as temporary_file, \
+                dojo.DaskExecutor(processes=2) as executor:
+            population = dojo.Population(
+                player_class=axl.EvolvableFSMPlayer,
+                params_kwargs={"num_states": 3}, size=6, objective=objective,
+                output_filename=temporary_file.name, opponents=opponents,
+                cache_size=0, vectorize=False, executor=executor)
+            scores = population.score_all()
+            self.assertEqual(scores, [
+                score_player(player, objective,
+                             population.opponents_information)
+                for player in population.population])
+            population.close()
+            self.assertIsNotNone(executor._client)
+
+
+class TestIslands(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile(suffix=".csv")
+
+    def islands(self, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        return dojo.Islands(player_class=axl.EvolvableCycler,
+                            params_kwargs={"cycle_length": 4},
+                            size=8,
+                            bottleneck=2,
+                            objective=objective,
+                            output_filename=self.temporary_file.name,
+                            opponents=[axl.TitForTat(), axl.Defector()],
+                            num_islands=3,
+                            migration_interval=2,
+                            seed=1,
+                            **kwargs)
+
+    def tearDown(self):
+        for i in range(3):
+            filename = islands.island_filename(self.temporary_file.name, i)
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def cycles(self, islands):
+        return [[player.cycle for player in players]
+                for players in islands.islands]
+
+    def test_migration_targets(self):
+        self.assertEqual(islands.migration_targets("ring", 3),
+                         [[1], [2], [0]])
+        self.assertEqual(islands.migration_targets("complete", 3),
+                         [[1, 2], [0, 2], [0, 1]])
+        for i, targets in enumerate(islands.migration_targets("random", 5)):
+            self.assertEqual(len(targets), 1)
+            self.assertNotEqual(targets[0], i)
+        with self.assertRaises(ValueError):
+            islands.migration_targets("star", 3)
+
+    def test_too_many_migrants(self):
+        with self.assertRaises(ValueError):
+            self.islands(topology="complete", migrants=4)
+
+    def test_run(self):
+        with self.islands(processes=1) as serial:
+            serial.run(5, print_output=False)
+        self.assertEqual(serial.generation, 5)
+        for i in range(3):
+            filename = islands.island_filename(self.temporary_file.name, i)
+            with open(filename) as output:
+                generations = [int(line.split(",")[0]) for line in output]
+            self.assertEqual(generations, [1, 2, 3, 4, 5])
+            os.remove(filename)
+
+        # The same islands are evolved whatever the number of workers
+        with self.islands(processes=2) as parallel:
+            parallel.run(5, print_output=False)
+        self.assertEqual(self.cycles(serial), self.cycles(parallel))
+
+    def test_migrate(self):
+        with self.islands(processes=1, migrants=2) as model:
+            model.evolve(1)
+            best = [players[:2] for players in model.islands]
+            model.migrate()
+            for i, players in enumerate(model.islands):
+                self.assertEqual([player.cycle for player in players[-2:]],
+                                 [player.cycle for player in best[i - 1]])
+
+
+class TestSteadyState(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, **kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        opponents = [axl.TitForTat(), axl.Defector(), axl.Alternator()]
+        return dojo.SteadyStatePopulation(
+            player_class=axl.EvolvableCycler,
+            params_kwargs={"cycle_length": 4},
+            size=8,
+            bottleneck=2,
+            objective=objective,
+            output_filename=self.temporary_file.name,
+            opponents=opponents,
+            **kwargs)
+
+    def check(self, population):
+        self.assertEqual(population.generation, 3)
+        self.assertEqual(population.evaluations, 24)
+        self.assertEqual(len(population.population), 8)
+        self.assertEqual(population.unscored, [])
+        for player, score in zip(population.population, population.scores):
+            self.assertEqual(score, score_player(
+                player, population.objective,
+                population.opponents_information))
+
+    def test_serial(self):
+        with self.population() as population:
+            population.run(3, print_output=False)
+            self.check(population)
+        with open(self.temporary_file.name) as output:
+            rows = [line.split(",") for line in output]
+        best_scores = [float(row[3]) for row in rows[-3:]]
+        self.assertEqual(best_scores, sorted(best_scores))
+
+    def test_workers(self):
+        with self.population(processes=2, cache_size=0) as population:
+            population.run(3, print_output=False)
+            self.check(population)
+
+    def test_shared_executor(self):
+        # The pool is already running so the workers are sent the context
+        # with the tasks they could not score
+        with dojo.PoolExecutor(processes=2) as executor:
+            executor.map(abs, [0])
+            with self.population(executor=executor, pending=3) as population:
+                population.run(3, print_output=False)
+                self.check(population)
+
+    def test_unsupported_options(self):
+        for options in [{"fidelity": dojo.FidelitySchedule()},
+                        {"surrogate": dojo.Surrogate()},
+                        {"batch_breeding": True},
+                        {"racing": True},
+                        {"racing_confidence": 0.9},
+                        {"checkpoint_filename": "checkpoint"},
+                        {"granularity": "match"},
+                        {"block_size": 2}]:
+            with self.assertRaises(ValueError):
+                self.population(**options)
+        # The default values are accepted
+        self.population(racing=False, granularity="player").close()
@@ -0,0 +1,111 @@
+import unittest
+
+import axelrod as axl
+from axelrod_dojo import canonical
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = axl.Action.C, axl.Action.D
+
+TIT_FOR_TAT = ((0, C, 0, C), (0, D, 0, D))
+
+
+def actions(player, opponent, turns=30):
+    match = axl.Match((player, opponent), turns=turns, seed=1)
+    return [play for play, _ in match.play()]
+
+
+class FixedRandom(object):
+    """Stands in for the random number generator of a player, always
+    drawing the lowest values."""
+
+    def random(self, size=None):
+        if size is None:
+            return 0.
+        return [0.] * size
+
+    def randint(self, low, high=None):
+        return 0
+
+
+class TestCanonicalFSM(unittest.TestCase):
+    def test_prunes_unreachable_states(self):
+        transitions = TIT_FOR_TAT + ((1, C, 1, D), (1, D, 0, C))
+        self.assertEqual(canonical.canonical_fsm(transitions, 0, C),
+                         (TIT_FOR_TAT, 0, C))
+
+    def test_relabels_states(self):
+        transitions = ((0, C, 0, C), (0, D, 1, D),
+                       (1, C, 0, C), (1, D, 2, D),
+                       (2, C, 2, D), (2, D, 2, D))
+        # States 0, 1 and 2 renamed 1, 2 and 0
+        relabeled = ((0, C, 0, D), (0, D, 0, D),
+                     (1, C, 1, C), (1, D, 2, D),
+                     (2, C, 1, C), (2, D, 0, D))
+        self.assertEqual(canonical.canonical_fsm(transitions, 0, C),
+                         canonical.canonical_fsm(relabeled, 1, C))
+        self.assertEqual(canonical.canonical_fsm(transitions, 0, C),
+                         (transitions, 0, C))
+
+    def test_merges_equivalent_states(self):
+        transitions = ((0, C, 1, C), (0, D, 0, D),
+                       (1, C, 0, C), (1, D, 1, D))
+        self.assertEqual(canonical.canonical_fsm(transitions, 0, C),
+                         (TIT_FOR_TAT, 0, C))
+
+    def test_keeps_the_initial_action(self):
+        self.assertNotEqual(canonical.canonical_fsm(TIT_FOR_TAT, 0, C),
+                            canonical.canonical_fsm(TIT_FOR_TAT, 0, D))
+
+    def test_canonical_players_play_the_same(self):
+        opponents = [axl.Alternator(), axl.TitForTat(), axl.CyclerCCD(),
+                     axl.Random()]
+        for seed in range(10):
+            player = axl.EvolvableFSMPlayer(num_states=6, seed=seed)
+            transitions, initial_state, initial_action = \
+                canonical.canonical_fsm(player.fsm.transitions(),
+                                        player.initial_state,
+                                        player.initial_action)
+            canonical_player = axl.FSMPlayer(transitions, initial_state,
+                                             initial_action)
+            self.assertLessEqual(canonical_player.fsm.num_states(), 6)
+            for opponent in opponents:
+                self.assertEqual(
+                    actions(player, opponent.clone()),
+                    actions(canonical_player, opponent.clone()))
+
+
+class TestCanonicalKey(unittest.TestCase):
+    def test_fsm_players(self):
+        player = axl.EvolvableFSMPlayer(
+            transitions=TIT_FOR_TAT + ((1, C, 1, D), (1, D, 0, C)),
+            initial_state=0, initial_action=C)
+        self.assertEqual(canonical.canonical_key(player),
+                         ("fsm", TIT_FOR_TAT, 0, C))
+        pfsm = EvolvablePFSMPlayer(transitions=TIT_FOR_TAT, initial_state=0,
+                                   initial_action=C)
+        self.assertEqual(canonical.canonical_key(pfsm),
+                         canonical.canonical_key(player))
+
+    def test_cycles(self):
+        self.assertEqual(canonical.canonical_cycle("CDCDCD"), "CD")
+        self.assertEqual(canonical.canonical_cycle("CCD"), "CCD")
+        self.assertEqual(
+            canonical.canonical_key(axl.EvolvableCycler(cycle="DCDC")),
+            canonical.canonical_key(axl.EvolvableCycler(cycle="DC")))
+
+    def test_other_players(self):
+        player = axl.EvolvableGambler(parameters=(1, 1, 0), seed=1)
+        self.assertEqual(canonical.canonical_key(player),
+                         ("EvolvableGambler", player.serialize_parameters()))
+
+
+class TestPFSMNodeSwap(unittest.TestCase):
+    def test_swaps_distinct_nodes(self):
+        rows = [[0, C, 1, C], [0, D, 0, D], [1, C, 1, D], [1, D, 0, C]]
+        player = EvolvablePFSMPlayer(num_states=2, seed=1)
+        player._random = FixedRandom()
+        swapped = player.mutate_rows([list(row) for row in rows],
+                                     mutation_probability=0)
+        # The actions of the rows become probabilities of playing C
+        self.assertEqual(swapped, [[0, C, 1, 0.], [0, D, 0, 1.],
+                                   [1, C, 1, 1.], [1, D, 0, 0.]])
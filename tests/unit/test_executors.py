@@ -0,0 +1,119 @@
+import pickle
+from queue import Queue
+import unittest
+
+from axelrod_dojo import utils
+from axelrod_dojo.executors import DaskExecutor, PoolExecutor, SerialExecutor
+
+
+def square(x):
+    return x ** 2
+
+
+def fail(x):
+    raise ValueError(x)
+
+
+def installed_context(key):
+    return utils._worker_contexts.get(key)
+
+
+def plugin_names(dask_worker):
+    return sorted(name for name in dask_worker.plugins
+                  if name.startswith("axelrod_dojo"))
+
+
+class TestSerialExecutor(unittest.TestCase):
+    def test_map(self):
+        with SerialExecutor() as executor:
+            self.assertEqual(executor.map(square, range(4)), [0, 1, 4, 9])
+
+    def test_submit(self):
+        results, errors = [], []
+        with SerialExecutor() as executor:
+            executor.submit(square, 3, results.append, errors.append)
+            executor.submit(fail, 3, results.append, errors.append)
+            with self.assertRaises(ValueError):
+                executor.submit(fail, 3, results.append)
+        self.assertEqual(results, [9])
+        self.assertIsInstance(errors[0], ValueError)
+
+
+class TestPoolExecutor(unittest.TestCase):
+    def test_map(self):
+        with PoolExecutor(processes=2) as executor:
+            self.assertIsNone(executor._pool)
+            self.assertEqual(executor.map(square, range(4), chunksize=2),
+                             [0, 1, 4, 9])
+            self.assertIsNotNone(executor._pool)
+        self.assertIsNone(executor._pool)
+
+    def test_run_on_workers(self):
+        with PoolExecutor(processes=2) as executor:
+            self.assertTrue(executor.run_on_workers(utils.initialize_worker,
+                                                    "pool", "context"))
+            self.assertEqual(executor.map(installed_context, ["pool"] * 4),
+                             ["context"] * 4)
+            self.assertFalse(executor.run_on_workers(utils.initialize_worker,
+                                                     "late", "context"))
+
+    def test_submit(self):
+        results, errors = Queue(), Queue()
+        with PoolExecutor(processes=2) as executor:
+            for x in range(3):
+                executor.submit(square, x, results.put, errors.put)
+            executor.submit(fail, 3, results.put, errors.put)
+            self.assertEqual(sorted(results.get(timeout=60)
+                                    for _ in range(3)), [0, 1, 4])
+            self.assertIsInstance(errors.get(timeout=60), ValueError)
+
+    def test_default_processes(self):
+        executor = PoolExecutor(processes=0)
+        self.assertGreater(executor.processes, 0)
+
+    def test_pickle_without_pool(self):
+        with PoolExecutor(processes=2) as executor:
+            executor.map(square, range(2))
+            copy = pickle.loads(pickle.dumps(executor))
+            self.assertIsNone(copy._pool)
+            self.assertEqual(copy.processes, 2)
+
+
+class TestDaskExecutor(unittest.TestCase):
+    def test_local_cluster(self):
+        with DaskExecutor(processes=2) as executor:
+            self.assertIsNone(executor._client)
+            self.assertEqual(executor.processes, 2)
+            self.assertEqual(executor.map(square, range(5), chunksize=2),
+                             [0, 1, 4, 9, 16])
+            self.assertEqual(sorted(executor.imap_unordered(square, range(3))),
+                             [0, 1, 4])
+            self.assertTrue(executor.run_on_workers(utils.initialize_worker,
+                                                    "dask", "context"))
+            self.assertEqual(executor.map(installed_context, ["dask"] * 4),
+                             ["context"] * 4)
+            results, errors = Queue(), Queue()
+            executor.submit(square, 3, results.put, errors.put)
+            executor.submit(fail, 3, results.put, errors.put)
+            self.assertEqual(results.get(timeout=60), 9)
+            self.assertIsInstance(errors.get(timeout=60), ValueError)
+        self.assertIsNone(executor._client)
+        self.assertIsNone(executor._cluster)
+
+    def test_plugins_are_replaced_and_unregistered(self):
+        from distributed import Client, LocalCluster
+        with LocalCluster(n_workers=1, threads_per_worker=1, processes=False,
+                          dashboard_address=None) as cluster, \
+                Client(cluster) as client:
+            executor = DaskExecutor(client=client)
+            for context in ["first", "second"]:
+                executor.run_on_workers(utils.initialize_worker, "dask",
+                                        context)
+            executor.run_on_workers(utils.initialize_worker, "other",
+                                    "context")
+            self.assertEqual(executor.map(installed_context, ["dask"]),
+                             ["second"])
+            names = list(client.run(plugin_names).values())[0]
+            self.assertEqual(len(names), 2)
+            executor.close()
+            self.assertEqual(list(client.run(plugin_names).values()), [[]])
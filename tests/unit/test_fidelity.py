@@ -0,0 +1,113 @@
+import random
+import tempfile
+import unittest
+
+import axelrod as axl
+import axelrod_dojo as dojo
+from axelrod_dojo import fidelity
+from axelrod_dojo.utils import PlayerInfo, prepare_objective, score_player
+
+
+class TestStratifiedSample(unittest.TestCase):
+    def test_opponent_strata(self):
+        opponents_information = [PlayerInfo(s, {}) for s in
+                                 [axl.TitForTat, axl.Random, axl.Grudger,
+                                  axl.Cooperator, axl.Defector]]
+        strata = fidelity.opponent_strata(opponents_information)
+        self.assertEqual(sorted(map(sorted, strata)), [[0], [1], [2], [3, 4]])
+
+    def test_every_stratum_gets_its_share(self):
+        strata = [list(range(6)), list(range(6, 9)), [9]]
+        indices, weights = fidelity.stratified_sample(strata, 5,
+                                                      random.Random(0))
+        self.assertEqual(indices, sorted(indices))
+        self.assertEqual(len(set(indices)), 5)
+        self.assertEqual(sum(index < 6 for index in indices), 3)
+        # The weights add up to the number of opponents
+        self.assertAlmostEqual(sum(weights), 10)
+
+    def test_sample_of_everything(self):
+        strata = [[0, 2], [1]]
+        self.assertEqual(fidelity.stratified_sample(strata, 10),
+                         ([0, 1, 2], [1., 1., 1.]))
+
+
+class TestFidelitySchedule(unittest.TestCase):
+    def test_invalid_schedules(self):
+        with self.assertRaises(ValueError):
+            fidelity.FidelitySchedule(opponent_fractions=(.5, 1),
+                                      turn_fractions=(1,),
+                                      repetition_fractions=(.5, 1))
+        with self.assertRaises(ValueError):
+            fidelity.FidelitySchedule(opponent_fractions=(.5, .5),
+                                      turn_fractions=(.5, 1),
+                                      repetition_fractions=(.5, 1))
+        with self.assertRaises(ValueError):
+            fidelity.FidelitySchedule(opponent_fractions=(0, 1),
+                                      turn_fractions=(.5, 1),
+                                      repetition_fractions=(.5, 1))
+
+    def test_evaluation(self):
+        schedule = fidelity.FidelitySchedule(seed=0)
+        objective = prepare_objective(name="score", turns=200, repetitions=10)
+        opponents_information = [PlayerInfo(axl.Defector, {})] * 8
+        level_objective, opponents, weights = schedule.evaluation(
+            0, objective, opponents_information, [1] * 8)
+        self.assertEqual(level_objective.keywords["turns"], 50)
+        self.assertEqual(level_objective.keywords["repetitions"], 3)
+        self.assertEqual(len(opponents), 2)
+        self.assertEqual(weights, [4., 4.])
+        # The sample of a level is drawn once
+        self.assertEqual(schedule.evaluation(0, objective,
+                                             opponents_information)[1:],
+                         (opponents, [4., 4.]))
+
+    def test_fidelity_rises_when_the_best_score_stalls(self):
+        schedule = fidelity.FidelitySchedule(patience=2)
+        self.assertEqual(schedule.update(1), 0)
+        self.assertEqual(schedule.update(2), 0)
+        self.assertEqual(schedule.update(2), 0)
+        self.assertEqual(schedule.update(1), 1)
+        for _ in range(4):
+            schedule.update(2)
+        self.assertTrue(schedule.full)
+        self.assertEqual(schedule.update(0), 2)
+
+    def test_max_generations(self):
+        schedule = fidelity.FidelitySchedule(max_generations=1)
+        self.assertEqual(schedule.update(1), 1)
+        self.assertEqual(schedule.update(2), 2)
+
+
+class TestPopulationFidelity(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def test_finalists_get_full_scores(self):
+        objective = prepare_objective(name="score", turns=20, repetitions=1)
+        opponents = [axl.TitForTat(), axl.Defector(), axl.Grudger(),
+                     axl.Cooperator(), axl.Alternator(), axl.SuspiciousTitForTat()]
+        schedule = dojo.FidelitySchedule(opponent_fractions=(.5, 1),
+                                         turn_fractions=(.5, 1),
+                                         repetition_fractions=(1, 1),
+                                         patience=1, seed=0)
+        population = dojo.Population(player_class=axl.EvolvableCycler,
+                                     params_kwargs={"cycle_length": 4},
+                                     size=8,
+                                     objective=objective,
+                                     output_filename=self.temporary_file.name,
+                                     opponents=opponents,
+                                     fidelity=schedule,
+                                     print_output=False)
+        self.assertEqual(len(population.opponents_information), 3)
+        self.assertEqual(population.objective.keywords["turns"], 10)
+        for _ in range(3):
+            population.evolve()
+            population.outputer.flush()
+            with open(self.temporary_file.name) as output:
+                row = output.readlines()[-1].split(",")
+            best = axl.EvolvableCycler.deserialize_parameters(row[-1].strip())
+            self.assertAlmostEqual(float(row[3]), score_player(
+                best, objective, population.full_evaluation[
+                    "opponents_information"]))
+        self.assertTrue(schedule.full)
+        self.assertEqual(len(population.opponents_information), 6)
@@ -0,0 +1,191 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import axelrod as axl
+import axelrod_dojo as dojo
+from axelrod_dojo import genomes
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = axl.Action.C, axl.Action.D
+
+
+class TestFSMGenomes(unittest.TestCase):
+    def test_round_trip(self):
+        players = [axl.EvolvableFSMPlayer(num_states=3, seed=seed)
+                   for seed in range(4)]
+        batch = genomes.FSMGenomes.from_players(players)
+        self.assertEqual(batch.tables.shape, (4, 6, 2))
+        for player, copy in zip(players, batch.to_players()):
+            self.assertIsInstance(copy, axl.EvolvableFSMPlayer)
+            self.assertEqual(copy.fsm.transitions(), player.fsm.transitions())
+            self.assertEqual(copy.initial_state, player.initial_state)
+            self.assertEqual(copy.initial_action, player.initial_action)
+
+    def test_random(self):
+        batch = genomes.FSMGenomes.random(
+            5, 4, random_state=np.random.RandomState(0))
+        self.assertEqual(len(batch), 5)
+        self.assertTrue(((batch.tables[:, :, 0] >= 0)
+                         & (batch.tables[:, :, 0] < 4)).all())
+        for player in batch.to_players():
+            self.assertEqual(player.num_states, 4)
+
+    def test_mutate_swaps_the_rows_of_two_states(self):
+        batch = genomes.FSMGenomes.random(
+            200, 3, mutation_probability=0,
+            random_state=np.random.RandomState(1))
+        mutants = batch.mutate()
+        self.assertFalse((mutants.tables == batch.tables).all())
+        # Without flips the rows of each machine are only permuted by state
+        for table, mutant in zip(batch.tables, mutants.tables):
+            self.assertEqual(sorted(map(tuple, table.reshape(3, 4))),
+                             sorted(map(tuple, mutant.reshape(3, 4))))
+        self.assertTrue((mutants.initial_actions == batch.initial_actions)
+                        .all())
+
+    def test_mutate_flips_actions(self):
+        batch = genomes.FSMGenomes.random(
+            2, 5, mutation_probability=1,
+            random_state=np.random.RandomState(2))
+        mutants = batch.mutate()
+        self.assertEqual(sorted(mutants.tables[:, :, 1].sum(axis=1)),
+                         sorted(10 - batch.tables[:, :, 1].sum(axis=1)))
+
+    def test_crossover(self):
+        tables = np.zeros((2, 8, 2), dtype=int)
+        tables[1, :, 1] = 1
+        batch = genomes.FSMGenomes(tables, [0, 1], [0, 1],
+                                   random_state=np.random.RandomState(3))
+        children = batch.crossover([0] * 20, [1] * 20)
+        for table in children.tables:
+            actions = table[:, 1].tolist()
+            # The rows of the first parent come first, by state
+            self.assertEqual(actions, sorted(actions))
+            self.assertEqual(actions.count(0) % 2, 0)
+        self.assertEqual(children.initial_states.tolist(), [0] * 20)
+
+
+class TestPFSMGenomes(unittest.TestCase):
+    def test_round_trip(self):
+        players = [EvolvablePFSMPlayer(num_states=2, mutation_distance=.2,
+                                       seed=seed) for seed in range(3)]
+        batch = genomes.PFSMGenomes.from_players(players)
+        self.assertEqual(batch.tables.dtype, np.float64)
+        self.assertEqual(batch.mutation_distance, .2)
+        for player, copy in zip(players, batch.to_players()):
+            self.assertIsInstance(copy, EvolvablePFSMPlayer)
+            self.assertEqual(copy.fsm.transitions(), player.fsm.transitions())
+            self.assertEqual(copy.mutation_distance, .2)
+
+    def test_mutate_adds_gaussian_noise(self):
+        batch = genomes.PFSMGenomes.random(
+            50, 3, mutation_probability=1, mutation_distance=.05,
+            random_state=np.random.RandomState(4))
+        mutants = batch.mutate()
+        # The node swaps only permute the next states of a machine
+        self.assertEqual(mutants.tables[:, :, 0].sum(axis=1).tolist(),
+                         batch.tables[:, :, 0].sum(axis=1).tolist())
+        probabilities = mutants.tables[:, :, 1]
+        self.assertTrue(((probabilities >= 0) & (probabilities <= 1)).all())
+        changes = np.abs(np.sort(probabilities, axis=1)
+                         - np.sort(batch.tables[:, :, 1], axis=1))
+        self.assertGreater(changes.mean(), 0)
+        self.assertLess(changes.mean(), .1)
+
+
+class TestLookupGenomes(unittest.TestCase):
+    def test_round_trip(self):
+        players = [axl.EvolvableLookerUp(parameters=(1, 1, 1), seed=seed)
+                   for seed in range(3)]
+        batch = genomes.LookupGenomes.from_players(players)
+        self.assertEqual(batch.tables.shape, (3, 8))
+        for player, copy in zip(players, batch.to_players()):
+            self.assertEqual(copy.lookup_dict, player.lookup_dict)
+            self.assertEqual(copy.initial_actions, player.initial_actions)
+            self.assertEqual(copy.mutation_probability,
+                             player.mutation_probability)
+
+    def test_mutate_and_crossover(self):
+        batch = genomes.LookupGenomes(
+            [[0] * 4, [1] * 4], [[0], [1]], (1, 1, 0),
+            mutation_probability=1, random_state=np.random.RandomState(0))
+        mutants = batch.mutate()
+        self.assertEqual(mutants.tables.tolist(), [[1] * 4, [0] * 4])
+        self.assertEqual(mutants.initial_actions.tolist(), [[1], [0]])
+        children = batch.crossover([0] * 10, [1] * 10)
+        for table in children.tables.tolist():
+            self.assertEqual(table, sorted(table))
+        self.assertEqual(children.initial_actions.tolist(), [[0]] * 10)
+
+    def test_invalid_tables(self):
+        with self.assertRaises(ValueError):
+            genomes.LookupGenomes([[0] * 3], [[0]], (1, 1, 0))
+
+    def test_random_players_use_the_given_initial_actions(self):
+        C, D = axl.Action.C, axl.Action.D
+        for parameters, initial_actions, expected in [
+                ((3, 1, 1), (C, C, C), (C, C, C)),
+                ((1, 1, 1), (D, C, C), (D,)),
+                ((1, 2, 1), (D,), (D, C))]:
+            params_kwargs = {"parameters": parameters,
+                             "initial_actions": initial_actions}
+            batch = genomes.random_genomes(
+                axl.EvolvableLookerUp, params_kwargs, 5,
+                random_state=np.random.RandomState(0))
+            player = axl.EvolvableLookerUp(seed=0, **params_kwargs)
+            self.assertEqual(player.initial_actions, expected)
+            for copy in batch.to_players():
+                self.assertEqual(copy.initial_actions, expected)
+        batch = genomes.random_genomes(axl.EvolvableLookerUp,
+                                       {"parameters": (1, 1, 2)}, 20,
+                                       random_state=np.random.RandomState(0))
+        self.assertEqual(batch.initial_actions.shape, (20, 2))
+        self.assertEqual(len(np.unique(batch.initial_actions, axis=0)), 4)
+
+
+class TestGenomeClass(unittest.TestCase):
+    def test_genome_class(self):
+        self.assertIs(genomes.genome_class(axl.EvolvableFSMPlayer),
+                      genomes.FSMGenomes)
+        self.assertIs(genomes.genome_class(EvolvablePFSMPlayer),
+                      genomes.PFSMGenomes)
+        self.assertIs(genomes.genome_class(axl.EvolvableLookerUp),
+                      genomes.LookupGenomes)
+        self.assertIsNone(genomes.genome_class(axl.EvolvableCycler))
+        with self.assertRaises(ValueError):
+            genomes.random_genomes(axl.EvolvableCycler, {"cycle_length": 3},
+                                   2)
+
+
+class TestBatchBreeding(unittest.TestCase):
+    temporary_file = tempfile.NamedTemporaryFile()
+
+    def population(self, player_class, params_kwargs):
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        return dojo.Population(player_class=player_class,
+                               params_kwargs=params_kwargs,
+                               size=12,
+                               objective=objective,
+                               output_filename=self.temporary_file.name,
+                               opponents=[axl.TitForTat(), axl.Defector()],
+                               batch_breeding=True,
+                               print_output=False)
+
+    def test_generations(self):
+        for player_class, params_kwargs in [
+                (axl.EvolvableFSMPlayer, {"num_states": 3}),
+                (EvolvablePFSMPlayer, {"num_states": 3,
+                                       "mutation_distance": .2}),
+                (axl.EvolvableLookerUp, {"parameters": (1, 1, 0)})]:
+            population = self.population(player_class, params_kwargs)
+            population.run(3, print_output=False)
+            self.assertEqual(len(population.population), 12)
+            for player in population.population:
+                self.assertIsInstance(player, player_class)
+
+    def test_unsupported_player_class(self):
+        with self.assertRaises(ValueError):
+            self.population(axl.EvolvableCycler, {"cycle_length": 3})
@@ -0,0 +1,193 @@
+import unittest
+
+import axelrod as axl
+from axelrod_dojo import match_engine
+from axelrod_dojo.probabilistic_fsm import EvolvablePFSMPlayer
+
+C, D = axl.Action.C, axl.Action.D
+
+
+def final_score_per_turn(player, opponent, turns):
+    match = axl.Match((player, opponent), turns=turns)
+    match.play()
+    return match.final_score_per_turn()
+
+
+def deterministic_players():
+    return [
+        axl.Cooperator(),
+        axl.Defector(),
+        axl.TitForTat(),
+        axl.Grudger(),
+        axl.Alternator(),
+        axl.CyclerCCD(),
+        axl.Fortress3(),
+        axl.Predator(),
+        axl.EvolvedLookerUp2_2_2(),
+        axl.Winner12(),
+        axl.EvolvableCycler(cycle_length=7, seed=1),
+        axl.EvolvableFSMPlayer(num_states=4, seed=2),
+        axl.EvolvableLookerUp(parameters=(1, 2, 2), seed=3),
+        EvolvablePFSMPlayer(
+            transitions=((0, C, 1, 1.), (0, D, 2, 0.), (1, C, 2, 0.),
+                         (1, D, 0, 1.), (2, C, 0, 1.), (2, D, 1, 0.)),
+            initial_state=0, initial_action=C),
+    ]
+
+
+class TestCompilePlayer(unittest.TestCase):
+    def test_compiles_deterministic_players(self):
+        for player in deterministic_players():
+            compiled = match_engine.compile_player(player)
+            self.assertIsInstance(compiled, match_engine.CompiledPlayer)
+            self.assertEqual(compiled.transitions.shape,
+                             (compiled.num_states, 2))
+
+    def test_does_not_compile_other_players(self):
+        for player in [axl.Random(), axl.EvolvableGambler(
+                parameters=(1, 1, 1), seed=0), axl.WinStayLoseShift(),
+                EvolvablePFSMPlayer(num_states=3, seed=4)]:
+            self.assertIsNone(match_engine.compile_player(player))
+
+    def test_machine_size_is_bounded(self):
+        player = axl.EvolvableLookerUp(parameters=(1, 1, 2), seed=0)
+        max_states = match_engine.MAX_STATES
+        try:
+            match_engine.MAX_STATES = 2
+            self.assertIsNone(match_engine.compile_player(player))
+        finally:
+            match_engine.MAX_STATES = max_states
+
+
+class TestPlay(unittest.TestCase):
+    def test_play_match_matches_axelrod(self):
+        for player in deterministic_players():
+            for opponent in deterministic_players():
+                for turns in [1, 5, 23, 200]:
+                    scores = match_engine.play_match(player, opponent, turns)
+                    self.assertEqual(
+                        (scores[0] / turns, scores[1] / turns),
+                        final_score_per_turn(player.clone(), opponent.clone(),
+                                             turns))
+
+    def test_long_matches_are_completed_in_closed_form(self):
+        turns = 10 ** 7
+        self.assertEqual(
+            match_engine.play_match(axl.TitForTat(), axl.Defector(), turns),
+            (turns - 1, 5 + turns - 1))
+        compiled = [match_engine.compile_player(axl.TitForTat()),
+                    match_engine.compile_player(axl.Alternator())]
+        scores, co_scores = match_engine.play_batch(
+            compiled, compiled, [(0, 1), (1, 0)], turns)
+        expected = match_engine.play_match(axl.TitForTat(), axl.Alternator(),
+                                           turns)
+        self.assertEqual((scores[0], co_scores[0]), expected)
+        self.assertEqual((co_scores[1], scores[1]), expected)
+
+    def test_cycles_match_full_play(self):
+        players = [axl.EvolvableFSMPlayer(num_states=8, seed=seed)
+                   for seed in range(10)]
+        players += [axl.EvolvableLookerUp(parameters=(2, 1, 1), seed=seed)
+                    for seed in range(5)]
+        compiled = [match_engine.compile_player(p) for p in players]
+        pairs = [(i, j) for i in range(len(players))
+                 for j in range(len(players))]
+        for turns in [2, 3, 64, 65, 301]:
+            scores, co_scores = match_engine.play_batch(
+                compiled, compiled, pairs, turns)
+            for (i, j), score, co_score in zip(pairs, scores, co_scores):
+                expected = final_score_per_turn(players[i].clone(),
+                                                players[j].clone(), turns)
+                self.assertEqual((score / turns, co_score / turns), expected)
+
+    def test_play_match_with_uncompiled_player(self):
+        self.assertIsNone(match_engine.play_match(
+            axl.TitForTat(), axl.Random(), 10))
+
+    def test_play_match_compiles_evolvable_players_once(self):
+        player = axl.EvolvableLookerUp(parameters=(1, 1, 1), seed=0)
+        compile_player = match_engine.compile_player
+        compiled = []
+
+        def counting_compile_player(p):
+            compiled.append(p)
+            return compile_player(p)
+
+        match_engine._compiled_players.clear()
+        try:
+            match_engine.compile_player = counting_compile_player
+            # Nothing is compiled against an opponent that can not be
+            self.assertIsNone(match_engine.play_match(player, axl.Random(), 10))
+            self.assertEqual(compiled, [])
+            for _ in range(3):
+                scores = match_engine.play_match(player, axl.TitForTat(), 10)
+        finally:
+            match_engine.compile_player = compile_player
+        self.assertEqual(sum(p is player for p in compiled), 1)
+        self.assertEqual(scores, match_engine.play_match(
+            player.clone(), axl.TitForTat(), 10))
+
+    def test_play_batch_matches_play_match(self):
+        players = deterministic_players()
+        compiled = [match_engine.compile_player(p) for p in players]
+        pairs = [(i, j) for i in range(len(players))
+                 for j in range(len(players))]
+        scores, co_scores = match_engine.play_batch(
+            compiled, compiled, pairs, 17)
+        for (i, j), score, co_score in zip(pairs, scores, co_scores):
+            self.assertEqual(
+                (score, co_score),
+                match_engine.play_match(players[i], players[j], 17))
+
+    def test_play_batch_without_pairs(self):
+        scores, co_scores = match_engine.play_batch([], [], [], 10)
+        self.assertEqual(len(scores), 0)
+        self.assertEqual(len(co_scores), 0)
+
+
+class TestReplayPlayer(unittest.TestCase):
+    def open_loop_players(self):
+        return [
+            axl.Cooperator(),
+            axl.Defector(),
+            axl.CyclerCCD(),
+            axl.EvolvableCycler(cycle="DDCDC"),
+            # C, then D, then C for ever whatever the opponent plays
+            axl.FSMPlayer(transitions=((0, C, 1, D), (0, D, 1, D),
+                                       (1, C, 1, C), (1, D, 1, C)),
+                          initial_state=0, initial_action=C),
+        ]
+
+    def test_open_loop_moves(self):
+        self.assertEqual(match_engine.open_loop_moves(axl.CyclerCCD()),
+                         ((), (C, C, D)))
+        self.assertEqual(
+            match_engine.open_loop_moves(self.open_loop_players()[-1]),
+            ((C, D), (C,)))
+
+    def test_closed_loop_players_are_not_replayed(self):
+        for player in [axl.TitForTat(), axl.Alternator(), axl.Random(),
+                       axl.EvolvedLookerUp2_2_2(),
+                       axl.EvolvableFSMPlayer(num_states=4, seed=1)]:
+            self.assertIsNone(match_engine.replay_player(player))
+
+    def test_replay_plays_the_same_moves(self):
+        opponents = [axl.TitForTat(), axl.Random(), axl.Grudger()]
+        for player in self.open_loop_players():
+            replay = match_engine.replay_player(player)
+            self.assertEqual(str(replay), str(player))
+            for opponent in opponents:
+                for noise in [0, 0.2]:
+                    expected = axl.Match((player, opponent.clone()), turns=20,
+                                         noise=noise, seed=3).play()
+                    replayed = axl.Match((replay, opponent.clone()), turns=20,
+                                         noise=noise, seed=3).play()
+                    self.assertEqual(replayed, expected)
+
+    def test_replay_compiles(self):
+        for player in self.open_loop_players():
+            replay = match_engine.replay_player(player)
+            for turns in [1, 7, 30]:
+                self.assertEqual(
+                    match_engine.play_match(replay, axl.TitForTat(), turns),
+                    match_engine.play_match(player, axl.TitForTat(), turns))
@@ -0,0 +1,156 @@
+import pickle
+import unittest
+
+import axelrod as axl
+from axelrod.strategies.finite_state_machines import SimpleFSM
+
+from axelrod_dojo.probabilistic_fsm import (ArrayFSM, BlockRandomGenerator,
+                                            EvolvablePFSMPlayer)
+
+C, D = axl.Action.C, axl.Action.D
+
+TRANSITIONS = ((0, C, 1, C), (0, D, 0, D), (1, C, 1, D), (1, D, 0, C))
+
+
+class TestArrayFSM(unittest.TestCase):
+    def test_matches_simple_fsm(self):
+        fsm = ArrayFSM(TRANSITIONS, 0)
+        simple = SimpleFSM(TRANSITIONS, 0)
+        self.assertEqual(fsm.next_states, (1, 0, 1, 0))
+        self.assertEqual(fsm.actions, (C, D, D, C))
+        self.assertEqual(fsm.transitions(), simple.transitions())
+        self.assertEqual(fsm.state_transitions, simple.state_transitions)
+        self.assertEqual(fsm.num_states(), 2)
+        self.assertEqual(fsm, simple)
+        for coplay in [C, C, D, D, C, D]:
+            self.assertEqual(fsm.move(coplay), simple.move(coplay))
+            self.assertEqual(fsm.state, simple.state)
+
+    def test_state_labels(self):
+        # Tit For Tat in the labels of the Axelrod library
+        fsm = ArrayFSM(((1, C, 1, C), (1, D, 1, D)), 1)
+        self.assertEqual(fsm.num_states(), 1)
+        self.assertEqual(fsm.transitions(), [[1, C, 1, C], [1, D, 1, D]])
+        self.assertEqual(fsm.move(D), D)
+
+    def test_bad_input(self):
+        with self.assertRaises(ValueError):
+            ArrayFSM(((0, C, 1, C), (0, D, 0, D)), 0)
+        with self.assertRaises(ValueError):
+            ArrayFSM(TRANSITIONS, 2)
+        fsm = ArrayFSM(TRANSITIONS, 0)
+        with self.assertRaises(ValueError):
+            fsm.state = 3
+        with self.assertRaises(AttributeError):
+            fsm.other = 1
+
+    def test_operators(self):
+        fsm = ArrayFSM(TRANSITIONS, 0)
+        swapped = fsm.swap(0, 1)
+        self.assertEqual(swapped.next_states, (1, 0, 1, 0))
+        self.assertEqual(swapped.actions, (D, C, C, D))
+        spliced = fsm.splice(swapped, 2)
+        self.assertEqual(spliced.actions, (C, D, C, D))
+
+    def test_pickle(self):
+        fsm = ArrayFSM(TRANSITIONS, 1)
+        self.assertEqual(pickle.loads(pickle.dumps(fsm)), fsm)
+
+
+class TestBlockRandomGenerator(unittest.TestCase):
+    def test_blocks(self):
+        generator = BlockRandomGenerator(seed=0, block_size=4)
+        draws = [generator.draw() for _ in range(6)]
+        self.assertEqual(len(generator._block), 2)
+        self.assertTrue(all(0 <= r < 1 for r in draws))
+        generator.seed(0)
+        self.assertEqual(generator._block, [])
+        self.assertEqual([generator.draw() for _ in range(6)], draws)
+
+
+class TestEvolvablePFSMPlayer(unittest.TestCase):
+    def test_classifier(self):
+        player = EvolvablePFSMPlayer(num_states=2, seed=0)
+        self.assertTrue(axl.Classifiers["stochastic"](player))
+        self.assertIsInstance(player._random, BlockRandomGenerator)
+        player = EvolvablePFSMPlayer(transitions=TRANSITIONS, initial_state=0,
+                                     initial_action=C)
+        self.assertFalse(axl.Classifiers["stochastic"](player))
+        self.assertEqual(player.fsm.actions, (1., 0., 0., 1.))
+        self.assertEqual(player.action_transitions(),
+                         [list(row) for row in TRANSITIONS])
+        with self.assertRaises(ValueError):
+            EvolvablePFSMPlayer(num_states=2, seed=0).action_transitions()
+        with self.assertRaises(ValueError):
+            EvolvablePFSMPlayer(transitions=((0, C, 0, 1.5), (0, D, 0, 0)),
+                                initial_state=0, initial_action=C)
+
+    def test_plays_as_fsm_player(self):
+        for seed in range(5):
+            fsm_player = axl.EvolvableFSMPlayer(num_states=4, seed=seed)
+            player = EvolvablePFSMPlayer(
+                transitions=fsm_player.fsm.transitions(),
+                initial_state=fsm_player.initial_state,
+                initial_action=fsm_player.initial_action)
+            for opponent in [axl.TitForTat(), axl.Alternator()]:
+                match = axl.Match((player, opponent), turns=20)
+                fsm_match = axl.Match((fsm_player, opponent), turns=20)
+                self.assertEqual(match.play(), fsm_match.play())
+
+    def test_probabilities(self):
+        # Cooperates with probability .8 whatever the opponent does
+        player = EvolvablePFSMPlayer(transitions=((0, C, 0, .8),
+                                                  (0, D, 0, .8)),
+                                     initial_state=0, initial_action=C)
+        match = axl.Match((player, axl.Defector()), turns=2001, seed=0)
+        interactions = match.play()
+        self.assertEqual(interactions,
+                         axl.Match((player, axl.Defector()), turns=2001,
+                                   seed=0).play())
+        cooperations = sum(play == C for play, _ in interactions[1:])
+        self.assertAlmostEqual(cooperations / 2000, .8, delta=.03)
+
+    def test_mutate_and_crossover(self):
+        player = EvolvablePFSMPlayer(num_states=3, mutation_probability=0.5,
+                                     seed=2)
+        mutant = player.mutate()
+        self.assertIsInstance(mutant.fsm, ArrayFSM)
+        self.assertEqual(mutant.num_states, 3)
+        child = player.crossover(mutant)
+        self.assertEqual(child.fsm.transitions(),
+                         [list(row) for row in child.init_kwargs["transitions"]])
+        self.assertEqual(EvolvablePFSMPlayer(**child.init_kwargs), child)
+
+    def test_gaussian_mutation(self):
+        player = EvolvablePFSMPlayer(num_states=4, mutation_probability=1,
+                                     mutation_distance=.01, seed=5)
+        mutant = player.mutate()
+        before = sorted(player.fsm.actions)
+        after = sorted(mutant.fsm.actions)
+        self.assertNotEqual(before, after)
+        for p, q in zip(before, after):
+            self.assertLess(abs(p - q), .1)
+        # Probabilities stay in [0, 1]
+        player = EvolvablePFSMPlayer(transitions=TRANSITIONS, initial_state=0,
+                                     initial_action=C, mutation_probability=1,
+                                     mutation_distance=10, seed=6)
+        for probability in player.mutate().fsm.actions:
+            self.assertTrue(0 <= probability <= 1)
+
+    def test_receive_vector(self):
+        player = EvolvablePFSMPlayer(num_states=2, seed=0)
+        player.receive_vector([0, 1, 1, 0, 1, 0, 0, 1, 0])
+        self.assertIsInstance(player.fsm, ArrayFSM)
+        self.assertEqual(player.fsm.transitions(),
+                         [[0, C, 0, 1.], [0, D, 1, 0.], [1, C, 1, 0.],
+                          [1, D, 0, 1.]])
+        self.assertEqual(player.initial_state, 1)
+        self.assertEqual(player.initial_action, C)
+        self.assertFalse(axl.Classifiers["stochastic"](player))
+        # The probabilities of playing C are read as they are, clipped
+        player.receive_vector([0, 1, 1, 0, .25, 1.5, -1, .5, 1])
+        self.assertEqual(player.fsm.actions, (.25, 1., 0., .5))
+        self.assertEqual(player.initial_action, D)
+        self.assertTrue(axl.Classifiers["stochastic"](player))
+        self.assertEqual(EvolvablePFSMPlayer(**player.init_kwargs).fsm,
+                         player.fsm)
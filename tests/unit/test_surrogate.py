@@ -0,0 +1,133 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import axelrod as axl
+import axelrod_dojo as dojo
+from axelrod_dojo import surrogate
+from axelrod_dojo.utils import make_outputer
+
+C, D = axl.Action.C, axl.Action.D
+
+
+def cooperations(player):
+    return player.cycle.count("C")
+
+
+class TestFeatures(unittest.TestCase):
+    def test_flatten(self):
+        self.assertEqual(surrogate.flatten(None), [])
+        self.assertEqual(surrogate.flatten(C), [0.])
+        self.assertEqual(surrogate.flatten("CDD"), [0., 1., 1.])
+        self.assertEqual(surrogate.flatten({"a": [1, (C, 2.5)], "b": D}),
+                         [1., 0., 2.5, 1.])
+
+    def test_player_features(self):
+        player = axl.EvolvableCycler(cycle="CDC", mutation_probability=0.5,
+                                     seed=1)
+        # The cycle and its length, without the seed or mutation parameters
+        self.assertEqual(list(surrogate.player_features(player)),
+                         [0., 1., 0., 3.])
+
+    def test_features_follow_mutations(self):
+        player = axl.EvolvableFSMPlayer(num_states=4, seed=1)
+        mutant = player.mutate()
+        self.assertEqual(len(surrogate.player_features(player)),
+                         len(surrogate.player_features(mutant)))
+
+
+class TestSurrogate(unittest.TestCase):
+    def players(self, num, seed=0):
+        return [axl.EvolvableCycler(cycle_length=6, seed=seed + i)
+                for i in range(num)]
+
+    def test_oversampling(self):
+        with self.assertRaises(ValueError):
+            surrogate.Surrogate(oversampling=0)
+
+    def test_learns_a_linear_score(self):
+        model = surrogate.Surrogate(ridge=1e-6, min_samples=10)
+        self.assertFalse(model.trained)
+        for player in self.players(40):
+            model.add(player, 2 * cooperations(player) + 1)
+        self.assertTrue(model.trained)
+        players = self.players(10, seed=100)
+        predictions = model.predict(players)
+        expected = [2 * cooperations(player) + 1 for player in players]
+        self.assertTrue(np.allclose(predictions, expected, atol=1e-3))
+
+    def test_mismatched_features(self):
+        model = surrogate.Surrogate()
+        model.add(axl.EvolvableCycler(cycle_length=3, seed=1), 1)
+        with self.assertRaises(ValueError):
+            model.add(axl.EvolvableCycler(cycle_length=4, seed=1), 1)
+
+    def test_screen(self):
+        model = surrogate.Surrogate(min_samples=10)
+        players = self.players(20)
+        self.assertEqual(model.screen(players, 5), players[:5])
+        for player in players:
+            model.add(player, cooperations(player))
+        screened = model.screen(players, 5)
+        self.assertEqual(len(screened), 5)
+        threshold = sorted(map(cooperations, players))[-5]
+        self.assertGreaterEqual(min(map(cooperations, screened)),
+                                threshold - 1)
+
+    def test_add_results(self):
+        output = tempfile.NamedTemporaryFile()
+        outputer = make_outputer(output.name, mode='w')
+        players = self.players(12)
+        for generation, player in enumerate(players):
+            outputer.write_row(
+                [generation, 0, 0, cooperations(player),
+                 axl.EvolvableCycler.serialize_parameters(player)])
+        outputer.close()
+        model = surrogate.Surrogate()
+        self.assertEqual(model.add_results(axl.EvolvableCycler, output.name),
+                         12)
+        self.assertEqual(model.samples, 12)
+
+
+class TestPopulationSurrogate(unittest.TestCase):
+    def test_evolve(self):
+        output = tempfile.NamedTemporaryFile()
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        model = surrogate.Surrogate(oversampling=3, min_samples=8)
+        with dojo.Population(player_class=axl.EvolvableCycler,
+                             params_kwargs={"cycle_length": 5},
+                             size=8,
+                             bottleneck=2,
+                             objective=objective,
+                             output_filename=output.name,
+                             opponents=[axl.TitForTat(), axl.Defector()],
+                             surrogate=model) as population:
+            population.run(3, print_output=False)
+            self.assertEqual(len(population.population), 8)
+        self.assertEqual(model.samples, 24)
+        self.assertTrue(model.trained)
+
+    def test_raced_out_players_are_not_learned(self):
+        output = tempfile.NamedTemporaryFile()
+        objective = dojo.prepare_objective(name="score", turns=10,
+                                           repetitions=1)
+        model = surrogate.Surrogate()
+        players = [axl.EvolvableCycler(cycle_length=6, seed=seed)
+                   for seed in range(10)]
+        with dojo.Population(player_class=axl.EvolvableCycler,
+                             params_kwargs={"cycle_length": 6},
+                             size=10,
+                             bottleneck=2,
+                             objective=objective,
+                             output_filename=output.name,
+                             opponents=[axl.Cooperator()] * 10,
+                             population=players,
+                             cache_size=0,
+                             vectorize=False,
+                             racing=True,
+                             surrogate=model) as population:
+            population.evolve()
+            self.assertGreater(len(population.incomplete), 0)
+            self.assertEqual(model.samples, 10 - len(population.incomplete))
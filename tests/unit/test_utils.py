@@ -1,8 +1,12 @@
 import unittest
 
+import os
+import random
 import tempfile
 import functools
 
+import numpy as np
+
 import axelrod as axl
 import axelrod_dojo.utils as utils
 
@@ -23,6 +27,109 @@ class TestOutputer(unittest.TestCase):
             self.assertEqual("1,something,3.0\n1,something,3.0\n", f.read())
 
 
+class TestBufferedOutputer(unittest.TestCase):
+    def test_rows_are_written_in_batches(self):
+        with tempfile.NamedTemporaryFile() as temporary_file:
+            outputer = utils.Outputer(filename=temporary_file.name, mode='a',
+                                      flush_interval=2)
+            outputer.write_row([1, "a"])
+            with open(temporary_file.name, "r") as f:
+                self.assertEqual("", f.read())
+            outputer.write_row([2, "b"])
+            outputer.write_row([3, "c"])
+            with open(temporary_file.name, "r") as f:
+                self.assertEqual("1,a\n2,b\n", f.read())
+            outputer.close()
+            with open(temporary_file.name, "r") as f:
+                self.assertEqual("1,a\n2,b\n3,c\n", f.read())
+
+    def test_write_mode_truncates_once(self):
+        with tempfile.NamedTemporaryFile() as temporary_file:
+            with open(temporary_file.name, "w") as f:
+                f.write("old\n")
+            outputer = utils.Outputer(filename=temporary_file.name, mode='w')
+            outputer.write_row([1])
+            outputer.write_row([2])
+            with open(temporary_file.name, "r") as f:
+                self.assertEqual("1\n2\n", f.read())
+
+    def test_arrow_outputer(self):
+        with tempfile.NamedTemporaryFile() as temporary_file:
+            outputer = utils.make_outputer(temporary_file.name, "arrow",
+                                           flush_interval=2)
+            rows = [[i, 2.5, 0.5, 3.0, "params{}".format(i)]
+                    for i in range(1, 4)]
+            for row in rows:
+                outputer.write_row(row)
+            self.assertEqual(utils.read_arrow(temporary_file.name).num_rows,
+                             2)
+            outputer.close()
+            table = utils.read_arrow(temporary_file.name)
+            self.assertEqual(table.column_names, utils.OUTPUT_COLUMNS)
+            self.assertEqual(str(table.schema.field("generation").type),
+                             "int64")
+            self.assertEqual([list(row.values()) for row in table.to_pylist()],
+                             rows)
+
+    def test_arrow_output_is_a_single_stream(self):
+        import pyarrow as pa
+        with tempfile.NamedTemporaryFile() as temporary_file:
+            rows = [[i, 2.5, 0.5, 3.0, "params{}".format(i)]
+                    for i in range(1, 6)]
+
+            def read():
+                with pa.OSFile(temporary_file.name, 'rb') as source:
+                    return pa.ipc.open_stream(source).read_all().to_pylist()
+
+            outputer = utils.make_outputer(temporary_file.name, "arrow")
+            for row in rows[:3]:
+                outputer.write_row(row)
+            # Readable while the run goes on
+            self.assertEqual(len(read()), 3)
+            outputer.close()
+            # Appending starts a stream with the rows already written
+            outputer = utils.make_outputer(temporary_file.name, "arrow")
+            for row in rows[3:]:
+                outputer.write_row(row)
+            outputer.close()
+            self.assertEqual([list(row.values()) for row in read()], rows)
+            self.assertEqual(utils.read_arrow(temporary_file.name).num_rows,
+                             5)
+            self.assertEqual([score for score, _, _ in
+                              utils.iter_results(temporary_file.name)],
+                             [3.0] * 5)
+
+    def test_arrow_rows_survive_a_failed_append(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "output.arrow")
+            rows = [[i, 2.5, 0.5, 3.0, "params{}".format(i)]
+                    for i in range(1, 4)]
+            outputer = utils.make_outputer(filename, "arrow")
+            for row in rows:
+                outputer.write_row(row)
+            outputer.close()
+
+            def killed(*args):
+                raise KeyboardInterrupt
+
+            replace = os.replace
+            outputer = utils.make_outputer(filename, "arrow")
+            try:
+                os.replace = killed
+                with self.assertRaises(KeyboardInterrupt):
+                    outputer.write_row([4, 2.5, 0.5, 3.0, "params4"])
+            finally:
+                os.replace = replace
+            table = utils.read_arrow(filename)
+            self.assertEqual([list(row.values()) for row in table.to_pylist()],
+                             rows)
+            self.assertEqual(os.listdir(directory), ["output.arrow"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            utils.make_outputer("output.csv", "json")
+
+
 class TestPrepareObjective(unittest.TestCase):
     def test_incorrect_objective_name(self):
         name = "not_correct_name"
@@ -55,6 +162,15 @@ class TestPrepareObjective(unittest.TestCase):
         self.assertIsInstance(objective, functools.partial)
         self.assertIn("objective_moran_win ", str(objective))
 
+    def test_fast_moran(self):
+        objective = utils.prepare_objective(name="fast_moran",
+                                            turns=200,
+                                            noise=0,
+                                            repetitions=5)
+        self.assertIsInstance(objective, functools.partial)
+        self.assertIn("objective_fast_moran_win ", str(objective))
+        self.assertEqual(objective.keywords["N"], 4)
+
 
 class TestObjectiveScore(unittest.TestCase):
     def test_deterministic_player_opponent(self):
@@ -159,6 +275,56 @@ class TestObjectiveMoran(unittest.TestCase):
                              expected_fixation_probabilities)
 
 
+class TestObjectiveFastMoran(unittest.TestCase):
+    def test_identical_players_fixate(self):
+        fixations = utils.objective_fast_moran_win(axl.TitForTat(),
+                                                   axl.TitForTat(),
+                                                   turns=5,
+                                                   repetitions=5,
+                                                   noise=0)
+        self.assertEqual(fixations, [1] * 5)
+
+    def test_fixation_probability(self):
+        # Exact fixation probability of the birth death chain of a Cooperator
+        # and a Defector: over two turns s_mm = 3, s_mo = 0, s_om = 5 and
+        # s_oo = 1.
+        N = 3
+        n = 2 * N
+        transitions = np.zeros((n + 1, n + 1))
+        transitions[0, 0] = transitions[n, n] = 1
+        for a in range(1, n):
+            b = n - a
+            fitness_me = a * ((a - 1) * 3)
+            fitness_other = b * (a * 5 + (b - 1) * 1)
+            p = fitness_me / (fitness_me + fitness_other)
+            up, down = p * b / n, (1 - p) * a / n
+            transitions[a, a + 1], transitions[a, a - 1] = up, down
+            transitions[a, a] = 1 - up - down
+        expected = np.linalg.matrix_power(transitions, 10000)[N, n]
+
+        np.random.seed(0)
+        fixations = utils.objective_fast_moran_win(axl.Cooperator(),
+                                                   axl.Defector(),
+                                                   turns=2,
+                                                   repetitions=20000,
+                                                   noise=0,
+                                                   N=N)
+        self.assertEqual(len(fixations), 20000)
+        self.assertEqual(set(fixations), {0, 1})
+        self.assertAlmostEqual(np.mean(fixations), expected, delta=0.01)
+
+    def test_no_target_standard_error(self):
+        # The repetitions are all simulated at once so stopping early would
+        # save nothing
+        with self.assertRaises(ValueError):
+            utils.prepare_objective(name="fast_moran",
+                                    target_standard_error=0.5)
+        objective = utils.prepare_objective(name="fast_moran", turns=2,
+                                            repetitions=1000)
+        self.assertEqual(len(objective(axl.Defector(), axl.Cooperator())),
+                         1000)
+
+
 class TestScoreParams(unittest.TestCase):
     def test_score(self):
         axl.seed(0)
@@ -217,3 +383,360 @@ class TestScoreParams(unittest.TestCase):
                                    weights=[2, -.5, 0, 0, 0])
         expected_score = 4.0
         self.assertEqual(score, expected_score)
+
+
+class TestOpponentPool(unittest.TestCase):
+    def test_opponents_are_built_once(self):
+        opponents_information = [utils.PlayerInfo(axl.TitForTat, {}),
+                                 utils.PlayerInfo(axl.Cycler, {"cycle": "CD"})]
+        pool = utils.OpponentPool(opponents_information)
+        self.assertEqual(len(pool), 2)
+        self.assertIs(pool.get(0), pool.get(0))
+        self.assertIsInstance(pool.get(0), axl.TitForTat)
+        # Cycles are replayed from their precomputed moves
+        self.assertIsInstance(pool.get(1), utils.match_engine.ReplayPlayer)
+        pool = utils.OpponentPool(opponents_information, replay=False)
+        self.assertIsInstance(pool.get(1), axl.Cycler)
+
+    def test_scores_match(self):
+        opponents_information = [
+            utils.PlayerInfo(s, {}) for s in axl.short_run_time_strategies[:60]
+            if not axl.Classifiers["stochastic"](s())]
+        pool = utils.OpponentPool(opponents_information)
+        player = axl.EvolvableFSMPlayer(num_states=4, seed=1)
+        for name in ["score", "score_diff"]:
+            objective = utils.prepare_objective(name=name, turns=20,
+                                                repetitions=1)
+            for _ in range(2):
+                self.assertEqual(
+                    utils.score_player(player, objective,
+                                       opponents_information,
+                                       opponents=pool),
+                    utils.score_player(player, objective,
+                                       opponents_information))
+
+
+class TestCommonRandomNumbers(unittest.TestCase):
+    def test_derive_seed(self):
+        self.assertIsNone(utils.derive_seed(None, 1, 2))
+        self.assertEqual(utils.derive_seed(0, 1, 2), utils.derive_seed(0, 1, 2))
+        self.assertNotEqual(utils.derive_seed(0, 1, 2),
+                            utils.derive_seed(0, 2, 1))
+        self.assertNotEqual(utils.derive_seed(0, 1), utils.derive_seed(1, 1))
+
+    def test_seeded_scores_are_reproducible(self):
+        objective = utils.prepare_objective(name="score", turns=20,
+                                            noise=0.1, repetitions=3)
+        opponents_information = [utils.PlayerInfo(axl.TitForTat, {}),
+                                 utils.PlayerInfo(axl.Random, {})]
+        player = axl.WinStayLoseShift()
+        scores = [utils.score_player(player, objective,
+                                     opponents_information, seed=seed)
+                  for seed in [3, 3, 4]]
+        self.assertEqual(scores[0], scores[1])
+        self.assertNotEqual(scores[0], scores[2])
+
+    def test_players_meet_the_same_noise(self):
+        # Against the same noise two copies of a player get the same score
+        # whatever the state of the global random number generators.
+        objective = utils.prepare_objective(name="score_diff", turns=20,
+                                            noise=0.2, repetitions=2)
+        opponents_information = [utils.PlayerInfo(axl.TitForTat, {})] * 3
+        first = utils.score_player(axl.Grudger(), objective,
+                                   opponents_information, sample_count=2,
+                                   seed=5)
+        np.random.seed(1)
+        axl._module_random.seed(1)
+        second = utils.score_player(axl.Grudger(), objective,
+                                    opponents_information, sample_count=2,
+                                    seed=5)
+        self.assertEqual(first, second)
+
+    def test_seeded_opponent_sample(self):
+        samples = [utils.sample_opponents(10, list(range(10)), 4, seed=2)
+                   for _ in range(2)]
+        self.assertEqual(list(samples[0][0]), list(samples[1][0]))
+        self.assertEqual(samples[0][1], samples[1][1])
+
+    def test_seeded_fast_moran(self):
+        objective = utils.prepare_objective(name="fast_moran", turns=10,
+                                            noise=0.1, repetitions=20)
+        self.assertEqual(objective(axl.TitForTat(), axl.Defector(), seed=1),
+                         objective(axl.TitForTat(), axl.Defector(), seed=1))
+
+
+class TestFitnessCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = utils.FitnessCache(maxsize=2)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1.5)
+        self.assertEqual(cache.get("a"), 1.5)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = utils.FitnessCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_clear(self):
+        cache = utils.FitnessCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 0)
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprint_changes_with_context(self):
+        opponents_information = [utils.PlayerInfo(axl.Random, {"p": 0})]
+        objective = utils.prepare_objective(turns=10)
+        base = utils.fingerprint(objective, opponents_information)
+        self.assertEqual(base, utils.fingerprint(
+            utils.prepare_objective(turns=10), opponents_information))
+        self.assertNotEqual(base, utils.fingerprint(
+            utils.prepare_objective(turns=20), opponents_information))
+        self.assertNotEqual(base, utils.fingerprint(
+            objective, [utils.PlayerInfo(axl.Random, {"p": 1})]))
+        self.assertNotEqual(base, utils.fingerprint(
+            objective, opponents_information, weights=[2]))
+        self.assertNotEqual(base, utils.fingerprint(
+            objective, opponents_information, seed=0))
+        self.assertEqual(hash(base), hash(utils.fingerprint(
+            objective, opponents_information)))
+
+    def test_deterministic_objective(self):
+        self.assertTrue(utils.is_deterministic_objective(
+            utils.prepare_objective(name="score")))
+        self.assertTrue(utils.is_deterministic_objective(
+            utils.prepare_objective(name="score_diff")))
+        self.assertFalse(utils.is_deterministic_objective(
+            utils.prepare_objective(name="score", noise=0.1)))
+        self.assertFalse(utils.is_deterministic_objective(
+            utils.prepare_objective(name="moran")))
+
+    def test_deterministic_opponents(self):
+        self.assertTrue(utils.has_deterministic_opponents(
+            [utils.PlayerInfo(axl.TitForTat, {}),
+             utils.PlayerInfo(axl.Random, {"p": 0})]))
+        self.assertFalse(utils.has_deterministic_opponents(
+            [utils.PlayerInfo(axl.Random, {"p": 0.5})]))
+
+
+class TestRacing(unittest.TestCase):
+    def test_objective_bounds(self):
+        self.assertEqual(utils.objective_bounds(
+            utils.prepare_objective(name="score")), (0, 5))
+        self.assertEqual(utils.objective_bounds(
+            utils.prepare_objective(name="score_diff")), (-5, 5))
+        self.assertEqual(utils.objective_bounds(
+            utils.prepare_objective(name="moran")), (0, 1))
+        self.assertEqual(utils.objective_bounds(
+            utils.prepare_objective(name="fast_moran")), (0, 1))
+        self.assertIsNone(utils.objective_bounds(lambda me, other: [0]))
+
+    def test_complete_race_matches_score_player(self):
+        objective = utils.prepare_objective(name="score", turns=10)
+        opponents_information = [utils.PlayerInfo(s, {}) for s in
+                                 [axl.TitForTat, axl.Defector, axl.Grudger]]
+        player = axl.Cooperator()
+        score, played, complete = utils.race_player(
+            player, objective, opponents_information, float("-inf"))
+        self.assertTrue(complete)
+        self.assertEqual(played, 3)
+        self.assertAlmostEqual(score, utils.score_player(
+            player, objective, opponents_information))
+
+    def test_hopeless_player_stops_early(self):
+        objective = utils.prepare_objective(name="score", turns=10)
+        opponents_information = [utils.PlayerInfo(axl.Defector, {})] * 10
+        score, played, complete = utils.race_player(
+            axl.Cooperator(), objective, opponents_information, threshold=4)
+        self.assertFalse(complete)
+        self.assertLess(played, 10)
+        self.assertEqual(score, 0)
+
+        # The confidence bound stops the player well before the provable one
+        opponents_information = [utils.PlayerInfo(axl.Defector, {})] * 40
+        score, played, complete = utils.race_player(
+            axl.Cooperator(), objective, opponents_information, threshold=1.5,
+            confidence=0.9)
+        self.assertFalse(complete)
+        self.assertLess(played, 20)
+
+
+class TestAdaptiveRepetitions(unittest.TestCase):
+    def test_standard_error(self):
+        self.assertEqual(utils.standard_error([1]), float("inf"))
+        self.assertEqual(utils.standard_error([2, 2, 2]), 0)
+        self.assertAlmostEqual(utils.standard_error([0, 2]), 1)
+
+    def test_repeat_until(self):
+        samples = iter(range(100))
+        self.assertEqual(len(utils.repeat_until(lambda: next(samples), 10)),
+                         10)
+        self.assertEqual(len(utils.repeat_until(lambda: 1, 10, 0.1)),
+                         utils.MIN_REPETITIONS)
+        samples = iter(range(100))
+        self.assertEqual(len(utils.repeat_until(lambda: next(samples), 10,
+                                                0.1)), 10)
+
+    def test_binary_standard_error(self):
+        self.assertEqual(utils.binary_standard_error([]), float("inf"))
+        self.assertGreater(utils.binary_standard_error([0] * 5), 0.1)
+        self.assertEqual(utils.binary_standard_error([0] * 5),
+                         utils.binary_standard_error([1] * 5))
+        self.assertAlmostEqual(utils.binary_standard_error([0, 1] * 50),
+                               0.05)
+
+    def test_rare_events_are_estimated_without_bias(self):
+        generator = random.Random(0)
+        estimates = []
+        for _ in range(2000):
+            samples = utils.repeat_until(
+                lambda: int(generator.random() < 0.1), 1000,
+                target_standard_error=0.05, binary=True)
+            self.assertGreater(len(samples), utils.MIN_REPETITIONS)
+            estimates.append(np.mean(samples))
+        self.assertAlmostEqual(np.mean(estimates), 0.1, delta=0.006)
+
+    def test_objectives_record_repetitions_used(self):
+        for name in ["score", "score_diff", "moran"]:
+            objective = utils.prepare_objective(
+                name=name, turns=10, noise=0.5, repetitions=50,
+                target_standard_error=10)
+            scores = objective(axl.Cooperator(), axl.Defector())
+            self.assertEqual(len(scores), utils.MIN_REPETITIONS)
+
+            objective = utils.prepare_objective(
+                name=name, turns=10, noise=0.5, repetitions=50,
+                target_standard_error=0)
+            scores = objective(axl.Cooperator(), axl.Defector())
+            self.assertEqual(len(scores), 50)
+
+    def test_score_player_returns_repetitions_used(self):
+        opponents_information = [utils.PlayerInfo(axl.Defector, {}),
+                                 utils.PlayerInfo(axl.Cooperator, {})]
+        objective = utils.prepare_objective(name="score", turns=200,
+                                            noise=0.01, repetitions=50,
+                                            target_standard_error=0.1)
+        score, repetitions = utils.score_player(
+            axl.Defector(), objective, opponents_information,
+            return_repetitions=True)
+        self.assertGreaterEqual(repetitions, 2 * utils.MIN_REPETITIONS)
+        self.assertLess(repetitions, 2 * 50)
+        score, played, complete, raced_repetitions = utils.race_player(
+            axl.Defector(), objective, opponents_information,
+            threshold=float("-inf"), return_repetitions=True)
+        self.assertTrue(complete)
+        self.assertLess(raced_repetitions, 2 * 50)
+
+        objective = utils.prepare_objective(name="score", turns=200,
+                                            noise=0.01, repetitions=50)
+        score, repetitions = utils.score_player(
+            axl.Defector(), objective, opponents_information,
+            return_repetitions=True)
+        self.assertEqual(repetitions, 2 * 50)
+
+    def test_deterministic_matches_are_played_once(self):
+        objective = utils.prepare_objective(name="score", turns=10,
+                                            repetitions=50,
+                                            target_standard_error=0.01)
+        self.assertEqual(objective(axl.TitForTat(), axl.Defector()), [0.9])
+
+
+class TestLoadParams(unittest.TestCase):
+    def write_rows(self, filename, scores, output_format="csv"):
+        outputer = utils.make_outputer(filename, output_format,
+                                       flush_interval=3)
+        for i, score in enumerate(scores):
+            outputer.write_row([i, 0., 0., score, "params{}".format(i)])
+        outputer.close()
+
+    def test_best_results(self):
+        scores = [3, 1, 4, 1, 5, 9, 2, 6]
+        for output_format in ["csv", "arrow"]:
+            with tempfile.NamedTemporaryFile() as temporary_file:
+                self.write_rows(temporary_file.name, scores, output_format)
+                best, rows, offset = utils.best_results(temporary_file.name, 3)
+                self.assertEqual(best, [(9, "params5"), (6, "params7"),
+                                        (5, "params4")])
+                self.assertEqual(rows, len(scores))
+                # Every row was read (an Arrow stream ends with a marker)
+                self.assertEqual(utils.best_results(temporary_file.name, 3,
+                                                    offset)[1], 0)
+                if output_format == "csv":
+                    self.assertEqual(offset,
+                                     os.path.getsize(temporary_file.name))
+
+    def test_unterminated_row_is_not_read(self):
+        with tempfile.NamedTemporaryFile() as temporary_file:
+            self.write_rows(temporary_file.name, [1, 2])
+            with open(temporary_file.name, "a") as f:
+                f.write("2,0.0,0.0,7.0,par")
+            best, rows, _ = utils.best_results(temporary_file.name, 5)
+            self.assertEqual(rows, 2)
+            self.assertEqual(best, [(2, "params1"), (1, "params0")])
+
+    def test_index(self):
+        for output_format in ["csv", "arrow"]:
+            with tempfile.TemporaryDirectory() as directory:
+                filename = os.path.join(directory, "output")
+                self.write_rows(filename, [3, 1, 4], output_format)
+                best = utils.best_indexed_results(filename, 2)
+                self.assertEqual(best, [(4, "params2"), (3, "params0")])
+                index = utils.read_index(filename)
+                self.assertEqual(index["rows"], 3)
+
+                # Only the new rows are read
+                self.write_rows(filename, [1, 5], output_format)
+                best = utils.best_indexed_results(filename, 2)
+                self.assertEqual(best, [(5, "params1"), (4, "params2")])
+                self.assertEqual(utils.read_index(filename)["rows"], 5)
+
+                # A rewritten file is read again
+                os.remove(filename)
+                self.write_rows(filename, [2], output_format)
+                self.assertIsNone(utils.read_index(filename))
+                best = utils.best_indexed_results(filename, 2)
+                self.assertEqual(best, [(2, "params0")])
+
+    def test_load_params(self):
+        players = [axl.EvolvableFSMPlayer(num_states=2, seed=seed)
+                   for seed in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "output.csv")
+            outputer = utils.Outputer(filename)
+            for score, player in zip([1, 3, 2], players):
+                outputer.write_row([0, 0, 0, score,
+                                    player.serialize_parameters()])
+            for index in [False, True]:
+                best = utils.load_params(axl.EvolvableFSMPlayer, filename, 2,
+                                         index=index)
+                self.assertEqual(best, [players[1], players[2]])
+
+
+class TestCheckpointUtils(unittest.TestCase):
+    def test_write_atomically(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "checkpoint")
+            utils.write_atomically(filename, b"first")
+            utils.write_atomically(filename, b"second")
+            with open(filename, "rb") as f:
+                self.assertEqual(f.read(), b"second")
+            self.assertEqual(os.listdir(directory), ["checkpoint"])
+
+    def test_random_states(self):
+        states = utils.random_states()
+        draws = (random.random(), np.random.random(),
+                 axl._module_random.random())
+        utils.set_random_states(states)
+        self.assertEqual(draws, (random.random(), np.random.random(),
+                                 axl._module_random.random()))